@@ -8,18 +8,1894 @@ bl_info = {
     "category": "Object",
 }
 
+import atexit
+import csv
+import functools
+import itertools
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import bpy
+import gpu
 import mathutils
-from bpy.props import IntProperty, StringProperty
-from bpy.types import Operator, Panel
+import numpy as np
+from mathutils.kdtree import KDTree
+from bpy.props import (
+    BoolProperty,
+    CollectionProperty,
+    EnumProperty,
+    FloatProperty,
+    FloatVectorProperty,
+    IntProperty,
+    IntVectorProperty,
+    PointerProperty,
+    StringProperty,
+)
+from bpy.app.handlers import persistent
+from bpy.types import AddonPreferences, Operator, Panel, PropertyGroup, UIList
+from gpu_extras.batch import batch_for_shader
+
+
+def _marked_indices(scene, prefix):
+    """Return the marks 1-3 for 'source' or 'target', stopping at the first unmarked slot
+
+    Vertex marks are plain vertex indices. Edge, face, vertex group and surface marks are
+    (element, index, barycentric) tuples, see _mark_vertex_weights().
+    """
+    elements = {item.slot: item for item in getattr(scene, f"vertex_align_{prefix}_elements")}
+    indices = []
+    for slot in range(1, 4):
+        index = getattr(scene, f"vertex_align_{prefix}_vertex_{slot}")
+        if index < 0:
+            break
+        item = elements.get(slot)
+        indices.append(index if item is None else (item.element, index, tuple(item.barycentric)))
+    
+    # Follow marked vertices whose index shifted since they were marked (stable IDs live on the base mesh)
+    obj = bpy.data.objects.get(getattr(scene, f"vertex_align_{prefix}_object"))
+    if indices and obj is not None and obj.type == 'MESH' and not scene.vertex_align_use_evaluated:
+        indices = _remap_stable_indices(obj, indices, getattr(scene, f"vertex_align_{prefix}_anchors"))
+    return indices
+
+
+def _format_mark(mark):
+    """Return the panel/report text of a vertex index or (element, index, barycentric) mark"""
+    if isinstance(mark, tuple):
+        return f"{MARK_ELEMENT_NAMES[mark[0]]} {mark[1]}"
+    return str(mark)
+
+
+def _object_marked_indices(obj):
+    """Return the source vertex indices stored on the object itself (see Mark Source Vertex operators)"""
+    indices = []
+    for index in obj.vertex_align_source_vertices:
+        if index < 0:
+            break
+        indices.append(index)
+    return indices
+
+
+def _matrix_to_array(matrix):
+    """Return a mathutils matrix as a NumPy array"""
+    return np.array(matrix, dtype=np.float64)
+
+
+def _transform_points(matrix, points):
+    """Apply a (4, 4) transform to an (N, 3) array of points"""
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+class _MarkedPointCache:
+    """Small LRU cache of world-space marked points
+
+    Entries are keyed by object pointer, mesh data pointer, vertex indices and a hash of matrix_world,
+    so a moved object simply misses the cache. Geometry edits are handled by invalidate(), called
+    from the depsgraph update handler.
+    """
+    
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, pointer):
+        """Drop every entry of the object or mesh datablock with the given pointer"""
+        for key in [key for key in self._entries if pointer in (key[0], key[1])]:
+            del self._entries[key]
+    
+    def clear(self):
+        self._entries.clear()
+
+
+_point_cache = _MarkedPointCache()
+
+
+# Set to 1 to time operator phases without opening the preferences, or to a .json path to also
+# write the statistics there when Blender exits (0 or unset: off)
+PROFILE_ENV = "VERTEX_ALIGN_PROFILE"
+
+
+class _PhaseProfiler:
+    """Rolling timing statistics of the phases of the mark and align operators
+
+    Off by default: phases are only timed when the add-on preference "Time Operator Phases" or the
+    VERTEX_ALIGN_PROFILE environment variable is set. Totals cover the whole session, min, max,
+    median and p95 the last window samples of each phase.
+    """
+    
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._totals = {}
+    
+    def enabled(self):
+        if os.environ.get(PROFILE_ENV, "0") != "0":
+            return True
+        addon = bpy.context.preferences.addons.get(__name__)
+        return addon is not None and getattr(addon.preferences, "use_profiling", False)
+    
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled():
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    def record(self, name, seconds):
+        self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+        totals = self._totals.setdefault(name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+    
+    def stats(self):
+        stats = {}
+        for name, samples in sorted(self._samples.items()):
+            recent = np.array(samples)
+            count, total = self._totals[name]
+            stats[name] = {
+                "count": count,
+                "total": total,
+                "mean": total / count,
+                "last": float(recent[-1]),
+                "min": float(recent.min()),
+                "median": float(np.median(recent)),
+                "p95": float(np.percentile(recent, 95)),
+                "max": float(recent.max()),
+            }
+        return stats
+    
+    def report(self):
+        lines = [f"{'phase':<40}{'count':>8}{'mean ms':>12}{'median ms':>12}{'p95 ms':>12}{'max ms':>12}"]
+        for name, stat in self.stats().items():
+            lines.append(f"{name:<40}{stat['count']:>8}{stat['mean'] * 1000:>12.3f}{stat['median'] * 1000:>12.3f}"
+                         f"{stat['p95'] * 1000:>12.3f}{stat['max'] * 1000:>12.3f}")
+        return "\n".join(lines)
+    
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump(self.stats(), output, indent=2)
+    
+    def clear(self):
+        self._samples.clear()
+        self._totals.clear()
+
+
+_profiler = _PhaseProfiler()
+
+
+def _profiled(name):
+    """Decorator timing a whole operator execute() as the phase name"""
+    def decorator(execute):
+        @functools.wraps(execute)
+        def wrapper(self, context):
+            with _profiler.phase(name):
+                return execute(self, context)
+        return wrapper
+    return decorator
+
+
+def _write_profile_at_exit():
+    """Write the phase statistics to the .json path given in VERTEX_ALIGN_PROFILE, if any"""
+    path = os.environ.get(PROFILE_ENV, "")
+    if path.lower().endswith(".json") and _profiler.stats():
+        _profiler.write(path)
+
+
+def _geometry_depsgraph(context):
+    """Return the evaluated depsgraph when marks resolve against modifier results, otherwise None"""
+    return context.evaluated_depsgraph_get() if context.scene.vertex_align_use_evaluated else None
+
+
+def _resolve_geometry(obj, depsgraph=None):
+    """Return (kind, vertex sequence) the marks of a mesh object resolve against
+
+    kind is 'EVALUATED' (modifier results, when a depsgraph is given), 'EDIT' (the live bmesh of an
+    object in Edit Mode, so no mode switch is needed) or 'BASE' (the mesh datablock).
+    """
+    if depsgraph is not None:
+        return 'EVALUATED', obj.evaluated_get(depsgraph).data.vertices
+    if obj.mode == 'EDIT':
+        import bmesh
+        bm = bmesh.from_edit_mesh(obj.data)
+        bm.verts.ensure_lookup_table()
+        return 'EDIT', bm.verts
+    return 'BASE', obj.data.vertices
+
+
+def _resolve_mesh(obj, depsgraph=None):
+    """Return the mesh datablock the marks of an object resolve against, for bulk foreach_get reads
+
+    In Edit Mode the edit mesh is written back to the datablock first. Only reads needing whole-mesh
+    topology (surface triangles, islands, shape descriptors) take this path; coordinates, element
+    marks and select flags are read from the bmesh.
+    """
+    if depsgraph is not None:
+        return obj.evaluated_get(depsgraph).data
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
+    return obj.data
+
+
+def _edit_mesh_coords(bm):
+    """Return the vertex coordinates of an edit-mode bmesh as an (N, 3) array"""
+    verts = bm.verts
+    return np.fromiter(itertools.chain.from_iterable(vert.co for vert in verts), dtype=np.float64,
+                       count=len(verts) * 3).reshape(-1, 3)
+
+
+def _object_coords(obj, depsgraph=None):
+    """Return all local vertex coordinates of a mesh object (evaluated, edit-mode or base mesh)"""
+    if depsgraph is None and obj.mode == 'EDIT':
+        import bmesh
+        return _edit_mesh_coords(bmesh.from_edit_mesh(obj.data))
+    return _mesh_coords(_resolve_mesh(obj, depsgraph))
+
+
+# Mark element types besides plain vertices, see _mark_vertex_weights()
+MARK_ELEMENT_ITEMS = [
+    ('EDGE', "Edge Midpoint", "Midpoint of the first selected edge (Edit Mode)"),
+    ('FACE', "Face Center", "Center of the first selected face (Edit Mode)"),
+    ('GROUP', "Vertex Group Median", "Median of the vertices of the active vertex group"),
+    ('SURFACE', "Surface Point", "Surface point seen through the 3D cursor from the view"),
+]
+MARK_ELEMENT_NAMES = {
+    'EDGE': "Edge",
+    'FACE': "Face",
+    'GROUP': "Group",
+    'SURFACE': "Surface",
+    'CACHED': "Deleted vertex",
+}
+
+
+def _foreach_array(collection, attribute, width=1, dtype=np.int32):
+    """Read an attribute of every element of a mesh collection with a single foreach_get"""
+    values = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attribute, values)
+    return values.reshape(-1, width) if width > 1 else values
+
+
+def _mesh_triangles(mesh):
+    """Return the vertex indices of the loop triangles of a mesh as a (T, 3) array"""
+    mesh.calc_loop_triangles()
+    return _foreach_array(mesh.loop_triangles, "vertices", 3)
+
+
+def _vertex_group_members(mesh, group_index):
+    """Return the indices of the vertices of a mesh assigned to a vertex group with a non-zero weight"""
+    # Deform weights are not exposed to foreach_get, this is the one per-vertex loop of mark resolution
+    return np.array([vertex.index for vertex in mesh.vertices
+                     if any(group.group == group_index and group.weight > 0.0 for group in vertex.groups)],
+                    dtype=np.int64)
+
+
+def _edit_group_members(bm, group_index):
+    """Return the vertices of an edit-mode bmesh assigned to a vertex group with a non-zero weight"""
+    layer = bm.verts.layers.deform.active
+    if layer is None:
+        return []
+    return [vert for vert in bm.verts if vert[layer].get(group_index, 0.0) > 0.0]
+
+
+def _edit_mark_points(bm, marks):
+    """Return the local positions of vertex, edge, face, vertex group and 'CACHED' marks of a bmesh
+
+    Only the marked elements are read, except for vertex groups, whose weights live on the vertices.
+    Raises IndexError for elements the bmesh lacks.
+    """
+    bm.verts.ensure_lookup_table()
+    points = []
+    for mark in marks:
+        if not isinstance(mark, tuple):
+            points.append(bm.verts[mark].co)
+            continue
+        element, index, barycentric = mark
+        if element == 'CACHED':
+            points.append(barycentric)
+        elif element == 'EDGE':
+            bm.edges.ensure_lookup_table()
+            points.append(np.mean([vert.co for vert in bm.edges[index].verts], axis=0))
+        elif element == 'FACE':
+            bm.faces.ensure_lookup_table()
+            points.append(np.mean([vert.co for vert in bm.faces[index].verts], axis=0))
+        else:
+            members = _edit_group_members(bm, index)
+            if not members:
+                raise IndexError(f"vertex group {index} has no vertices")
+            points.append(np.mean([vert.co for vert in members], axis=0))
+    return np.array(points, dtype=np.float64).reshape(-1, 3)
+
+
+def _mark_vertex_weights(mesh, marks):
+    """Return, for each mark, the (vertex indices, weights) whose weighted sum is its local position
+
+    A mark is a vertex index or an (element, index, barycentric) tuple: 'EDGE' (edge midpoint),
+    'FACE' (face center), 'GROUP' (median of a vertex group) or 'SURFACE' (point of a loop
+    triangle given by its barycentric weights). The topology each element type needs is read once
+    with foreach_get, whatever the number of marks. Raises IndexError for elements the mesh lacks.
+    'CACHED' marks (deleted vertices, see _remap_stable_indices) use no vertex at all.
+    """
+    topology = {}
+    weights = []
+    for mark in marks:
+        if not isinstance(mark, tuple):
+            weights.append((np.array([mark]), np.ones(1)))
+            continue
+        
+        element, index, barycentric = mark
+        if element == 'CACHED':
+            weights.append((np.empty(0, dtype=np.int64), np.empty(0)))
+        elif element == 'EDGE':
+            if 'EDGE' not in topology:
+                topology['EDGE'] = _foreach_array(mesh.edges, "vertices", 2)
+            weights.append((topology['EDGE'][index], np.full(2, 0.5)))
+        elif element == 'FACE':
+            if 'FACE' not in topology:
+                topology['FACE'] = (_foreach_array(mesh.polygons, "loop_start"),
+                                    _foreach_array(mesh.polygons, "loop_total"),
+                                    _foreach_array(mesh.loops, "vertex_index"))
+            loop_start, loop_total, loop_vertices = topology['FACE']
+            start, total = loop_start[index], loop_total[index]
+            weights.append((loop_vertices[start:start + total], np.full(total, 1.0 / total)))
+        elif element == 'SURFACE':
+            if 'SURFACE' not in topology:
+                topology['SURFACE'] = _mesh_triangles(mesh)
+            weights.append((topology['SURFACE'][index], np.array(barycentric, dtype=np.float64)))
+        else:
+            members = _vertex_group_members(mesh, index)
+            if len(members) == 0:
+                raise IndexError(f"vertex group {index} has no vertices")
+            weights.append((members, np.full(len(members), 1.0 / len(members))))
+    return weights
+
+
+def _local_mark_points(obj, marks, depsgraph=None):
+    """Return the local positions of vertex or element marks of a mesh object as an (N, 3) array"""
+    if not any(isinstance(mark, tuple) for mark in marks):
+        # Plain vertex marks only touch the marked vertices
+        _, vertices = _resolve_geometry(obj, depsgraph)
+        return np.array([vertices[index].co for index in marks], dtype=np.float64).reshape(-1, 3)
+    if depsgraph is None and obj.mode == 'EDIT' and not any(mark[0] == 'SURFACE' for mark in marks
+                                                             if isinstance(mark, tuple)):
+        # Edge, face and group marks are read from the edit mesh; surface triangles need the mesh
+        import bmesh
+        return _edit_mark_points(bmesh.from_edit_mesh(obj.data), marks)
+    
+    mesh = _resolve_mesh(obj, depsgraph)
+    coords = _mesh_coords(mesh)
+    return np.array([mark[2] if isinstance(mark, tuple) and mark[0] == 'CACHED' else weight @ coords[ids]
+                     for mark, (ids, weight) in zip(marks, _mark_vertex_weights(mesh, marks))],
+                    dtype=np.float64).reshape(-1, 3)
+
+
+# Integer vertex attribute holding the stable ID of marked vertices (0: never marked). Attribute
+# values travel with their vertex through edits, so a mark can find its vertex after indices shift.
+STABLE_ID_ATTRIBUTE = "vertex_align_id"
+# Mesh ID property holding the next free stable ID
+STABLE_ID_COUNTER = "vertex_align_next_id"
+
+# {mesh data pointer: {stable ID: vertex indices}}, dropped when the geometry changes
+_stable_id_cache = {}
+
+
+def _stable_id_at(obj, index):
+    """Return the stable ID stored on one vertex of a mesh object (0 when it has none)"""
+    if obj.mode == 'EDIT':
+        import bmesh
+        verts = bmesh.from_edit_mesh(obj.data).verts
+        layer = verts.layers.int.get(STABLE_ID_ATTRIBUTE)
+        if layer is None or index >= len(verts):
+            return 0
+        verts.ensure_lookup_table()
+        return verts[index][layer]
+    attribute = obj.data.attributes.get(STABLE_ID_ATTRIBUTE)
+    if attribute is None or index >= len(attribute.data):
+        return 0
+    return attribute.data[index].value
+
+
+def _stable_id_map(obj):
+    """Return {stable ID: vertex indices} of a mesh object, cached until its geometry changes
+
+    The base mesh is read with one foreach_get. In Edit Mode the int layer of the edit mesh is read
+    directly, without writing the edit mesh back to the datablock first.
+    """
+    key = obj.data.as_pointer()
+    id_map = _stable_id_cache.get(key)
+    if id_map is None:
+        id_map = {}
+        ids = None
+        if obj.mode == 'EDIT':
+            import bmesh
+            verts = bmesh.from_edit_mesh(obj.data).verts
+            layer = verts.layers.int.get(STABLE_ID_ATTRIBUTE)
+            if layer is not None:
+                ids = np.fromiter((vert[layer] for vert in verts), dtype=np.int64, count=len(verts))
+        else:
+            attribute = obj.data.attributes.get(STABLE_ID_ATTRIBUTE)
+            if attribute is not None:
+                ids = _foreach_array(attribute.data, "value")
+        if ids is not None:
+            marked = np.flatnonzero(ids)
+            for index, uid in zip(marked.tolist(), ids[marked].tolist()):
+                id_map.setdefault(uid, []).append(index)
+        _stable_id_cache[key] = id_map
+    return id_map
+
+
+def _next_stable_id(obj):
+    """Return a new stable ID for a mesh object, from a counter kept on the mesh datablock"""
+    mesh = obj.data
+    uid = mesh.get(STABLE_ID_COUNTER)
+    if uid is None:
+        # Meshes marked before the counter existed continue after their largest ID (read once)
+        if obj.mode == 'EDIT':
+            import bmesh
+            has_ids = bmesh.from_edit_mesh(mesh).verts.layers.int.get(STABLE_ID_ATTRIBUTE) is not None
+        else:
+            has_ids = mesh.attributes.get(STABLE_ID_ATTRIBUTE) is not None
+        uid = max(_stable_id_map(obj), default=0) + 1 if has_ids else 1
+    mesh[STABLE_ID_COUNTER] = uid + 1
+    return uid
+
+
+def _assign_stable_id(obj, index):
+    """Give a vertex of a mesh object a stable ID; return (ID, local coordinate)
+
+    A vertex that already carries an ID keeps it, otherwise the next ID of the mesh counter is
+    written, so marking costs a few element reads whatever the mesh size. Extrude/duplicate copies
+    sharing an ID are told apart by the recorded coordinate when marks are remapped.
+    """
+    previous = _stable_id_at(obj, index)
+    if previous != 0:
+        if obj.mode == 'EDIT':
+            import bmesh
+            verts = bmesh.from_edit_mesh(obj.data).verts
+            verts.ensure_lookup_table()
+            return previous, tuple(verts[index].co)
+        return previous, tuple(obj.data.vertices[index].co)
+    
+    uid = _next_stable_id(obj)
+    if obj.mode == 'EDIT':
+        import bmesh
+        verts = bmesh.from_edit_mesh(obj.data).verts
+        layer = verts.layers.int.get(STABLE_ID_ATTRIBUTE) or verts.layers.int.new(STABLE_ID_ATTRIBUTE)
+        verts.ensure_lookup_table()
+        verts[index][layer] = uid
+        co = verts[index].co
+    else:
+        attribute = obj.data.attributes.get(STABLE_ID_ATTRIBUTE)
+        if attribute is None:
+            attribute = obj.data.attributes.new(STABLE_ID_ATTRIBUTE, 'INT', 'POINT')
+        attribute.data[index].value = uid
+        co = obj.data.vertices[index].co
+    
+    # Keep a cached ID map in step instead of reading the whole mesh again for the next remap
+    id_map = _stable_id_cache.get(obj.data.as_pointer())
+    if id_map is not None:
+        id_map[uid] = [index]
+    return uid, tuple(co)
+
+
+def _remap_stable_indices(obj, indices, anchors):
+    """Return the marks with vertex indices that no longer hold their stable ID replaced
+
+    anchors holds, per slot, the index, local coordinate and stable ID recorded at marking time. A
+    vertex that still carries its ID costs one attribute read. Otherwise the ID is looked up in the
+    cached ID map of the mesh; when extruded copies share it, the copy closest to the recorded
+    coordinate wins. A vertex that was deleted becomes a 'CACHED' mark at its recorded coordinate.
+    """
+    remapped = []
+    for slot, index in enumerate(indices):
+        anchor = anchors[slot] if slot < len(anchors) else None
+        if isinstance(index, tuple) or anchor is None or anchor.uid == 0 or _stable_id_at(obj, index) == anchor.uid:
+            remapped.append(index)
+            continue
+        
+        candidates = _stable_id_map(obj).get(anchor.uid, [])
+        if len(candidates) == 1:
+            remapped.append(candidates[0])
+        elif candidates:
+            _, vertices = _resolve_geometry(obj)
+            coords = np.array([vertices[candidate].co for candidate in candidates], dtype=np.float64)
+            remapped.append(candidates[int(np.argmin(np.linalg.norm(coords - np.array(anchor.co), axis=1)))])
+        else:
+            remapped.append(('CACHED', index, tuple(anchor.co)))
+    return remapped
+
+
+def _store_stable_id(scene, obj, prefix, slot, index=None):
+    """Record the stable ID and local coordinate of mark slot 1-3, or clear them when index is None"""
+    anchors = getattr(scene, f"vertex_align_{prefix}_anchors")
+    while len(anchors) < 3:
+        anchors.add()
+    anchor = anchors[slot - 1]
+    if index is None:
+        anchor.index = -1
+        anchor.uid = 0
+        return
+    anchor.index = index
+    anchor.uid, anchor.co = _assign_stable_id(obj, index)
+
+
+def _ray_triangle_hit(coords, triangles, origin, direction):
+    """Return (triangle index, barycentric weights) of the nearest hit of a ray on triangles, or None
+
+    Moller-Trumbore intersection of one ray against every triangle at once.
+    """
+    v0 = coords[triangles[:, 0]]
+    edge1 = coords[triangles[:, 1]] - v0
+    edge2 = coords[triangles[:, 2]] - v0
+    p = np.cross(direction, edge2)
+    det = np.einsum('ij,ij->i', edge1, p)
+    valid = np.abs(det) > 1e-12
+    inv_det = np.zeros_like(det)
+    inv_det[valid] = 1.0 / det[valid]
+    
+    to_origin = origin - v0
+    u = np.einsum('ij,ij->i', to_origin, p) * inv_det
+    q = np.cross(to_origin, edge1)
+    v = (q @ direction) * inv_det
+    distance = np.einsum('ij,ij->i', edge2, q) * inv_det
+    
+    hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (distance > 0.0)
+    if not hit.any():
+        return None
+    index = int(np.flatnonzero(hit)[np.argmin(distance[hit])])
+    return index, (float(1.0 - u[index] - v[index]), float(u[index]), float(v[index]))
+
+
+def _cached_marked_points(obj, indices, depsgraph=None):
+    """Return the (read-only) world points of the given marks of a mesh object, cached
+
+    Local positions are cached separately (matrix slot None) so moving an object does not
+    resolve its element marks again.
+    """
+    kind, _ = _resolve_geometry(obj, depsgraph)
+    matrix = _matrix_to_array(obj.matrix_world)
+    key = (obj.as_pointer(), obj.data.as_pointer(), kind, tuple(indices), hash(matrix.tobytes()))
+    points = _point_cache.get(key)
+    if points is None:
+        local_key = key[:4] + (None,)
+        local_points = _point_cache.get(local_key)
+        if local_points is None:
+            local_points = _local_mark_points(obj, indices, depsgraph)
+            _point_cache.put(local_key, local_points)
+        points = _transform_points(matrix, local_points)
+        points.flags.writeable = False
+        _point_cache.put(key, points)
+    return points
+
+
+def _world_points(obj, indices, depsgraph=None):
+    """Return the world-space positions of the given marks of a mesh object as an (N, 3) array"""
+    return _cached_marked_points(obj, indices, depsgraph)
+
+
+def _pad_points(points):
+    """Pad a list of 1 to 3 points to a (3, 3) array by repeating the first point"""
+    padded = np.empty((3, 3), dtype=np.float64)
+    padded[:] = points[0]
+    padded[:len(points)] = points[:3]
+    return padded
+
+
+def _normalize(vectors):
+    """Normalize an (N, 3) array of vectors, leaving zero-length vectors at zero"""
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors), where=lengths > 1e-12)
+
+
+def _rotation_between(source_dirs, target_dirs):
+    """Return the (N, 3, 3) shortest-arc rotations turning unit source directions onto unit target directions"""
+    count = len(source_dirs)
+    cross = np.cross(source_dirs, target_dirs)
+    cos_angle = np.einsum('ij,ij->i', source_dirs, target_dirs)
+    
+    skew = np.zeros((count, 3, 3))
+    skew[:, 0, 1] = -cross[:, 2]
+    skew[:, 0, 2] = cross[:, 1]
+    skew[:, 1, 0] = cross[:, 2]
+    skew[:, 1, 2] = -cross[:, 0]
+    skew[:, 2, 0] = -cross[:, 1]
+    skew[:, 2, 1] = cross[:, 0]
+    
+    # Rodrigues formula without trigonometry: R = I + K + K² / (1 + cos)
+    opposite = cos_angle < -1.0 + 1e-9
+    scale = np.zeros(count)
+    np.divide(1.0, 1.0 + cos_angle, out=scale, where=~opposite)
+    rotations = np.eye(3) + skew + (skew @ skew) * scale[:, None, None]
+    
+    if opposite.any():
+        # Opposite directions: turn 180° around any axis perpendicular to the source direction
+        dirs = source_dirs[opposite]
+        helper = np.where(np.abs(dirs[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+        axes = _normalize(np.cross(dirs, helper))
+        rotations[opposite] = 2.0 * axes[:, :, None] * axes[:, None, :] - np.eye(3)
+    
+    return rotations
+
+
+def _rotation_around_axis(axes, angles):
+    """Return the (N, 3, 3) rotations of the given angles around unit axes"""
+    count = len(axes)
+    x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+    cos_a = np.cos(angles)
+    sin_a = np.sin(angles)
+    one_minus = 1.0 - cos_a
+    
+    rotations = np.empty((count, 3, 3))
+    rotations[:, 0, 0] = cos_a + x * x * one_minus
+    rotations[:, 0, 1] = x * y * one_minus - z * sin_a
+    rotations[:, 0, 2] = x * z * one_minus + y * sin_a
+    rotations[:, 1, 0] = y * x * one_minus + z * sin_a
+    rotations[:, 1, 1] = cos_a + y * y * one_minus
+    rotations[:, 1, 2] = y * z * one_minus - x * sin_a
+    rotations[:, 2, 0] = z * x * one_minus - y * sin_a
+    rotations[:, 2, 1] = z * y * one_minus + x * sin_a
+    rotations[:, 2, 2] = cos_a + z * z * one_minus
+    return rotations
+
+
+def compute_alignment_transforms(source_points, target_points, point_counts=3):
+    """Return the (N, 4, 4) world-space transforms moving N source point sets onto their target point sets
+
+    source_points and target_points are (N, 3, 3) arrays holding vertices 1, 2 and 3 of each pair.
+    point_counts (an int or an (N,) array) selects the mode of each pair:
+    1 = position only, 2 = position + rotation of the 1→2 direction,
+    3 = full rotation (1→2 direction first, then roll around that axis to match vertex 3).
+    Unused points are ignored. Each transform is meant to be left-multiplied with the
+    source object's matrix_world.
+    """
+    source_points = np.asarray(source_points, dtype=np.float64).reshape(-1, 3, 3)
+    target_points = np.asarray(target_points, dtype=np.float64).reshape(-1, 3, 3)
+    count = len(source_points)
+    point_counts = np.broadcast_to(np.asarray(point_counts), (count,))
+    
+    source_v1 = source_points[:, 0]
+    target_v1 = target_points[:, 0]
+    rotations = np.broadcast_to(np.eye(3), (count, 3, 3)).copy()
+    
+    # Rotate the 1→2 direction onto the target direction
+    use_direction = point_counts >= 2
+    if use_direction.any():
+        source_dir = _normalize(source_points[use_direction, 1] - source_v1[use_direction])
+        target_dir = _normalize(target_points[use_direction, 1] - target_v1[use_direction])
+        rotations[use_direction] = _rotation_between(source_dir, target_dir)
+    
+    # Roll around the (now shared) 1→2 axis so that vertex 3 lands in the target plane
+    use_plane = point_counts >= 3
+    if use_plane.any():
+        axis = _normalize(target_points[use_plane, 1] - target_v1[use_plane])
+        v1_to_v3_source = np.einsum('nij,nj->ni', rotations[use_plane],
+                                    source_points[use_plane, 2] - source_v1[use_plane])
+        v1_to_v3_target = target_points[use_plane, 2] - target_v1[use_plane]
+        perp_source = v1_to_v3_source - np.einsum('ij,ij->i', v1_to_v3_source, axis)[:, None] * axis
+        perp_target = v1_to_v3_target - np.einsum('ij,ij->i', v1_to_v3_target, axis)[:, None] * axis
+        
+        # Skip the roll when vertex 3 is (nearly) on the 1→2 axis
+        valid = ((np.linalg.norm(perp_source, axis=1) > 0.0001) &
+                 (np.linalg.norm(perp_target, axis=1) > 0.0001))
+        angles = np.arctan2(np.einsum('ij,ij->i', np.cross(perp_source, perp_target), axis),
+                            np.einsum('ij,ij->i', perp_source, perp_target))
+        angles = np.where(valid, angles, 0.0)
+        rotations[use_plane] = _rotation_around_axis(axis, angles) @ rotations[use_plane]
+    
+    # Rotate around source vertex 1, then move it onto target vertex 1
+    transforms = np.broadcast_to(np.eye(4), (count, 4, 4)).copy()
+    transforms[:, :3, :3] = rotations
+    transforms[:, :3, 3] = target_v1 - np.einsum('nij,nj->ni', rotations, source_v1)
+    return transforms
+
+
+def _parent_space(obj):
+    """Return the world matrix of the space obj.matrix_basis is expressed in, before constraints"""
+    if obj.parent is None:
+        return np.eye(4)
+    if obj.parent_type == 'OBJECT':
+        return _matrix_to_array(obj.parent.matrix_world) @ _matrix_to_array(obj.matrix_parent_inverse)
+    # Bone and vertex parents: recover the parent space from the current matrices
+    return _matrix_to_array(obj.matrix_world) @ np.linalg.inv(_matrix_to_array(obj.matrix_basis))
+
+
+def _basis_world(obj):
+    """Return the world matrix of an object before its constraints are applied"""
+    return _parent_space(obj) @ _matrix_to_array(obj.matrix_basis)
+
+
+def _hierarchy_root(obj):
+    """Return the top-most parent of an object (the object itself when it has no parent)"""
+    while obj.parent is not None:
+        obj = obj.parent
+    return obj
+
+
+def _write_world_matrices(objects, matrices):
+    """Give objects the (N, 4, 4) world matrices (before constraints) in a single pass
+
+    Each matrix is turned into matrix_basis through the parent matrix and matrix_parent_inverse
+    instead of being assigned to matrix_world, so parented and constrained objects land with one
+    write. Ancestors are handled first: an object moved together with one of its ancestors is
+    placed relative to where that ancestor goes, not where it was. The view layer is updated once
+    afterwards, so matrix_world is current when this returns.
+    """
+    def depth(obj):
+        return 0 if obj.parent is None else depth(obj.parent) + 1
+    
+    deltas = {}
+    bases = []
+    for number in sorted(range(len(objects)), key=lambda number: depth(objects[number])):
+        obj = objects[number]
+        parent_space = _parent_space(obj)
+        ancestor = obj.parent
+        while ancestor is not None and ancestor.as_pointer() not in deltas:
+            ancestor = ancestor.parent
+        new_parent_space = parent_space if ancestor is None else deltas[ancestor.as_pointer()] @ parent_space
+        bases.append((obj, np.linalg.inv(new_parent_space) @ matrices[number]))
+        deltas[obj.as_pointer()] = matrices[number] @ np.linalg.inv(parent_space @ _matrix_to_array(obj.matrix_basis))
+    
+    for obj, basis in bases:
+        obj.matrix_basis = mathutils.Matrix(basis.tolist())
+    # matrix_world only follows matrix_basis once the depsgraph is evaluated; one update for the
+    # whole batch keeps later reads (manifest rows, logs, benchmarks) on the new placement
+    with _profiler.phase("align.depsgraph_update"):
+        bpy.context.view_layer.update()
+    # Marked points of moved objects are shown in the panel
+    _invalidate_panel_status()
+
+
+def apply_alignment_transforms(objects, transforms, use_hierarchy_root=False):
+    """Left-multiply each object's world matrix by its (4, 4) alignment transform in a single pass
+
+    With use_hierarchy_root, the top-most parent of each object is moved instead, carrying the
+    whole hierarchy with one matrix write (the first transform wins when objects share a root).
+    """
+    if use_hierarchy_root:
+        roots = {}
+        for obj, transform in zip(objects, transforms):
+            roots.setdefault(_hierarchy_root(obj), transform)
+        objects, transforms = list(roots), list(roots.values())
+    if not objects:
+        return
+    matrices = np.array([_basis_world(obj) for obj in objects], dtype=np.float64)
+    _write_world_matrices(objects, np.asarray(transforms) @ matrices)
+
+
+def apply_local_transform(objects, local_transform, use_hierarchy_root=False):
+    """Right-multiply every object's matrix_world by the same (4, 4) local-space transform
+
+    Used to propagate one solved alignment to all instances of the same geometry: each instance
+    moves relative to its own placement, exactly as the solved instance did. With
+    use_hierarchy_root the top-most parent of each instance carries its move instead.
+    Returns the (N, 4, 4) world-space moves of the objects.
+    """
+    if not objects:
+        return np.empty((0, 4, 4))
+    matrices = np.array([_basis_world(obj) for obj in objects], dtype=np.float64)
+    transforms = matrices @ np.asarray(local_transform) @ np.linalg.inv(matrices)
+    apply_alignment_transforms(objects, transforms, use_hierarchy_root)
+    return transforms
+
+
+def alignment_residuals(transforms, source_points, target_points):
+    """Return the RMS distance between transformed source points and target points for each pair
+
+    transforms is (N, 4, 4), source_points and target_points are (N, K, 3) arrays of the points used.
+    """
+    transforms = np.asarray(transforms, dtype=np.float64).reshape(-1, 4, 4)
+    source_points = np.asarray(source_points, dtype=np.float64).reshape(len(transforms), -1, 3)
+    target_points = np.asarray(target_points, dtype=np.float64).reshape(len(transforms), -1, 3)
+    moved = np.einsum('nij,nkj->nki', transforms[:, :3, :3], source_points) + transforms[:, None, :3, 3]
+    return np.sqrt(np.mean(np.sum((moved - target_points) ** 2, axis=2), axis=1))
+
+
+def compute_best_fit_transforms(source_points, target_points, use_scale=False):
+    """Return least-squares transforms and RMS residuals for N point correspondences (Kabsch/Umeyama)
+
+    source_points and target_points are (N, 3) arrays, or (B, N, 3) arrays to solve B sets at once,
+    with N >= 3 matching rows. Rotation, translation and, with use_scale, a uniform scale are solved
+    in a single closed-form SVD step, so the error is spread over all points instead of pushed onto
+    the last ones. Returns ((B, 4, 4) transforms, (B,) RMS residuals).
+    """
+    source_points = np.asarray(source_points, dtype=np.float64)
+    target_points = np.asarray(target_points, dtype=np.float64)
+    if source_points.ndim == 2:
+        source_points = source_points[None]
+        target_points = target_points[None]
+    
+    source_center = source_points.mean(axis=1)
+    target_center = target_points.mean(axis=1)
+    source_centered = source_points - source_center[:, None]
+    target_centered = target_points - target_center[:, None]
+    
+    # Cross-covariance target x source, decomposed as U·D·Vᵀ
+    covariance = np.einsum('bni,bnj->bij', target_centered, source_centered) / source_points.shape[1]
+    u, d, vt = np.linalg.svd(covariance)
+    
+    # Guard against reflections: flip the weakest axis when the best orthogonal fit is improper
+    signs = np.ones((len(covariance), 3))
+    signs[:, 2] = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+    signs[signs[:, 2] == 0, 2] = 1.0
+    rotations = (u * signs[:, None, :]) @ vt
+    
+    if use_scale:
+        source_variance = np.einsum('bni,bni->b', source_centered, source_centered) / source_points.shape[1]
+        scales = np.divide((d * signs).sum(axis=1), source_variance,
+                           out=np.ones(len(covariance)), where=source_variance > 1e-12)
+    else:
+        scales = np.ones(len(covariance))
+    
+    linear = rotations * scales[:, None, None]
+    transforms = np.broadcast_to(np.eye(4), (len(covariance), 4, 4)).copy()
+    transforms[:, :3, :3] = linear
+    transforms[:, :3, 3] = target_center - np.einsum('bij,bj->bi', linear, source_center)
+    
+    fitted = np.einsum('bij,bnj->bni', linear, source_points) + transforms[:, None, :3, 3]
+    residuals = np.sqrt(np.mean(np.sum((fitted - target_points) ** 2, axis=2), axis=1))
+    return transforms, residuals
+
+
+def ransac_alignment(source_points, target_points, threshold, max_iterations=1000, confidence=0.999,
+                     use_scale=False, seed=0):
+    """Return a best-fit transform that ignores wrong correspondences (RANSAC)
+
+    source_points and target_points are (N, 3) arrays of candidate pairs, N >= 3, some of which may
+    be wrong. Hypotheses are solved from random 3-pair samples in batches, every pair is scored against
+    each of them in one vectorized residual pass, and pairs within threshold of their target count as
+    inliers. The hypothesis with the lowest truncated squared error wins, and the transform is refit on
+    its inliers until the inlier set settles. Sampling stops after max_iterations hypotheses, or earlier
+    once enough were drawn to find an all-inlier sample with the given confidence. The fixed seed keeps
+    results reproducible.
+    Returns ((4, 4) transform, (N,) boolean inlier mask, RMS residual over the inliers, hypotheses drawn).
+    Raises ValueError when fewer than 3 pairs are given, the threshold is not positive, every sample is
+    degenerate (collinear) or fewer than 3 pairs agree with the best hypothesis.
+    """
+    source_points = np.asarray(source_points, dtype=np.float64)
+    target_points = np.asarray(target_points, dtype=np.float64)
+    count = min(len(source_points), len(target_points))
+    if count < 3:
+        raise ValueError("RANSAC needs at least 3 point pairs")
+    if not threshold > 0.0:
+        raise ValueError("Inlier distance must be positive")
+    source_points = source_points[:count]
+    target_points = target_points[:count]
+    
+    rng = np.random.default_rng(seed)
+    threshold_squared = float(threshold) ** 2
+    # Collinear samples leave the rotation around their line undefined
+    min_area = 1e-12 * max(float(np.ptp(source_points, axis=0).max()) ** 2, 1e-12)
+    # Hypotheses scored per batch, bounded so the (batch, N, 3) residual array stays around 100 MB
+    batch_size = int(max(1, min(256, 2 ** 22 // count)))
+    
+    best_cost = np.inf
+    best_mask = None
+    drawn = 0
+    required = max_iterations
+    while drawn < min(required, max_iterations):
+        size = min(batch_size, max_iterations - drawn)
+        drawn += size
+        
+        samples = rng.integers(0, count, size=(size, 3))
+        distinct = (samples[:, 0] != samples[:, 1]) & (samples[:, 0] != samples[:, 2]) & (samples[:, 1] != samples[:, 2])
+        sampled = source_points[samples]
+        areas = np.linalg.norm(np.cross(sampled[:, 1] - sampled[:, 0], sampled[:, 2] - sampled[:, 0]), axis=1)
+        samples = samples[distinct & (areas > min_area)]
+        if not len(samples):
+            continue
+        
+        hypotheses, _ = compute_best_fit_transforms(source_points[samples], target_points[samples], use_scale)
+        moved = np.einsum('bij,nj->bni', hypotheses[:, :3, :3], source_points) + hypotheses[:, None, :3, 3]
+        errors = np.sum((moved - target_points) ** 2, axis=2)
+        costs = np.minimum(errors, threshold_squared).sum(axis=1)
+        
+        best = int(np.argmin(costs))
+        if costs[best] < best_cost:
+            best_cost = costs[best]
+            best_mask = errors[best] <= threshold_squared
+            # Hypotheses needed to draw one all-inlier sample with the requested confidence
+            inlier_ratio = best_mask.mean()
+            if inlier_ratio >= 1.0:
+                required = 0
+            elif inlier_ratio > 0.0:
+                required = int(np.ceil(np.log(1.0 - confidence) / np.log(1.0 - inlier_ratio ** 3)))
+    
+    if best_mask is None:
+        raise ValueError("Point pairs are degenerate (collinear)")
+    if best_mask.sum() < 3:
+        # A refit on 1-2 pairs leaves the rotation undefined
+        raise ValueError(f"Only {int(best_mask.sum())} pairs agree within the inlier distance, at least 3 are needed")
+    
+    # Refit on the inliers until the inlier set stops changing
+    mask = best_mask
+    for _ in range(10):
+        transforms, _ = compute_best_fit_transforms(source_points[mask], target_points[mask], use_scale)
+        errors = np.sum((_transform_points(transforms[0], source_points) - target_points) ** 2, axis=1)
+        refit_mask = errors <= threshold_squared
+        if np.array_equal(refit_mask, mask) or refit_mask.sum() < 3:
+            break
+        mask = refit_mask
+    
+    residual = float(np.sqrt(errors[mask].mean()))
+    return transforms[0], mask, residual, drawn
+
+
+def _axis_aligned_rotations():
+    """Return the 24 (3, 3) rotations mapping the coordinate axes onto themselves"""
+    rotations = []
+    for order in itertools.permutations(range(3)):
+        for signs in itertools.product((1.0, -1.0), repeat=3):
+            rotation = np.zeros((3, 3))
+            rotation[range(3), order] = signs
+            if np.linalg.det(rotation) > 0.0:
+                rotations.append(rotation)
+    return np.array(rotations)
+
+
+def alignment_candidates(source_points, target_points, use_mirror=False):
+    """Return (C, 4, 4) discrete alternatives to the 1-3 point alignment of source_points onto target_points
+
+    Every order of the target points is tried (swapped anchors). Each solution is then rolled in 90°
+    steps around its target 1→2 axis, the roll two points leave undefined, or with a single point
+    turned to each of the 24 axis-aligned orientations around it. With use_mirror the candidates are
+    repeated mirrored across a plane containing that axis, which gives the object a negative scale.
+    Duplicate transforms are dropped, the unmodified solution comes first.
+    """
+    count = min(len(source_points), len(target_points), 3)
+    source_points = np.asarray(source_points, dtype=np.float64)[:count]
+    target_points = np.asarray(target_points, dtype=np.float64)[:count]
+    
+    orders = [list(order) for order in itertools.permutations(range(count))]
+    bases = compute_alignment_transforms(np.repeat(_pad_points(source_points)[None], len(orders), axis=0),
+                                         np.array([_pad_points(target_points[order]) for order in orders]), count)
+    pivots = target_points[[order[0] for order in orders]]
+    if count == 1:
+        turns = np.broadcast_to(_axis_aligned_rotations(), (len(orders), 24, 3, 3))
+        normals = np.array([[1.0, 0.0, 0.0]])
+    else:
+        axes = _normalize(np.array([target_points[order[1]] - target_points[order[0]] for order in orders]))
+        turns = _rotation_around_axis(np.repeat(axes, 4, axis=0),
+                                      np.tile(np.arange(4) * (np.pi / 2.0), len(orders))).reshape(len(orders), 4, 3, 3)
+        helper = np.where(np.abs(axes[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+        normals = _normalize(np.cross(axes, helper))
+    if use_mirror:
+        mirrors = np.eye(3) - 2.0 * normals[:, :, None] * normals[:, None, :]
+        turns = np.concatenate([turns, turns @ mirrors[:, None]], axis=1)
+    
+    # Turn each solution around its target vertex 1: x -> p + turn·(R·x + t - p)
+    candidates = np.broadcast_to(np.eye(4), turns.shape[:2] + (4, 4)).copy()
+    candidates[:, :, :3, :3] = turns @ bases[:, None, :3, :3]
+    candidates[:, :, :3, 3] = pivots[:, None] + np.einsum('ptij,pj->pti', turns, bases[:, :3, 3] - pivots)
+    candidates = candidates.reshape(-1, 4, 4)
+    
+    extent = max(float(np.abs(target_points).max()), 1.0)
+    keys = candidates[:, :3].copy()
+    keys[:, :, 3] /= extent
+    _, first = np.unique(np.round(keys.reshape(len(candidates), -1), 6) + 0.0, axis=0, return_index=True)
+    return candidates[np.sort(first)]
+
+
+def voxel_overlap(transforms, source_points, target_points, voxel_size):
+    """Return the fraction of source points each transform moves into a voxel holding a target point
+
+    transforms is (C, 4, 4), source_points (S, 3) and target_points (T, 3) are world-space samples.
+    Target voxels are hashed once and the C x S moved points are looked up with a single np.isin.
+    """
+    origin = target_points.min(axis=0)
+    target_cells = np.floor((target_points - origin) / voxel_size).astype(np.int64)
+    dims = target_cells.max(axis=0) + 1
+    
+    def cell_keys(cells):
+        return (cells[..., 0] * dims[1] + cells[..., 1]) * dims[2] + cells[..., 2]
+    
+    occupied = np.unique(cell_keys(target_cells))
+    moved = np.einsum('cij,sj->csi', transforms[:, :3, :3], source_points) + transforms[:, None, :3, 3]
+    cells = np.floor((moved - origin) / voxel_size).astype(np.int64)
+    inside = np.all((cells >= 0) & (cells < dims), axis=2)
+    hits = np.zeros(inside.shape, dtype=bool)
+    hits[inside] = np.isin(cell_keys(cells[inside]), occupied)
+    return hits.mean(axis=1)
+
+
+def rank_alignment_candidates(source_points, target_points, source_samples, target_samples,
+                              use_mirror=False, voxel_size=None):
+    """Return (transforms, overlaps, residuals) of the candidate alignments, best first
+
+    source_points / target_points are the 1-3 marked world points, source_samples / target_samples
+    world-space vertices of both meshes. The residual of a candidate is measured to the nearest
+    target point, so swapped anchors score like the original order. Candidates fitting the points
+    as well as the best one come first, ranked by voxel overlap with the target (voxel_size defaults
+    to 1/32 of the target diagonal), the others follow by residual.
+    """
+    candidates = alignment_candidates(source_points, target_points, use_mirror)
+    count = min(len(source_points), len(target_points), 3)
+    moved = np.einsum('cij,mj->cmi', candidates[:, :3, :3], source_points[:count]) + candidates[:, None, :3, 3]
+    nearest = np.linalg.norm(moved[:, :, None] - target_points[None, None, :count], axis=3).min(axis=2)
+    residuals = np.sqrt(np.mean(nearest ** 2, axis=1))
+    
+    diagonal = float(np.linalg.norm(np.ptp(target_samples, axis=0)))
+    if voxel_size is None:
+        voxel_size = diagonal / 32.0 if diagonal > 0.0 else 1.0
+    overlaps = voxel_overlap(candidates, source_samples, target_samples, voxel_size)
+    
+    tolerance = 1e-3 * max(diagonal, 1e-6)
+    worse = residuals > residuals.min() + tolerance
+    order = np.lexsort((residuals, np.where(worse, residuals, -overlaps), worse))
+    return candidates[order], overlaps[order], residuals[order]
+
+
+# KD-trees over target meshes, keyed by mesh data pointer: {pointer: (vertex count, kdtree, local coordinates)}
+_kdtree_cache = {}
+
+
+def _mesh_coords(mesh):
+    """Return all vertex coordinates of a mesh as an (N, 3) array with a single foreach_get"""
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3)
+
+
+def _get_kdtree(obj, depsgraph=None):
+    """Return (kdtree, local coordinates) for a mesh object, building the tree only when the geometry changed
+
+    Geometry edits drop the cached tree from the depsgraph update handler (_invalidate_geometry), so
+    a cache hit reads no coordinates. The vertex count is compared as a cheap guard for edits made
+    while the handler is not registered (scripts).
+    """
+    # The base mesh may be shared by linked duplicates, evaluated geometry belongs to the object
+    key = obj.data.as_pointer() if depsgraph is None else obj.as_pointer()
+    count = len(_resolve_geometry(obj, depsgraph)[1])
+    
+    cached = _kdtree_cache.get(key)
+    if cached is not None and cached[0] == count:
+        return cached[1], cached[2]
+    
+    coords = _object_coords(obj, depsgraph)
+    tree = KDTree(len(coords))
+    for index, co in enumerate(coords.tolist()):
+        tree.insert(co, index)
+    tree.balance()
+    _kdtree_cache[key] = (len(coords), tree, coords)
+    return tree, coords
+
+
+def _nearest_indices(tree, points):
+    """Return the index of the nearest tree point for each row of an (N, 3) array"""
+    return np.fromiter((tree.find(point)[1] for point in points.tolist()), dtype=np.int64, count=len(points))
+
+
+def _sample_rows(array, count, seed=0):
+    """Return at most count rows of an array, picked with a fixed seed so results are reproducible"""
+    if len(array) <= count:
+        return array
+    rng = np.random.default_rng(seed)
+    return array[np.sort(rng.choice(len(array), count, replace=False))]
+
+
+def _principal_frame(points):
+    """Return the centroid and the (3, 3) principal axes (as columns, largest first) of a point cloud"""
+    center = points.mean(axis=0)
+    centered = points - center
+    _, vectors = np.linalg.eigh(centered.T @ centered)
+    axes = vectors[:, ::-1]
+    if np.linalg.det(axes) < 0:
+        axes[:, 2] = -axes[:, 2]
+    return center, axes
+
+
+def _principal_axes_seeds(source_points, target_points):
+    """Return the 4 candidate transforms matching centroids and principal axes (one per axis sign flip)"""
+    source_center, source_axes = _principal_frame(source_points)
+    target_center, target_axes = _principal_frame(target_points)
+    seeds = []
+    for flips in ((1, 1, 1), (-1, -1, 1), (-1, 1, -1), (1, -1, -1)):
+        rotation = (target_axes * flips) @ source_axes.T
+        transform = np.eye(4)
+        transform[:3, :3] = rotation
+        transform[:3, 3] = target_center - rotation @ source_center
+        seeds.append(transform)
+    return seeds
+
+
+def refine_icp(source_points, target_tree, target_coords, target_matrix, initial_transform,
+               max_iterations=30, tolerance=1e-6):
+    """Refine an alignment with iterative closest point against a KD-tree of the target mesh
+
+    source_points are world-space (N, 3) samples of the source, target_tree / target_coords index the
+    target mesh in its local space and target_matrix is the target's world matrix. Starting from
+    initial_transform, each iteration pairs every sample with its closest target vertex, drops pairs
+    farther than 3x the median distance and solves a best-fit update. Stops early once the RMS
+    residual no longer improves by more than tolerance.
+    Returns (4, 4) world-space transform, RMS residual, iteration count.
+    """
+    target_inverse = np.linalg.inv(target_matrix)
+    transform = np.array(initial_transform, dtype=np.float64)
+    previous_rms = None
+    rms = 0.0
+    iteration = 0
+    
+    for iteration in range(1, max_iterations + 1):
+        moved = _transform_points(transform, source_points)
+        matches = _nearest_indices(target_tree, _transform_points(target_inverse, moved))
+        matched = _transform_points(target_matrix, target_coords[matches])
+        
+        distances = np.linalg.norm(matched - moved, axis=1)
+        keep = distances <= max(3.0 * np.median(distances), 1e-9)
+        if keep.sum() < 3:
+            break
+        
+        update, residuals = compute_best_fit_transforms(moved[keep], matched[keep])
+        transform = update[0] @ transform
+        rms = float(residuals[0])
+        
+        if previous_rms is not None and abs(previous_rms - rms) < tolerance:
+            break
+        previous_rms = rms
+    
+    return transform, rms, iteration
+
+
+# Per-vertex shape descriptors, keyed like _kdtree_cache: {pointer: (vertex count, (N, D) float32 array)}
+_descriptor_cache = {}
+
+# Angles between a vertex normal and its neighbours' normals binned by the normal histogram
+DESCRIPTOR_ANGLE_BINS = np.cos(np.radians([10.0, 30.0, 60.0]))
+
+
+def compute_vertex_descriptors(coords, normals, edges):
+    """Return an (N, 20) float32 array describing the local shape around each vertex
+
+    coords and normals are (N, 3) arrays, edges an (E, 2) array of vertex indices. The first ten
+    columns describe the 1-ring of each vertex: valence, shortest, longest and spread of the incident
+    edge lengths relative to their mean (edge-length signature), mean normal deviation and mean
+    convexity (curvature), and a 4-bin histogram of the angles to the neighbours' normals. The last
+    ten are the same values averaged over the neighbours, which adds 2-ring context. Every column is
+    invariant to rotation, translation and uniform scale, so descriptors of the source and the target
+    can be compared wherever the objects sit. Computed with bincounts, without a Python loop.
+    """
+    count = len(coords)
+    ends = np.concatenate([edges[:, 0], edges[:, 1]])
+    others = np.concatenate([edges[:, 1], edges[:, 0]])
+    offsets = coords[others] - coords[ends]
+    lengths = np.linalg.norm(offsets, axis=1)
+    
+    valence = np.bincount(ends, minlength=count).astype(np.float64)
+    safe_valence = np.maximum(valence, 1.0)
+    mean_length = np.bincount(ends, lengths, minlength=count) / safe_valence
+    safe_mean = np.where(mean_length > 0.0, mean_length, 1.0)
+    spread = np.sqrt(np.maximum(np.bincount(ends, lengths ** 2, minlength=count) / safe_valence - mean_length ** 2, 0.0))
+    shortest = np.full(count, np.inf)
+    np.minimum.at(shortest, ends, lengths)
+    longest = np.zeros(count)
+    np.maximum.at(longest, ends, lengths)
+    shortest[valence == 0] = 0.0
+    
+    dots = np.clip(np.einsum('ij,ij->i', normals[ends], normals[others]), -1.0, 1.0)
+    directions = offsets / np.where(lengths > 0.0, lengths, 1.0)[:, None]
+    convexity = np.einsum('ij,ij->i', normals[ends], directions)
+    bins = np.searchsorted(-DESCRIPTOR_ANGLE_BINS, -dots)
+    histogram = np.bincount(ends * 4 + bins, minlength=count * 4).reshape(count, 4) / safe_valence[:, None]
+    
+    ring = np.column_stack([
+        valence / 6.0,
+        shortest / safe_mean,
+        longest / safe_mean,
+        spread / safe_mean,
+        np.bincount(ends, 1.0 - dots, minlength=count) / safe_valence,
+        np.bincount(ends, convexity, minlength=count) / safe_valence,
+        histogram,
+    ])
+    neighbourhood = np.column_stack([np.bincount(ends, ring[others, column], minlength=count)
+                                     for column in range(ring.shape[1])]) / safe_valence[:, None]
+    return np.hstack([ring, neighbourhood]).astype(np.float32)
+
+
+def _get_descriptors(obj, depsgraph=None):
+    """Return the shape descriptors of a mesh object, computing them only when the geometry changed
+
+    Invalidated like _get_kdtree(): by the depsgraph update handler, with the vertex count as guard.
+    """
+    key = obj.data.as_pointer() if depsgraph is None else obj.as_pointer()
+    count = len(_resolve_geometry(obj, depsgraph)[1])
+    
+    cached = _descriptor_cache.get(key)
+    if cached is not None and cached[0] == count:
+        return cached[1]
+    
+    mesh = _resolve_mesh(obj, depsgraph)
+    coords = _mesh_coords(mesh)
+    normals = np.empty(len(coords) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("normal", normals)
+    descriptors = compute_vertex_descriptors(coords, normals.reshape(-1, 3), _foreach_array(mesh.edges, "vertices", 2))
+    _descriptor_cache[key] = (len(coords), descriptors)
+    return descriptors
+
+
+def _nearest_descriptors(descriptors, queries, count, chunk_size=None, scale=None):
+    """Return ((M, count) row indices, (M, count) distances) of the closest descriptors to each query
+
+    Columns are weighted by the inverse of scale, by default the spread of the searched descriptors
+    (pass the spread of a larger set when searching a handful of rows). Squared distances come
+    from one matrix product per chunk of rows, and only the best count rows of each chunk are kept.
+    By default chunks are sized so the (M, chunk) distance block stays around 128 MB.
+    """
+    scale = descriptors.std(axis=0, dtype=np.float64) if scale is None else np.array(scale, dtype=np.float64)
+    scale[scale < 1e-6] = 1.0
+    queries = np.asarray(queries, dtype=np.float64) / scale
+    query_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+    if chunk_size is None:
+        chunk_size = max(1024, 2 ** 24 // max(len(queries), 1))
+    
+    best_indices = np.empty((len(queries), 0), dtype=np.int64)
+    best_distances = np.empty((len(queries), 0), dtype=np.float64)
+    for start in range(0, len(descriptors), chunk_size):
+        chunk = descriptors[start:start + chunk_size].astype(np.float64) / scale
+        distances = query_norms + np.einsum('ij,ij->i', chunk, chunk)[None] - 2.0 * queries @ chunk.T
+        keep = min(count, chunk.shape[0])
+        rows = np.argpartition(distances, keep - 1, axis=1)[:, :keep]
+        best_indices = np.hstack([best_indices, rows + start])
+        best_distances = np.hstack([best_distances, np.take_along_axis(distances, rows, axis=1)])
+    
+    order = np.argsort(best_distances, axis=1, kind='stable')[:, :count]
+    distances = np.sqrt(np.maximum(np.take_along_axis(best_distances, order, axis=1), 0.0))
+    return np.take_along_axis(best_indices, order, axis=1), distances
+
+
+def suggest_target_vertices(source_obj, source_indices, target_obj, count=5, depsgraph=None):
+    """Return ((M, count) target vertex indices, (M, count) distances) of the best matches, best first
+
+    Each source vertex is matched to the target vertices whose shape descriptor is closest to its own.
+    """
+    source_descriptors = _get_descriptors(source_obj, depsgraph)
+    return _nearest_descriptors(_get_descriptors(target_obj, depsgraph), source_descriptors[source_indices], count)
+
+
+def _consistent_candidates(source_points, candidate_points):
+    """Return the candidate column to use for each source point, keeping source distances best
+
+    source_points is (M, 3), candidate_points (M, K, 3) in world space. Every combination of one
+    candidate per point is scored by how well it preserves the pairwise source distances.
+    """
+    count, choices = candidate_points.shape[:2]
+    if count < 2:
+        return np.zeros(count, dtype=np.int64)
+    combinations = np.indices((choices,) * count).reshape(count, -1).T
+    picked = candidate_points[np.arange(count), combinations]
+    errors = np.zeros(len(combinations))
+    for first in range(count):
+        for second in range(first + 1, count):
+            source_distance = np.linalg.norm(source_points[first] - source_points[second])
+            errors += np.abs(np.linalg.norm(picked[:, first] - picked[:, second], axis=1) - source_distance)
+    return combinations[int(np.argmin(errors))]
+
+
+def descriptor_correspondences(source_obj, target_obj, sample_count=500, ratio=0.9, depsgraph=None, seed=0):
+    """Return (source indices, target indices) of candidate pairs proposed by descriptor matching
+
+    A fixed-seed sample of source vertices is matched to the target vertex with the closest descriptor.
+    Matches that are not clearly better than the runner-up (ratio test) are dropped, which removes
+    flat and repetitive regions. Some pairs are still wrong, so solve them with ransac_alignment.
+    """
+    source_descriptors = _get_descriptors(source_obj, depsgraph)
+    sampled = _sample_rows(np.arange(len(source_descriptors)), sample_count, seed)
+    indices, distances = _nearest_descriptors(_get_descriptors(target_obj, depsgraph), source_descriptors[sampled], 2)
+    if indices.shape[1] < 2:
+        return sampled.tolist(), indices[:, 0].tolist()
+    keep = distances[:, 0] < ratio * distances[:, 1]
+    return sampled[keep].tolist(), indices[keep, 0].tolist()
+
+
+def _selected_vertex_indices(obj, bm, limit=None):
+    """Return the selected vertex indices of a mesh in Edit Mode, in click order
+
+    Clicked vertices come straight from the selection history, so marking does not depend on
+    the mesh size. Only when some selected vertices are missing from the history (box select,
+    select all...) are the select flags read in bulk with foreach_get. At most limit indices
+    are returned.
+    """
+    import bmesh
+    ordered = [elem.index for elem in bm.select_history if isinstance(elem, bmesh.types.BMVert)]
+    wanted = obj.data.total_vert_sel
+    if limit is not None:
+        wanted = min(wanted, limit)
+    if len(ordered) >= wanted:
+        return ordered[:wanted]
+    
+    obj.update_from_editmode()
+    flags = np.zeros(len(obj.data.vertices), dtype=bool)
+    obj.data.vertices.foreach_get("select", flags)
+    seen = set(ordered)
+    ordered.extend(index for index in np.flatnonzero(flags).tolist() if index not in seen)
+    return ordered[:wanted]
+
+
+def _store_marks(scene, obj, prefix, indices):
+    """Store up to 3 vertex indices as the vertex 1-3 marks of 'source' or 'target'"""
+    setattr(scene, f"vertex_align_{prefix}_object", obj.name)
+    for slot in range(1, 4):
+        setattr(scene, f"vertex_align_{prefix}_vertex_{slot}", indices[slot - 1] if slot <= len(indices) else -1)
+    getattr(scene, f"vertex_align_{prefix}_elements").clear()
+    for slot in range(1, 4):
+        _store_stable_id(scene, obj, prefix, slot, indices[slot - 1] if slot <= len(indices) else None)
+    if prefix == "source":
+        obj.vertex_align_source_vertices = [indices[i] if i < len(indices) else -1 for i in range(3)]
+    _invalidate_panel_status()
+
+
+def _set_element_mark(scene, prefix, slot, element=None):
+    """Store the (element, index, barycentric) of a mark slot, or make it a plain vertex mark"""
+    elements = getattr(scene, f"vertex_align_{prefix}_elements")
+    for i in reversed(range(len(elements))):
+        if elements[i].slot == slot:
+            elements.remove(i)
+    if element is not None:
+        item = elements.add()
+        item.slot = slot
+        item.element, _, item.barycentric = element
+
+
+def _mark_vertex(operator, context, prefix, slot, vertex_index=None, element=None):
+    """Shared implementation of the Mark Source/Target Vertex 1-3 operators
+
+    The vertex is taken from the Edit Mode selection unless vertex_index is given. element marks
+    an edge, face, vertex group or surface point instead, as an (element, index, barycentric) tuple.
+    """
+    obj = context.active_object
+    scene = context.scene
+    
+    if obj is None or obj.type != 'MESH':
+        operator.report({'ERROR'}, "No active mesh object")
+        return {'CANCELLED'}
+    
+    if vertex_index is None and element is None and obj.mode != 'EDIT':
+        operator.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
+        return {'CANCELLED'}
+    
+    # Vertices 2 and 3 complete the marks of the same object
+    if slot == 2 and getattr(scene, f"vertex_align_{prefix}_object") != obj.name:
+        operator.report({'ERROR'}, f"Mark {prefix} vertex 1 first on this object")
+        return {'CANCELLED'}
+    
+    if slot == 3:
+        if getattr(scene, f"vertex_align_{prefix}_object") != obj.name:
+            operator.report({'ERROR'}, f"Mark {prefix} vertex 1 and 2 first on this object")
+            return {'CANCELLED'}
+        if getattr(scene, f"vertex_align_{prefix}_vertex_2") < 0:
+            operator.report({'ERROR'}, f"Mark {prefix} vertex 2 first")
+            return {'CANCELLED'}
+    
+    # Vertices found on modifier results have no counterpart on the base mesh to carry a stable ID
+    evaluated = vertex_index is not None and scene.vertex_align_use_evaluated
+    
+    if vertex_index is None and element is None:
+        with _profiler.phase("mark.selection"):
+            import bmesh
+            bm = bmesh.from_edit_mesh(obj.data)
+            selected = _selected_vertex_indices(obj, bm, limit=1)
+        if not selected:
+            operator.report({'ERROR'}, "No vertex selected")
+            return {'CANCELLED'}
+        
+        if obj.data.total_vert_sel > 1:
+            operator.report({'WARNING'}, "Multiple vertices selected, using the first one")
+        
+        vertex_index = selected[0]
+    
+    # Check that it's different from the previous vertices
+    mark = vertex_index if element is None else element
+    previous_marks = _marked_indices(scene, prefix)[:slot - 1]
+    if mark in previous_marks:
+        operator.report({'ERROR'}, f"Vertex {slot} must be different from vertex {previous_marks.index(mark) + 1}")
+        return {'CANCELLED'}
+    
+    with _profiler.phase("mark.store"):
+        if slot == 1:
+            setattr(scene, f"vertex_align_{prefix}_object", obj.name)
+        setattr(scene, f"vertex_align_{prefix}_vertex_{slot}", vertex_index if element is None else element[1])
+        _set_element_mark(scene, prefix, slot, element)
+        _store_stable_id(scene, obj, prefix, slot, None if element is not None or evaluated else vertex_index)
+        if prefix == "source":
+            if element is None:
+                obj.vertex_align_source_vertices[slot - 1] = vertex_index
+            else:
+                # Object marks are vertex indices only, let Batch Align use the scene marks for this object
+                obj.vertex_align_source_vertices = (-1, -1, -1)
+        getattr(scene, f"vertex_align_{prefix}_points").clear()
+        
+        _invalidate_panel_status()
+    
+    if element is None:
+        operator.report({'INFO'}, f"{prefix.title()} vertex {slot} marked: {obj.name}, index {vertex_index}")
+    else:
+        operator.report({'INFO'}, f"{prefix.title()} point {slot} marked: {obj.name}, {_format_mark(mark)}")
+    
+    return {'FINISHED'}
+
+
+def _marked_point_pairs(scene):
+    """Return the (source, target) vertex index lists used by Best Fit alignment
+
+    Uses the point lists set by Mark Points when both exist, otherwise the vertex 1-3 marks.
+    Both lists are truncated to the same length.
+    """
+    source_indices = [item.index for item in scene.vertex_align_source_points]
+    target_indices = [item.index for item in scene.vertex_align_target_points]
+    if not source_indices or not target_indices:
+        source_indices = _marked_indices(scene, "source")
+        target_indices = _marked_indices(scene, "target")
+    count = min(len(source_indices), len(target_indices))
+    return source_indices[:count], target_indices[:count]
+
+
+class VertexAlignPointIndex(PropertyGroup):
+    """Vertex index entry of a marked point list"""
+    index: IntProperty(name="Index", default=-1)
+
+
+class VertexAlignElementMark(PropertyGroup):
+    """Element type and barycentric weights of a mark slot that is not a plain vertex"""
+    slot: IntProperty(name="Slot", default=1, min=1, max=3)
+    element: EnumProperty(
+        name="Element",
+        items=MARK_ELEMENT_ITEMS,
+        default='FACE',
+    )
+    barycentric: FloatVectorProperty(name="Barycentric Weights", size=3)
+
+
+class VertexAlignAnchor(PropertyGroup):
+    """Anchor point: vertex index, its cached local coordinate and its stable ID (0: none)"""
+    index: IntProperty(name="Index", default=-1)
+    co: FloatVectorProperty(name="Local Coordinate", size=3, subtype='XYZ')
+    uid: IntProperty(name="Stable ID", default=0)
+
+
+class VertexAlignAnchorSet(PropertyGroup):
+    """Named set of anchor points stored on an object"""
+    anchors: CollectionProperty(name="Anchors", type=VertexAlignAnchor)
+
+
+class VertexAlignLiveLink(PropertyGroup):
+    """Stay Aligned link of a source object: its own anchors and the target vertices it follows"""
+    enabled: BoolProperty(name="Stay Aligned", default=False)
+    target: PointerProperty(name="Target", type=bpy.types.Object)
+    use_evaluated: BoolProperty(name="Use Modifier Results", default=False)
+    source_anchors: CollectionProperty(name="Source Anchors", type=VertexAlignAnchor)
+    target_anchors: CollectionProperty(name="Target Anchors", type=VertexAlignAnchor)
+
+
+class VertexAlignSuggestion(PropertyGroup):
+    """Target vertex proposed for a marked source vertex by descriptor matching"""
+    slot: IntProperty(name="Slot", min=1, max=3)
+    index: IntProperty(name="Index", default=-1)
+    distance: FloatProperty(name="Descriptor Distance")
+
+
+class VertexAlignConstraint(PropertyGroup):
+    """Assembly constraint: an anchor set of the source object aligns to an anchor set of the target"""
+    enabled: BoolProperty(name="Enabled", default=True)
+    source: PointerProperty(name="Source", type=bpy.types.Object)
+    source_set: StringProperty(name="Source Set")
+    target: PointerProperty(name="Target", type=bpy.types.Object)
+    target_set: StringProperty(name="Target Set")
+
+
+def _object_current_marks(scene, obj):
+    """Return the vertex indices currently marked on an object (as source or target), if any"""
+    for prefix in ("source", "target"):
+        if getattr(scene, f"vertex_align_{prefix}_object") == obj.name:
+            points = [item.index for item in getattr(scene, f"vertex_align_{prefix}_points")]
+            return points or _marked_indices(scene, prefix)
+    return []
+
+
+def _anchor_world_points(obj, anchors):
+    """Return the world-space points of anchors from their cached local coordinates (no mesh access)"""
+    local_points = np.array([anchor.co for anchor in anchors], dtype=np.float64).reshape(-1, 3)
+    return _transform_points(_matrix_to_array(obj.matrix_world), local_points)
+
+
+def _anchor_set_world_points(obj, anchor_set):
+    """Return the world-space points of an anchor set from its cached local coordinates (no mesh access)"""
+    return _anchor_world_points(obj, anchor_set.anchors)
+
+
+def _solve_point_sets(source_points, target_points, use_best_fit=False, use_scale=False):
+    """Return (transform, RMS residual) for matching point sets: 1-3 vertex alignment or best fit
+
+    use_scale also solves a uniform scale when the sets are best fit.
+    """
+    count = min(len(source_points), len(target_points))
+    source_points = source_points[:count]
+    target_points = target_points[:count]
+    if count > 3 or (use_best_fit and count == 3):
+        transforms, residuals = compute_best_fit_transforms(source_points, target_points, use_scale)
+        return transforms[0], float(residuals[0])
+    transforms = compute_alignment_transforms(_pad_points(source_points), _pad_points(target_points), count)
+    return transforms[0], float(alignment_residuals(transforms, source_points, target_points)[0])
+
+
+def _solve_marked_alignment(scene, depsgraph=None):
+    """Solve the alignment defined by the scene marks without applying it
+
+    Uses the Best Fit point lists when they hold more than 3 pairs, otherwise vertices 1-3.
+    Returns a dictionary with the source and target objects, their world points, the transform
+    and the RMS residual. Raises ValueError with a user-facing message when marks are missing.
+    """
+    source_obj = bpy.data.objects.get(scene.vertex_align_source_object)
+    if source_obj is None:
+        raise ValueError("No source object marked")
+    target_obj = bpy.data.objects.get(scene.vertex_align_target_object)
+    if target_obj is None:
+        raise ValueError("No target object marked")
+    
+    source_indices, target_indices = _marked_point_pairs(scene)
+    if not source_indices:
+        raise ValueError("Mark source and target vertex 1 first")
+    
+    source_points = _world_points(source_obj, source_indices, depsgraph)
+    target_points = _world_points(target_obj, target_indices, depsgraph)
+    transform, residual = _solve_point_sets(source_points, target_points)
+    return {
+        "source": source_obj,
+        "target": target_obj,
+        "source_points": source_points,
+        "target_points": target_points,
+        "transform": transform,
+        "residual": residual,
+    }
+
+
+def solve_assembly(constraints):
+    """Solve a graph of alignment constraints between objects in one pass
+
+    constraints lists (source object, source points, target object, target points) with (N, 3)
+    world points taken before anything moves, optionally followed by a (use_best_fit, use_scale)
+    pair for _solve_point_sets() (the first constraint of a source sets it for all of its
+    constraints). Objects that are never a source stay fixed. Every other object is solved once all
+    of its targets are (topological order), against where those targets go, with one joint fit over
+    all of its constraints, so errors do not pile up along chains. Returns (objects in solve order,
+    (M, 4, 4) transforms, RMS residuals). Raises ValueError when the constraints form a cycle.
+    """
+    by_source = {}
+    fits = {}
+    for source, source_points, target, target_points, *fit in constraints:
+        count = min(len(source_points), len(target_points))
+        by_source.setdefault(source, []).append((source_points[:count], target, target_points[:count]))
+        fits.setdefault(source, tuple(fit[0]) if fit else (False, False))
+    
+    # Kahn's algorithm: a source is ready once every target it depends on has been solved
+    waiting = {source: {target for _, target, _ in entries if target in by_source}
+               for source, entries in by_source.items()}
+    dependents = {}
+    for source, targets in waiting.items():
+        for target in targets:
+            dependents.setdefault(target, []).append(source)
+    ready = [source for source, targets in waiting.items() if not targets]
+    
+    order = []
+    transforms = {}
+    residuals = []
+    while ready:
+        source = ready.pop()
+        entries = by_source[source]
+        source_points = np.concatenate([points for points, _, _ in entries])
+        target_points = np.concatenate([_transform_points(transforms[target], points) if target in transforms else points
+                                        for _, target, points in entries])
+        transforms[source], residual = _solve_point_sets(source_points, target_points, *fits[source])
+        order.append(source)
+        residuals.append(residual)
+        for dependent in dependents.get(source, ()):
+            waiting[dependent].discard(source)
+            if not waiting[dependent]:
+                ready.append(dependent)
+    
+    if len(order) < len(by_source):
+        cycle = sorted(source.name for source in by_source if source not in transforms)
+        raise ValueError(f"Assembly constraints form a cycle: {', '.join(cycle)}")
+    return order, np.array([transforms[source] for source in order]).reshape(-1, 4, 4), residuals
+
+
+# Alignment log: one JSON object per line, in a text datablock and optionally a sidecar file
+ALIGNMENT_LOG_TEXT = "vertex_align_log.jsonl"
+REPLAY_MODES = ('RESOLVE', 'DELTA')
+# (use_best_fit, use_scale) to solve logged steps again with; other modes align 1-3 points as usual
+_LOGGED_FITS = {
+    "best_fit": (True, False),
+    "best_fit_scale": (True, True),
+    "robust": (True, False),
+    "robust_scale": (True, True),
+}
+
+
+def _mark_reference(mark):
+    """Return a JSON-friendly copy of a vertex index or (element, index, barycentric) mark"""
+    return [mark[0], mark[1], list(mark[2])] if isinstance(mark, tuple) else int(mark)
+
+
+def _parse_mark_reference(reference):
+    """Inverse of _mark_reference()"""
+    return (reference[0], int(reference[1]), tuple(reference[2])) if isinstance(reference, list) else int(reference)
+
+
+def _log_entry(source_obj, target_obj, transform, residual=None, source_marks=None, target_marks=None,
+               source_set=None, target_set=None):
+    """Return the log entry of one applied alignment, see log_alignments()"""
+    entry = {
+        "source": source_obj.name,
+        "target": target_obj.name if target_obj is not None else None,
+        "delta": np.asarray(transform, dtype=np.float64).ravel().tolist(),
+        "residual": None if residual is None else float(residual),
+    }
+    if source_set is not None:
+        entry["source_set"] = source_set
+        entry["target_set"] = target_set
+    elif source_marks is not None and target_marks is not None:
+        entry["source_marks"] = [_mark_reference(mark) for mark in source_marks]
+        entry["target_marks"] = [_mark_reference(mark) for mark in target_marks]
+    return entry
+
+
+def _read_log_lines(lines):
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def read_alignment_log(path=None):
+    """Return the entries of an alignment log file, or of the log text datablock when path is None"""
+    if path:
+        with open(path, encoding="utf-8") as log:
+            return _read_log_lines(log)
+    text = bpy.data.texts.get(ALIGNMENT_LOG_TEXT)
+    return _read_log_lines(text.as_string().splitlines()) if text is not None else []
+
+
+def log_alignments(scene, mode, entries, use_hierarchy_root=None):
+    """Append the entries of one alignment step to the log, when the scene logs alignments
+
+    Entries come from _log_entry(): source and target names, the anchor references (marks or anchor
+    set names), the applied (4, 4) world-space delta and the RMS residual. Every entry of a step gets
+    the mode, the Move Hierarchy Root setting (the scene setting unless use_hierarchy_root is given,
+    for steps that always move the objects themselves) and a step number shared by the whole step.
+    Lines are appended at the end of the text, so logging cost does not grow with the log.
+    """
+    # Scripts may align without the add-on registered, they have no log settings
+    if not getattr(scene, "vertex_align_use_log", False) or not entries:
+        return
+    if use_hierarchy_root is None:
+        use_hierarchy_root = scene.vertex_align_use_hierarchy_root
+    text = bpy.data.texts.get(ALIGNMENT_LOG_TEXT)
+    if text is None:
+        text = bpy.data.texts.new(ALIGNMENT_LOG_TEXT)
+    last = next((text.lines[number].body for number in range(len(text.lines) - 1, -1, -1)
+                 if text.lines[number].body.strip()), "")
+    previous = _read_log_lines([last])
+    step = previous[-1].get("step", 0) + 1 if previous else 1
+    
+    lines = []
+    for entry in entries:
+        entry = dict(entry, mode=mode, step=step, hierarchy_root=use_hierarchy_root)
+        lines.append(json.dumps(entry, separators=(",", ":")))
+    tail = text.lines[-1].body
+    text.cursor_set(len(text.lines) - 1, character=len(tail))
+    text.write(("\n" if tail else "") + "\n".join(lines) + "\n")
+    
+    if scene.vertex_align_log_path:
+        with open(bpy.path.abspath(scene.vertex_align_log_path), "a", encoding="utf-8") as sidecar:
+            sidecar.write("\n".join(lines) + "\n")
+
+
+def _entry_points(obj, entry, prefix, depsgraph=None):
+    """Return the world points of the anchors an entry references on obj, or None without references"""
+    set_name = entry.get(f"{prefix}_set")
+    if set_name is not None:
+        anchor_set = obj.vertex_align_anchor_sets.get(set_name)
+        return _anchor_set_world_points(obj, anchor_set) if anchor_set is not None and anchor_set.anchors else None
+    marks = entry.get(f"{prefix}_marks")
+    if not marks:
+        return None
+    return _world_points(obj, [_parse_mark_reference(mark) for mark in marks], depsgraph)
+
+
+def replay_alignment_log(entries, mode='RESOLVE', depsgraph=None):
+    """Reapply logged alignments to the objects of the current file in one batched pass
+
+    RESOLVE solves every logged step again from its anchor references on the current geometry, so
+    revised meshes are realigned; only the latest step of each object counts, and objects aligned to
+    an object that moves follow it (solve_assembly). Best fit and robust steps are fit again the same
+    way, with uniform scale when they were logged with it. Entries without anchor references (Auto
+    Align, candidates) or whose anchors are gone reuse their recorded delta. DELTA applies the
+    recorded deltas, composed in log order, to reproduce the log exactly.
+    Returns (number of aligned objects, number of skipped entries). Raises ValueError for cycles.
+    """
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"Unknown replay mode '{mode}'")
+    
+    objects = bpy.data.objects
+    deltas = {}
+    skipped = 0
+    
+    if mode == 'DELTA':
+        # Entries of one step share their delta, apply it once per object and step
+        applied = set()
+        for entry in entries:
+            obj = objects.get(entry["source"])
+            if obj is None:
+                skipped += 1
+                continue
+            key = (obj.name, entry.get("step"), entry.get("hierarchy_root", False))
+            if key in applied:
+                continue
+            applied.add(key)
+            group = (obj, entry.get("hierarchy_root", False))
+            deltas[group] = np.array(entry["delta"]).reshape(4, 4) @ deltas.get(group, np.eye(4))
+    else:
+        latest = {}
+        for entry in entries:
+            if entry.get("step") != latest.get(entry["source"], [{}])[0].get("step"):
+                latest[entry["source"]] = []
+            latest[entry["source"]].append(entry)
+        
+        constraints = []
+        roots = {}
+        for name, source_entries in latest.items():
+            obj = objects.get(name)
+            if obj is None:
+                skipped += len(source_entries)
+                continue
+            roots[obj] = source_entries[0].get("hierarchy_root", False)
+            resolved = []
+            for entry in source_entries:
+                target_obj = objects.get(entry.get("target") or "")
+                try:
+                    source_points = _entry_points(obj, entry, "source", depsgraph)
+                    target_points = _entry_points(target_obj, entry, "target", depsgraph) if target_obj else None
+                except IndexError:
+                    source_points = target_points = None
+                if source_points is None or target_points is None:
+                    break
+                resolved.append((obj, source_points, target_obj, target_points,
+                                 _LOGGED_FITS.get(entry.get("mode"), (False, False))))
+            if len(resolved) == len(source_entries):
+                constraints.extend(resolved)
+            else:
+                deltas[(obj, roots[obj])] = np.array(source_entries[0]["delta"]).reshape(4, 4)
+        
+        if constraints:
+            solved, transforms, _ = solve_assembly(constraints)
+            for obj, transform in zip(solved, transforms):
+                deltas[(obj, roots[obj])] = transform
+    
+    for use_hierarchy_root in (False, True):
+        group = [(obj, delta) for (obj, root), delta in deltas.items() if root == use_hierarchy_root]
+        if group:
+            apply_alignment_transforms([obj for obj, _ in group], np.array([delta for _, delta in group]),
+                                       use_hierarchy_root)
+    return len(deltas), skipped
+
+
+class OBJECT_OT_mark_source_vertex_1(Operator):
+    """Mark the selected vertex as source point 1 (origin)"""
+    bl_idname = "object.mark_source_vertex_1"
+    bl_label = "Mark Source Vertex 1"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.mark_source_vertex_1")
+    def execute(self, context):
+        return _mark_vertex(self, context, "source", 1)
+
+
+class OBJECT_OT_mark_source_vertex_2(Operator):
+    """Mark the selected vertex as source point 2 (direction)"""
+    bl_idname = "object.mark_source_vertex_2"
+    bl_label = "Mark Source Vertex 2"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.mark_source_vertex_2")
+    def execute(self, context):
+        return _mark_vertex(self, context, "source", 2)
+
+
+class OBJECT_OT_mark_source_vertex_3(Operator):
+    """Mark the selected vertex as source point 3 (plane)"""
+    bl_idname = "object.mark_source_vertex_3"
+    bl_label = "Mark Source Vertex 3"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.mark_source_vertex_3")
+    def execute(self, context):
+        return _mark_vertex(self, context, "source", 3)
+
+
+class OBJECT_OT_mark_target_vertex_1(Operator):
+    """Mark the selected vertex as target point 1 (origin)"""
+    bl_idname = "object.mark_target_vertex_1"
+    bl_label = "Mark Target Vertex 1"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.mark_target_vertex_1")
+    def execute(self, context):
+        return _mark_vertex(self, context, "target", 1)
+
+
+class OBJECT_OT_mark_target_vertex_2(Operator):
+    """Mark the selected vertex as target point 2 (direction)"""
+    bl_idname = "object.mark_target_vertex_2"
+    bl_label = "Mark Target Vertex 2"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.mark_target_vertex_2")
+    def execute(self, context):
+        return _mark_vertex(self, context, "target", 2)
+
 
+class OBJECT_OT_mark_target_vertex_3(Operator):
+    """Mark the selected vertex as target point 3 (plane)"""
+    bl_idname = "object.mark_target_vertex_3"
+    bl_label = "Mark Target Vertex 3"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.mark_target_vertex_3")
+    def execute(self, context):
+        return _mark_vertex(self, context, "target", 3)
 
-class OBJECT_OT_mark_source_vertex_1(Operator):
-    """Mark the selected vertex as source point 1 (origin)"""
-    bl_idname = "object.mark_source_vertex_1"
-    bl_label = "Mark Source Vertex 1"
+
+class OBJECT_OT_mark_vertices(Operator):
+    """Mark up to three selected vertices, in click order, as source or target points 1, 2 and 3"""
+    bl_idname = "object.mark_vertices"
+    bl_label = "Mark Vertices 1-3"
     bl_options = {'REGISTER', 'UNDO'}
     
+    role: EnumProperty(
+        name="Role",
+        items=[
+            ('SOURCE', "Source", "Mark the vertices on the source object"),
+            ('TARGET', "Target", "Mark the vertices on the target object"),
+        ],
+        default='SOURCE',
+    )
+    
+    @_profiled("object.mark_vertices")
     def execute(self, context):
         obj = context.active_object
         
@@ -28,36 +1904,483 @@ class OBJECT_OT_mark_source_vertex_1(Operator):
             return {'CANCELLED'}
         
         if obj.mode != 'EDIT':
-            self.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
+            self.report({'ERROR'}, "Switch to Edit Mode to select vertices")
+            return {'CANCELLED'}
+        
+        with _profiler.phase("mark.selection"):
+            import bmesh
+            bm = bmesh.from_edit_mesh(obj.data)
+            indices = _selected_vertex_indices(obj, bm, limit=3)
+        if not indices:
+            self.report({'ERROR'}, "No vertex selected")
+            return {'CANCELLED'}
+        
+        if obj.data.total_vert_sel > 3:
+            self.report({'WARNING'}, "More than 3 vertices selected, using the first 3 clicked")
+        
+        prefix = self.role.lower()
+        with _profiler.phase("mark.store"):
+            _store_marks(context.scene, obj, prefix, indices)
+            getattr(context.scene, f"vertex_align_{prefix}_points").clear()
+        
+        self.report({'INFO'}, f"{self.role.title()} vertices marked: {obj.name}, "
+                              f"indices {', '.join(str(index) for index in indices)}")
+        
+        return {'FINISHED'}
+
+
+def _nearest_vertex(obj, location, depsgraph=None):
+    """Return the index of the vertex of a mesh object closest to a world-space location, or None"""
+    coords = _object_coords(obj, depsgraph)
+    if len(coords) == 0:
+        return None
+    local = _transform_points(np.linalg.inv(_matrix_to_array(obj.matrix_world)),
+                              np.array(location, dtype=np.float64)[None])[0]
+    return int(np.argmin(np.einsum('ij,ij->i', coords - local, coords - local)))
+
+
+class OBJECT_OT_mark_vertex_at_cursor(Operator):
+    """Mark the vertex closest to the 3D cursor, including vertices generated by modifiers"""
+    bl_idname = "object.mark_vertex_at_cursor"
+    bl_label = "Mark Vertex at 3D Cursor"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    role: EnumProperty(
+        name="Role",
+        items=[
+            ('SOURCE', "Source", "Mark a vertex of the source object"),
+            ('TARGET', "Target", "Mark a vertex of the target object"),
+        ],
+        default='SOURCE',
+    )
+    slot: IntProperty(
+        name="Vertex",
+        description="Which marked vertex (1, 2 or 3) to set",
+        default=1,
+        min=1,
+        max=3,
+    )
+    
+    @_profiled("object.mark_vertex_at_cursor")
+    def execute(self, context):
+        obj = context.active_object
+        
+        if obj is None or obj.type != 'MESH':
+            self.report({'ERROR'}, "No active mesh object")
+            return {'CANCELLED'}
+        
+        # Search the same geometry the marks will be resolved against
+        with _profiler.phase("mark.nearest_vertex"):
+            vertex_index = _nearest_vertex(obj, context.scene.cursor.location, _geometry_depsgraph(context))
+        if vertex_index is None:
+            self.report({'ERROR'}, "Mesh has no vertices")
             return {'CANCELLED'}
         
+        return _mark_vertex(self, context, self.role.lower(), self.slot, vertex_index)
+
+
+def _view_ray(context, location):
+    """Return the world-space ray (origin, direction) from the viewpoint through a location, or None
+
+    Only available when the context has a 3D view (the sidebar buttons do).
+    """
+    space = context.space_data
+    if space is None or space.type != 'VIEW_3D' or space.region_3d is None:
+        return None
+    rv3d = space.region_3d
+    view = _matrix_to_array(rv3d.view_matrix.inverted())
+    if rv3d.is_perspective:
+        origin = view[:3, 3]
+        return origin, location - origin
+    direction = -view[:3, 2]
+    return location - direction * space.clip_end, direction
+
+
+class OBJECT_OT_mark_element(Operator):
+    """Mark an edge midpoint, face center, vertex group median or surface point as source or target point 1-3"""
+    bl_idname = "object.mark_element"
+    bl_label = "Mark Element"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    role: EnumProperty(
+        name="Role",
+        items=[
+            ('SOURCE', "Source", "Mark a point of the source object"),
+            ('TARGET', "Target", "Mark a point of the target object"),
+        ],
+        default='SOURCE',
+    )
+    slot: IntProperty(
+        name="Vertex",
+        description="Which marked point (1, 2 or 3) to set",
+        default=1,
+        min=1,
+        max=3,
+    )
+    element: EnumProperty(
+        name="Element",
+        items=MARK_ELEMENT_ITEMS,
+        default='FACE',
+    )
+    
+    def _selected_element(self, obj):
+        """Return the index of the first selected edge or face, clicked ones first, or None"""
         import bmesh
         bm = bmesh.from_edit_mesh(obj.data)
+        element_type = bmesh.types.BMEdge if self.element == 'EDGE' else bmesh.types.BMFace
+        for elem in bm.select_history:
+            if isinstance(elem, element_type):
+                return elem.index
         
-        selected_verts = [v for v in bm.verts if v.select]
+        # Nothing clicked (box select, select all...), take the first selected element of the edit mesh
+        elements = bm.edges if self.element == 'EDGE' else bm.faces
+        return next((elem.index for elem in elements if elem.select), None)
+    
+    @_profiled("object.mark_element")
+    def execute(self, context):
+        obj = context.active_object
         
-        if len(selected_verts) == 0:
-            self.report({'ERROR'}, "No vertex selected")
+        if obj is None or obj.type != 'MESH':
+            self.report({'ERROR'}, "No active mesh object")
+            return {'CANCELLED'}
+        
+        depsgraph = _geometry_depsgraph(context)
+        barycentric = (0.0, 0.0, 0.0)
+        
+        if self.element in {'EDGE', 'FACE'}:
+            if obj.mode != 'EDIT':
+                self.report({'ERROR'}, f"Switch to Edit Mode to select {self.element.lower()}s")
+                return {'CANCELLED'}
+            with _profiler.phase("mark.selection"):
+                index = self._selected_element(obj)
+            if index is None:
+                self.report({'ERROR'}, f"No {self.element.lower()} selected")
+                return {'CANCELLED'}
+        
+        elif self.element == 'GROUP':
+            group = obj.vertex_groups.active
+            if group is None:
+                self.report({'ERROR'}, "No active vertex group")
+                return {'CANCELLED'}
+            if depsgraph is None and obj.mode == 'EDIT':
+                import bmesh
+                members = _edit_group_members(bmesh.from_edit_mesh(obj.data), group.index)
+            else:
+                members = _vertex_group_members(_resolve_mesh(obj, depsgraph), group.index)
+            if len(members) == 0:
+                self.report({'ERROR'}, f"Vertex group '{group.name}' has no vertices")
+                return {'CANCELLED'}
+            index = group.index
+        
+        else:
+            ray = _view_ray(context, np.array(context.scene.cursor.location, dtype=np.float64))
+            if ray is None:
+                self.report({'ERROR'}, "Surface points are marked from a 3D view")
+                return {'CANCELLED'}
+            
+            # Cast in local space against the same geometry the mark will be resolved against
+            inverse = np.linalg.inv(_matrix_to_array(obj.matrix_world))
+            origin = _transform_points(inverse, ray[0][None])[0]
+            direction = inverse[:3, :3] @ ray[1]
+            with _profiler.phase("mark.ray_cast"):
+                mesh = _resolve_mesh(obj, depsgraph)
+                hit = _ray_triangle_hit(_mesh_coords(mesh), _mesh_triangles(mesh), origin, direction)
+            if hit is None:
+                self.report({'ERROR'}, f"The 3D cursor is not on the surface of {obj.name}")
+                return {'CANCELLED'}
+            index, barycentric = hit
+        
+        return _mark_vertex(self, context, self.role.lower(), self.slot, element=(self.element, index, barycentric))
+
+
+def _mark_target_suggestion(scene, target_obj, slot, index):
+    """Mark a suggested vertex as target vertex 1-3, keeping the other target marks"""
+    setattr(scene, f"vertex_align_target_vertex_{slot}", index)
+    _set_element_mark(scene, "target", slot)
+    _store_stable_id(scene, target_obj, "target", slot, None if scene.vertex_align_use_evaluated else index)
+    scene.vertex_align_target_points.clear()
+    _invalidate_panel_status()
+
+
+class OBJECT_OT_suggest_target_vertices(Operator):
+    """Propose target vertices matching the marked source vertices from local shape descriptors"""
+    bl_idname = "object.suggest_target_vertices"
+    bl_label = "Suggest Target Vertices"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    count: IntProperty(
+        name="Candidates",
+        description="Number of candidates kept per source vertex",
+        default=5,
+        min=1,
+        max=10,
+    )
+    use_best: BoolProperty(
+        name="Mark Best",
+        description="Mark the candidates that best keep the distances between the source vertices as target vertices",
+        default=True,
+    )
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        source_obj = bpy.data.objects.get(scene.vertex_align_source_object)
+        # Element marks have no vertex descriptor, their slots are left alone
+        marks = _marked_indices(scene, "source")
+        slots, source_indices = [], []
+        for slot, mark in enumerate(marks, start=1):
+            if not isinstance(mark, tuple):
+                slots.append(slot)
+                source_indices.append(mark)
+        if source_obj is None or not source_indices:
+            self.report({'ERROR'}, "Mark source vertices first")
             return {'CANCELLED'}
         
-        if len(selected_verts) > 1:
-            self.report({'WARNING'}, "Multiple vertices selected, using the first one")
+        # The active mesh is the target unless it is the source, then the marked target object
+        target_obj = context.active_object
+        if target_obj is None or target_obj.type != 'MESH' or target_obj == source_obj:
+            target_obj = bpy.data.objects.get(scene.vertex_align_target_object)
+        if target_obj is None or target_obj == source_obj:
+            self.report({'ERROR'}, "Make the target mesh active or mark a target object")
+            return {'CANCELLED'}
+        
+        depsgraph = _geometry_depsgraph(context)
+        candidates, distances = suggest_target_vertices(source_obj, source_indices, target_obj, self.count, depsgraph)
+        
+        suggestions = scene.vertex_align_suggestions
+        suggestions.clear()
+        for slot, indices, slot_distances in zip(slots, candidates.tolist(), distances.tolist()):
+            for index, distance in zip(indices, slot_distances):
+                item = suggestions.add()
+                item.slot = slot
+                item.index = index
+                item.distance = distance
+        
+        if self.use_best:
+            target_points = _world_points(target_obj, candidates.ravel().tolist(), depsgraph).reshape(*candidates.shape, 3)
+            choice = _consistent_candidates(_world_points(source_obj, source_indices, depsgraph), target_points)
+            best = candidates[np.arange(len(choice)), choice].tolist()
+            if len(slots) == len(marks):
+                _store_marks(scene, target_obj, "target", best)
+                scene.vertex_align_target_points.clear()
+            else:
+                # Only the slots of source vertex marks are written, target element marks stay
+                if scene.vertex_align_target_object != target_obj.name:
+                    _store_marks(scene, target_obj, "target", [])
+                for slot, index in zip(slots, best):
+                    _mark_target_suggestion(scene, target_obj, slot, index)
+            self.report({'INFO'}, f"Target vertices suggested on {target_obj.name}: {', '.join(map(str, best))}")
+        else:
+            # Suggestions are picked on this object from the panel
+            if scene.vertex_align_target_object != target_obj.name:
+                _store_marks(scene, target_obj, "target", [])
+            self.report({'INFO'}, f"{candidates.size} target vertices suggested on {target_obj.name}")
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_use_target_suggestion(Operator):
+    """Mark this suggested vertex as the target vertex"""
+    bl_idname = "object.use_target_suggestion"
+    bl_label = "Use Suggested Vertex"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    slot: IntProperty(name="Slot", default=1, min=1, max=3)
+    index: IntProperty(name="Index", default=0, min=0)
+    
+    def execute(self, context):
+        scene = context.scene
+        target_obj = bpy.data.objects.get(scene.vertex_align_target_object)
+        if target_obj is None:
+            self.report({'ERROR'}, "No target object marked")
+            return {'CANCELLED'}
         
-        vertex_index = selected_verts[0].index
-        context.scene.vertex_align_source_object = obj.name
-        context.scene.vertex_align_source_vertex_1 = vertex_index
+        _mark_target_suggestion(scene, target_obj, self.slot, self.index)
         
-        self.report({'INFO'}, f"Source vertex 1 marked: {obj.name}, index {vertex_index}")
+        self.report({'INFO'}, f"Target vertex {self.slot} marked: {target_obj.name}, index {self.index}")
         
         return {'FINISHED'}
 
 
-class OBJECT_OT_mark_source_vertex_2(Operator):
-    """Mark the selected vertex as source point 2 (direction)"""
-    bl_idname = "object.mark_source_vertex_2"
-    bl_label = "Mark Source Vertex 2"
+class OBJECT_OT_align_smart(Operator):
+    """Align source to target (automatically detects position only, partial rotation, or full rotation)"""
+    bl_idname = "object.align_smart"
+    bl_label = "Align objects"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @_profiled("object.align_smart")
+    def execute(self, context):
+        # Get source object
+        source_obj_name = context.scene.vertex_align_source_object
+        if not source_obj_name or source_obj_name not in bpy.data.objects:
+            self.report({'ERROR'}, "No source object marked")
+            return {'CANCELLED'}
+        
+        source_obj = bpy.data.objects[source_obj_name]
+        source_indices = _marked_indices(context.scene, "source")
+        
+        # Get target object
+        target_obj_name = context.scene.vertex_align_target_object
+        if not target_obj_name or target_obj_name not in bpy.data.objects:
+            self.report({'ERROR'}, "No target object marked")
+            return {'CANCELLED'}
+        
+        target_obj = bpy.data.objects[target_obj_name]
+        target_indices = _marked_indices(context.scene, "target")
+        
+        # Determine alignment mode
+        count = min(len(source_indices), len(target_indices))
+        if count == 0:
+            self.report({'ERROR'}, "Mark source and target vertex 1 first")
+            return {'CANCELLED'}
+        
+        # Marks are read from the edit mesh or the evaluated mesh directly, no mode switch needed
+        depsgraph = _geometry_depsgraph(context)
+        with _profiler.phase("align.resolve_points"):
+            source_points = _world_points(source_obj, source_indices[:count], depsgraph)
+            target_points = _world_points(target_obj, target_indices[:count], depsgraph)
+        with _profiler.phase("align.solve"):
+            transforms = compute_alignment_transforms(_pad_points(source_points), _pad_points(target_points), count)
+        with _profiler.phase("align.write_matrices"):
+            apply_alignment_transforms([source_obj], transforms, context.scene.vertex_align_use_hierarchy_root)
+        log_alignments(context.scene, "smart", [_log_entry(
+            source_obj, target_obj, transforms[0], alignment_residuals(transforms, source_points, target_points)[0],
+            source_indices[:count], target_indices[:count])])
+        
+        if count >= 3:
+            self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} (position + full rotation)")
+        elif count == 2:
+            self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} (position + rotation)")
+        else:
+            self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} (position only)")
+        
+        return {'FINISHED'}
+
+
+def _solve_batch(source_objs, source_indices, target_obj, target_indices, depsgraph=None):
+    """Solve the alignments of many source objects to the same target marks without moving them
+
+    Returns (solved objects, (B, 4, 4) transforms, number of skipped objects), see align_batch().
+    """
+    # Target points are shared by every source, resolve them once
+    target_points = _pad_points(_world_points(target_obj, target_indices, depsgraph))
+    
+    # Gather every source point set, solve them all in one vectorized call, then write all matrices
+    aligned_objs = []
+    source_points = []
+    point_counts = []
+    skipped = 0
+    for obj, indices in zip(source_objs, source_indices):
+        count = min(len(indices), len(target_indices))
+        if count == 0:
+            skipped += 1
+            continue
+        try:
+            points = _world_points(obj, indices[:count], depsgraph)
+        except IndexError:
+            skipped += 1
+            continue
+        aligned_objs.append(obj)
+        source_points.append(_pad_points(points))
+        point_counts.append(count)
+    
+    if not aligned_objs:
+        return aligned_objs, np.empty((0, 4, 4)), skipped
+    transforms = compute_alignment_transforms(
+        np.array(source_points), np.broadcast_to(target_points, (len(aligned_objs), 3, 3)),
+        np.array(point_counts))
+    return aligned_objs, transforms, skipped
+
+
+def align_batch(source_objs, source_indices, target_obj, target_indices, depsgraph=None, use_hierarchy_root=False):
+    """Align many source objects to the same target marks with one vectorized solve
+
+    source_indices holds the marks of each source object. Objects without marks, or whose marks
+    the mesh lacks, are skipped. use_hierarchy_root moves the root of each source's hierarchy
+    instead. Returns (aligned objects, number of skipped objects).
+    """
+    aligned_objs, transforms, skipped = _solve_batch(source_objs, source_indices, target_obj, target_indices,
+                                                     depsgraph)
+    apply_alignment_transforms(aligned_objs, transforms, use_hierarchy_root)
+    return aligned_objs, skipped
+
+
+class OBJECT_OT_align_batch(Operator):
+    """Align every selected object (or every object of a collection) to the marked target in one step"""
+    bl_idname = "object.align_batch"
+    bl_label = "Batch Align"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    source: EnumProperty(
+        name="Sources",
+        description="Objects to align to the marked target",
+        items=[
+            ('SELECTED', "Selected Objects", "Align all selected mesh objects"),
+            ('COLLECTION', "Collection", "Align all mesh objects of the batch collection"),
+        ],
+        default='SELECTED',
+    )
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        target_obj_name = scene.vertex_align_target_object
+        if not target_obj_name or target_obj_name not in bpy.data.objects:
+            self.report({'ERROR'}, "No target object marked")
+            return {'CANCELLED'}
+        
+        target_obj = bpy.data.objects[target_obj_name]
+        target_indices = _marked_indices(scene, "target")
+        scene_source_indices = _marked_indices(scene, "source")
+        
+        if self.source == 'COLLECTION':
+            if scene.vertex_align_batch_collection is None:
+                self.report({'ERROR'}, "No batch collection set")
+                return {'CANCELLED'}
+            candidates = scene.vertex_align_batch_collection.all_objects
+        else:
+            candidates = context.selected_objects
+        
+        source_objs = [obj for obj in candidates if obj.type == 'MESH' and obj != target_obj]
+        if not source_objs:
+            self.report({'ERROR'}, "No source objects to align")
+            return {'CANCELLED'}
+        
+        # Prefer the marks stored on each object, fall back to the scene source indices
+        source_indices = [_object_marked_indices(obj) or scene_source_indices for obj in source_objs]
+        aligned_objs, transforms, skipped = _solve_batch(source_objs, source_indices, target_obj, target_indices,
+                                                         _geometry_depsgraph(context))
+        apply_alignment_transforms(aligned_objs, transforms, scene.vertex_align_use_hierarchy_root)
+        marks = dict(zip(source_objs, source_indices))
+        log_alignments(scene, "batch", [
+            _log_entry(obj, target_obj, transform, None,
+                       marks[obj][:len(target_indices)], target_indices[:len(marks[obj])])
+            for obj, transform in zip(aligned_objs, transforms)])
+        
+        if skipped:
+            self.report({'WARNING'}, f"Aligned {len(aligned_objs)} objects to {target_obj.name}, "
+                                     f"skipped {skipped} without valid marks")
+        else:
+            self.report({'INFO'}, f"Aligned {len(aligned_objs)} objects to {target_obj.name}")
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_mark_points(Operator):
+    """Mark all selected vertices, in click order, as source or target points for Best Fit alignment"""
+    bl_idname = "object.mark_points"
+    bl_label = "Mark Points"
     bl_options = {'REGISTER', 'UNDO'}
     
+    role: EnumProperty(
+        name="Role",
+        items=[
+            ('SOURCE', "Source", "Mark the points on the source object"),
+            ('TARGET', "Target", "Mark the points on the target object"),
+        ],
+        default='SOURCE',
+    )
+    
     def execute(self, context):
         obj = context.active_object
         
@@ -66,47 +2389,290 @@ class OBJECT_OT_mark_source_vertex_2(Operator):
             return {'CANCELLED'}
         
         if obj.mode != 'EDIT':
-            self.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
-            return {'CANCELLED'}
-        
-        # Check if source vertex 1 is marked
-        source_obj_name = context.scene.vertex_align_source_object
-        if not source_obj_name or source_obj_name != obj.name:
-            self.report({'ERROR'}, "Mark source vertex 1 first on this object")
+            self.report({'ERROR'}, "Switch to Edit Mode to select vertices")
             return {'CANCELLED'}
         
         import bmesh
         bm = bmesh.from_edit_mesh(obj.data)
         
-        selected_verts = [v for v in bm.verts if v.select]
-        
-        if len(selected_verts) == 0:
+        indices = _selected_vertex_indices(obj, bm)
+        if not indices:
             self.report({'ERROR'}, "No vertex selected")
             return {'CANCELLED'}
         
-        if len(selected_verts) > 1:
-            self.report({'WARNING'}, "Multiple vertices selected, using the first one")
+        prefix = self.role.lower()
+        points = getattr(context.scene, f"vertex_align_{prefix}_points")
+        points.clear()
+        for index in indices:
+            points.add().index = index
+        
+        # The first three points double as vertex 1-3 marks for the regular alignment
+        _store_marks(context.scene, obj, prefix, indices)
+        
+        self.report({'INFO'}, f"{self.role.title()} points marked: {obj.name}, {len(indices)} vertices")
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_align_best_fit(Operator):
+    """Align source to target with a least-squares fit over all marked point pairs"""
+    bl_idname = "object.align_best_fit"
+    bl_label = "Align (Best Fit)"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    use_scale: BoolProperty(
+        name="Uniform Scale",
+        description="Also solve a uniform scale factor",
+        default=False,
+    )
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        source_obj_name = scene.vertex_align_source_object
+        if not source_obj_name or source_obj_name not in bpy.data.objects:
+            self.report({'ERROR'}, "No source object marked")
+            return {'CANCELLED'}
+        
+        target_obj_name = scene.vertex_align_target_object
+        if not target_obj_name or target_obj_name not in bpy.data.objects:
+            self.report({'ERROR'}, "No target object marked")
+            return {'CANCELLED'}
         
-        vertex_index = selected_verts[0].index
+        source_obj = bpy.data.objects[source_obj_name]
+        target_obj = bpy.data.objects[target_obj_name]
         
-        # Check that it's different from vertex 1
-        if vertex_index == context.scene.vertex_align_source_vertex_1:
-            self.report({'ERROR'}, "Vertex 2 must be different from vertex 1")
+        source_indices, target_indices = _marked_point_pairs(scene)
+        if len(source_indices) < 3:
+            self.report({'ERROR'}, "Best Fit needs at least 3 marked point pairs")
             return {'CANCELLED'}
         
-        context.scene.vertex_align_source_vertex_2 = vertex_index
+        depsgraph = _geometry_depsgraph(context)
+        source_points = _world_points(source_obj, source_indices, depsgraph)
+        target_points = _world_points(target_obj, target_indices, depsgraph)
+        transforms, residuals = compute_best_fit_transforms(source_points, target_points, self.use_scale)
+        apply_alignment_transforms([source_obj], transforms, context.scene.vertex_align_use_hierarchy_root)
+        log_alignments(scene, "best_fit_scale" if self.use_scale else "best_fit", [_log_entry(
+            source_obj, target_obj, transforms[0], residuals[0], source_indices, target_indices)])
         
-        self.report({'INFO'}, f"Source vertex 2 marked: {obj.name}, index {vertex_index}")
+        self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} "
+                              f"(best fit, {len(source_indices)} pairs, RMS residual {residuals[0]:.6g})")
         
         return {'FINISHED'}
 
 
-class OBJECT_OT_mark_source_vertex_3(Operator):
-    """Mark the selected vertex as source point 3 (plane)"""
-    bl_idname = "object.mark_source_vertex_3"
-    bl_label = "Mark Source Vertex 3"
+class OBJECT_OT_align_robust(Operator):
+    """Align source to target with a best fit that rejects wrongly marked point pairs (RANSAC)"""
+    bl_idname = "object.align_robust"
+    bl_label = "Align (Robust)"
     bl_options = {'REGISTER', 'UNDO'}
     
+    threshold: FloatProperty(
+        name="Inlier Distance",
+        description="Pairs that land farther than this from their target point are treated as outliers",
+        default=0.01,
+        min=1e-6,
+        subtype='DISTANCE',
+    )
+    max_iterations: IntProperty(
+        name="Max Iterations",
+        description="Maximum number of 3-pair hypotheses tried",
+        default=1000,
+        min=1,
+        max=100000,
+    )
+    use_scale: BoolProperty(
+        name="Uniform Scale",
+        description="Also solve a uniform scale factor",
+        default=False,
+    )
+    pairs: EnumProperty(
+        name="Pairs",
+        description="Where the candidate point pairs come from",
+        items=[
+            ('MARKED', "Marked Points", "Use the marked point pairs"),
+            ('DESCRIPTORS', "Shape Descriptors", "Match sampled source vertices to target vertices with similar local shape"),
+        ],
+        default='MARKED',
+    )
+    sample_count: IntProperty(
+        name="Samples",
+        description="Number of source vertices matched by shape descriptors",
+        default=500,
+        min=10,
+    )
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        source_obj = bpy.data.objects.get(scene.vertex_align_source_object)
+        target_obj = bpy.data.objects.get(scene.vertex_align_target_object)
+        # Descriptor pairs need no marks: two selected meshes, the active one is the source
+        selected = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        if self.pairs == 'DESCRIPTORS' and len(selected) == 2 and context.active_object in selected:
+            source_obj = context.active_object
+            target_obj = selected[0] if selected[1] == source_obj else selected[1]
+        
+        if source_obj is None:
+            self.report({'ERROR'}, "No source object marked")
+            return {'CANCELLED'}
+        
+        if target_obj is None:
+            self.report({'ERROR'}, "No target object marked")
+            return {'CANCELLED'}
+        
+        depsgraph = _geometry_depsgraph(context)
+        if self.pairs == 'DESCRIPTORS':
+            source_indices, target_indices = descriptor_correspondences(source_obj, target_obj, self.sample_count,
+                                                                        depsgraph=depsgraph)
+        else:
+            source_indices, target_indices = _marked_point_pairs(scene)
+        if len(source_indices) < 3:
+            self.report({'ERROR'}, "Robust alignment needs at least 3 point pairs")
+            return {'CANCELLED'}
+        
+        source_points = _world_points(source_obj, source_indices, depsgraph)
+        target_points = _world_points(target_obj, target_indices, depsgraph)
+        try:
+            transform, inliers, residual, iterations = ransac_alignment(
+                source_points, target_points, self.threshold, self.max_iterations, use_scale=self.use_scale)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        apply_alignment_transforms([source_obj], transform[None], scene.vertex_align_use_hierarchy_root)
+        kept = np.flatnonzero(inliers).tolist()
+        log_alignments(scene, "robust_scale" if self.use_scale else "robust", [_log_entry(
+            source_obj, target_obj, transform, residual,
+            [source_indices[i] for i in kept], [target_indices[i] for i in kept])])
+        
+        message = (f"Aligned {source_obj.name} to {target_obj.name} (robust, {int(inliers.sum())}/{len(inliers)} "
+                   f"inliers, {iterations} iterations, RMS residual {residual:.6g})")
+        outliers = np.flatnonzero(~inliers) + 1
+        if len(outliers) and self.pairs == 'MARKED':
+            self.report({'WARNING'}, f"{message}; rejected pairs {', '.join(map(str, outliers.tolist()))}")
+        else:
+            self.report({'INFO'}, message)
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_align_auto(Operator):
+    """Align source to target without exact correspondences (iterative closest point)"""
+    bl_idname = "object.align_auto"
+    bl_label = "Auto Align (ICP)"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    seed: EnumProperty(
+        name="Initial Guess",
+        description="How the starting transform is obtained before refinement",
+        items=[
+            ('MARKS', "Marked Vertices", "Start from the marked vertices, or principal axes when nothing is marked"),
+            ('PCA', "Principal Axes", "Start by matching centroids and principal axes"),
+            ('CURRENT', "Current Placement", "Refine the current placement of the source"),
+        ],
+        default='MARKS',
+    )
+    sample_count: IntProperty(
+        name="Samples",
+        description="Number of source vertices used per iteration",
+        default=2000,
+        min=10,
+    )
+    max_iterations: IntProperty(
+        name="Max Iterations",
+        default=30,
+        min=1,
+        max=500,
+    )
+    tolerance: FloatProperty(
+        name="Tolerance",
+        description="Stop once the RMS residual improves by less than this",
+        default=1e-6,
+        min=0.0,
+        precision=7,
+    )
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        # Two selected meshes: active is the source. Otherwise use the marked objects.
+        selected = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        active = context.active_object
+        if len(selected) == 2 and active in selected:
+            source_obj = active
+            target_obj = selected[0] if selected[1] == active else selected[1]
+        else:
+            source_obj = bpy.data.objects.get(scene.vertex_align_source_object)
+            target_obj = bpy.data.objects.get(scene.vertex_align_target_object)
+            if source_obj is None or target_obj is None:
+                self.report({'ERROR'}, "Select two mesh objects or mark a source and a target object")
+                return {'CANCELLED'}
+        
+        depsgraph = _geometry_depsgraph(context)
+        source_points = _transform_points(_matrix_to_array(source_obj.matrix_world),
+                                          _sample_rows(_object_coords(source_obj, depsgraph), self.sample_count))
+        if len(source_points) < 3:
+            self.report({'ERROR'}, "Source mesh needs at least 3 vertices")
+            return {'CANCELLED'}
+        
+        target_tree, target_coords = _get_kdtree(target_obj, depsgraph)
+        target_matrix = _matrix_to_array(target_obj.matrix_world)
+        
+        initial = None
+        if self.seed == 'CURRENT':
+            initial = np.eye(4)
+        elif self.seed == 'MARKS' and (scene.vertex_align_source_object == source_obj.name and
+                                       scene.vertex_align_target_object == target_obj.name):
+            source_indices, target_indices = _marked_point_pairs(scene)
+            if len(source_indices) >= 3:
+                initial = compute_best_fit_transforms(_world_points(source_obj, source_indices, depsgraph),
+                                                      _world_points(target_obj, target_indices, depsgraph))[0][0]
+            elif source_indices:
+                source_points_marked = _pad_points(_world_points(source_obj, source_indices, depsgraph))
+                target_points_marked = _pad_points(_world_points(target_obj, target_indices, depsgraph))
+                initial = compute_alignment_transforms(source_points_marked, target_points_marked,
+                                                       len(source_indices))[0]
+        
+        if initial is None:
+            # Pick the principal-axes candidate whose samples land closest to the target surface
+            target_points = _transform_points(target_matrix, _sample_rows(target_coords, self.sample_count))
+            target_inverse = np.linalg.inv(target_matrix)
+            best_distance = None
+            for candidate in _principal_axes_seeds(source_points, target_points):
+                moved = _transform_points(candidate, source_points)
+                matches = _nearest_indices(target_tree, _transform_points(target_inverse, moved))
+                distance = np.linalg.norm(_transform_points(target_matrix, target_coords[matches]) - moved,
+                                          axis=1).mean()
+                if best_distance is None or distance < best_distance:
+                    best_distance = distance
+                    initial = candidate
+        
+        transform, rms, iterations = refine_icp(source_points, target_tree, target_coords, target_matrix,
+                                                initial, self.max_iterations, self.tolerance)
+        apply_alignment_transforms([source_obj], transform[None], context.scene.vertex_align_use_hierarchy_root)
+        log_alignments(scene, "auto", [_log_entry(source_obj, target_obj, transform, rms)])
+        
+        self.report({'INFO'}, f"Auto aligned {source_obj.name} to {target_obj.name} "
+                              f"({iterations} iterations, RMS residual {rms:.6g})")
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_anchor_set_add(Operator):
+    """Store the marked (or selected) vertices of the active object as a named anchor set"""
+    bl_idname = "object.anchor_set_add"
+    bl_label = "Add Anchor Set"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    name: StringProperty(
+        name="Name",
+        description="Name of the anchor set, an existing set with this name is replaced",
+        default="Anchors",
+    )
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
     def execute(self, context):
         obj = context.active_object
         
@@ -114,364 +2680,986 @@ class OBJECT_OT_mark_source_vertex_3(Operator):
             self.report({'ERROR'}, "No active mesh object")
             return {'CANCELLED'}
         
-        if obj.mode != 'EDIT':
-            self.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
+        # Vertices selected in Edit Mode win over the stored marks of the object
+        indices = []
+        if obj.mode == 'EDIT':
+            import bmesh
+            indices = _selected_vertex_indices(obj, bmesh.from_edit_mesh(obj.data))
+        if not indices:
+            indices = _object_current_marks(context.scene, obj)
+        if not indices:
+            self.report({'ERROR'}, "Mark or select vertices on this object first")
             return {'CANCELLED'}
         
-        # Check if source vertices 1 and 2 are marked
-        source_obj_name = context.scene.vertex_align_source_object
-        if not source_obj_name or source_obj_name != obj.name:
-            self.report({'ERROR'}, "Mark source vertex 1 and 2 first on this object")
-            return {'CANCELLED'}
+        local_points = _local_mark_points(obj, indices, _geometry_depsgraph(context))
+        anchor_sets = obj.vertex_align_anchor_sets
+        anchor_set = anchor_sets.get(self.name)
+        if anchor_set is None:
+            anchor_set = anchor_sets.add()
+            anchor_set.name = self.name
+        anchor_set.anchors.clear()
+        for index, co in zip(indices, local_points):
+            anchor = anchor_set.anchors.add()
+            # Element marks only keep their resolved position
+            anchor.index = -1 if isinstance(index, tuple) else index
+            anchor.co = co
+        obj.vertex_align_anchor_set_index = list(anchor_sets).index(anchor_set)
         
-        if context.scene.vertex_align_source_vertex_2 < 0:
-            self.report({'ERROR'}, "Mark source vertex 2 first")
+        self.report({'INFO'}, f"Anchor set '{anchor_set.name}' stored on {obj.name} ({len(indices)} vertices)")
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_anchor_set_remove(Operator):
+    """Remove the active anchor set of the active object"""
+    bl_idname = "object.anchor_set_remove"
+    bl_label = "Remove Anchor Set"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.type == 'MESH' and len(obj.vertex_align_anchor_sets) > 0
+    
+    def execute(self, context):
+        obj = context.active_object
+        index = obj.vertex_align_anchor_set_index
+        if not 0 <= index < len(obj.vertex_align_anchor_sets):
+            self.report({'ERROR'}, "No active anchor set")
             return {'CANCELLED'}
         
-        import bmesh
-        bm = bmesh.from_edit_mesh(obj.data)
+        obj.vertex_align_anchor_sets.remove(index)
+        obj.vertex_align_anchor_set_index = max(0, index - 1)
         
-        selected_verts = [v for v in bm.verts if v.select]
-        
-        if len(selected_verts) == 0:
-            self.report({'ERROR'}, "No vertex selected")
+        return {'FINISHED'}
+
+
+class OBJECT_OT_align_to_anchor_set(Operator):
+    """Align the selected objects to a named anchor set of another object, using their own named anchor set"""
+    bl_idname = "object.align_to_anchor_set"
+    bl_label = "Align to Anchor Set"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    source_set: StringProperty(
+        name="Source Set",
+        description="Anchor set of the objects to align (defaults to the active set of the active object)",
+    )
+    target_object: StringProperty(
+        name="Target Object",
+        description="Object holding the target anchor set",
+    )
+    target_set: StringProperty(
+        name="Target Set",
+        description="Anchor set of the target object",
+    )
+    use_best_fit: BoolProperty(
+        name="Best Fit",
+        description="Use a least-squares fit with 3 anchors (always used with more than 3)",
+        default=False,
+    )
+    
+    def invoke(self, context, event):
+        obj = context.active_object
+        if not self.source_set and obj is not None and obj.type == 'MESH':
+            index = obj.vertex_align_anchor_set_index
+            if 0 <= index < len(obj.vertex_align_anchor_sets):
+                self.source_set = obj.vertex_align_anchor_sets[index].name
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def draw(self, context):
+        layout = self.layout
+        obj = context.active_object
+        if obj is not None and obj.type == 'MESH':
+            layout.prop_search(self, "source_set", obj, "vertex_align_anchor_sets")
+        layout.prop_search(self, "target_object", bpy.data, "objects")
+        target_obj = bpy.data.objects.get(self.target_object)
+        if target_obj is not None and target_obj.type == 'MESH':
+            layout.prop_search(self, "target_set", target_obj, "vertex_align_anchor_sets")
+        layout.prop(self, "use_best_fit")
+    
+    def execute(self, context):
+        target_obj = bpy.data.objects.get(self.target_object)
+        if target_obj is None or target_obj.type != 'MESH':
+            self.report({'ERROR'}, "No target object")
             return {'CANCELLED'}
         
-        if len(selected_verts) > 1:
-            self.report({'WARNING'}, "Multiple vertices selected, using the first one")
-        
-        vertex_index = selected_verts[0].index
-        
-        # Check that it's different from vertices 1 and 2
-        if vertex_index == context.scene.vertex_align_source_vertex_1:
-            self.report({'ERROR'}, "Vertex 3 must be different from vertex 1")
+        target_set = target_obj.vertex_align_anchor_sets.get(self.target_set)
+        if target_set is None or len(target_set.anchors) == 0:
+            self.report({'ERROR'}, f"{target_obj.name} has no anchor set '{self.target_set}'")
             return {'CANCELLED'}
-        if vertex_index == context.scene.vertex_align_source_vertex_2:
-            self.report({'ERROR'}, "Vertex 3 must be different from vertex 2")
+        
+        source_objs = [obj for obj in context.selected_objects
+                       if obj != target_obj and obj.type == 'MESH' and self.source_set in obj.vertex_align_anchor_sets]
+        if not source_objs:
+            self.report({'ERROR'}, f"No selected object has an anchor set '{self.source_set}'")
             return {'CANCELLED'}
         
-        context.scene.vertex_align_source_vertex_3 = vertex_index
+        # Anchors carry their local coordinates, so only matrices are read
+        target_points = _anchor_set_world_points(target_obj, target_set)
+        transforms = []
+        residuals = []
+        for obj in source_objs:
+            source_points = _anchor_set_world_points(obj, obj.vertex_align_anchor_sets[self.source_set])
+            transform, residual = _solve_point_sets(source_points, target_points, self.use_best_fit)
+            transforms.append(transform)
+            residuals.append(residual)
+        apply_alignment_transforms(source_objs, np.array(transforms), context.scene.vertex_align_use_hierarchy_root)
+        log_alignments(context.scene, "anchor_set", [
+            _log_entry(obj, target_obj, transform, residual, source_set=self.source_set, target_set=target_set.name)
+            for obj, transform, residual in zip(source_objs, transforms, residuals)])
         
-        self.report({'INFO'}, f"Source vertex 3 marked: {obj.name}, index {vertex_index}")
+        self.report({'INFO'}, f"Aligned {len(source_objs)} objects to {target_obj.name} '{target_set.name}' "
+                              f"(max RMS residual {max(residuals):.6g})")
         
         return {'FINISHED'}
 
 
-class OBJECT_OT_mark_target_vertex_1(Operator):
-    """Mark the selected vertex as target point 1 (origin)"""
-    bl_idname = "object.mark_target_vertex_1"
-    bl_label = "Mark Target Vertex 1"
+def _connected_components(count, edges):
+    """Return a component label per vertex (0 to K-1) for an (E, 2) edge array over count vertices
+
+    Hook and compress: every round hooks the higher root of each edge joining two trees onto the
+    lowest root it touches, then jumps pointers until every vertex points at its root. Edges inside
+    one tree are dropped, so rounds stay few (about log of the island diameter) in any vertex order.
+    """
+    labels = np.arange(count)
+    edges = np.asarray(edges).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    while len(edges):
+        first = labels[edges[:, 0]]
+        second = labels[edges[:, 1]]
+        joining = first != second
+        edges, first, second = edges[joining], first[joining], second[joining]
+        if not len(edges):
+            break
+        low = np.minimum(first, second)
+        # The last write wins, so writing in decreasing order leaves each root its lowest neighbour
+        order = np.argsort(-low, kind='stable')
+        labels[np.maximum(first, second)[order]] = low[order]
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def _group_frames(points, labels, normal_sums):
+    """Return (K, 4, 4) frames of labelled point groups
+
+    The origin is the centroid of the group, Z follows the summed normals of the group (or its
+    flattest direction when it has none) and X its widest spread across Z, pointing toward the
+    member point farthest along that line. points is (N, 3), labels (N,) in 0 to K-1 and
+    normal_sums (K, 3). The roll around Z is undefined for rotationally symmetric groups (a disc,
+    a square), whose widest spread has no preferred direction.
+    """
+    count = len(normal_sums)
+    sizes = np.bincount(labels, minlength=count).astype(np.float64)
+    centers = np.column_stack([np.bincount(labels, points[:, axis], minlength=count) for axis in range(3)]) / sizes[:, None]
+    centered = points - centers[labels]
+    outer = (centered[:, :, None] * centered[:, None, :]).reshape(-1, 9)
+    covariance = np.column_stack([np.bincount(labels, outer[:, item], minlength=count)
+                                  for item in range(9)]).reshape(count, 3, 3)
+    _, vectors = np.linalg.eigh(covariance)
+    
+    z_axes = _normalize(normal_sums)
+    missing = np.linalg.norm(z_axes, axis=1) < 0.5
+    z_axes[missing] = vectors[missing, :, 0]
+    x_axes = vectors[:, :, 2] - np.einsum('ij,ij->i', vectors[:, :, 2], z_axes)[:, None] * z_axes
+    # Groups spread along Z only (a single point, a line along the normal) get any X across Z
+    flat = np.linalg.norm(x_axes, axis=1) < 1e-6
+    helper = np.where(np.abs(z_axes[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+    x_axes[flat] = np.cross(helper[flat], z_axes[flat])
+    x_axes = _normalize(x_axes)
+    # eigh returns each axis with an arbitrary sign, so X is turned toward the farthest point
+    along = np.einsum('ij,ij->i', centered, x_axes[labels])
+    ahead = np.zeros(count)
+    behind = np.zeros(count)
+    np.maximum.at(ahead, labels, along)
+    np.maximum.at(behind, labels, -along)
+    x_axes[behind > ahead] *= -1.0
+    
+    frames = np.broadcast_to(np.eye(4), (count, 4, 4)).copy()
+    frames[:, :3, 0] = x_axes
+    frames[:, :3, 1] = np.cross(z_axes, x_axes)
+    frames[:, :3, 2] = z_axes
+    frames[:, :3, 3] = centers
+    return frames
+
+
+def placement_transforms(source_frame, target_frames, use_mate=True, roll=0.0):
+    """Return the (M, 4, 4) transforms moving a source frame onto each of M target frames
+
+    With use_mate the source Z is turned against the target Z, so a surface rests on the other
+    (a bolt head on a plate); roll turns every placement around the target Z. Frames come from
+    _group_frames(). All placements are solved in one batched matrix product.
+    """
+    turn = np.eye(4)
+    turn[:3, :3] = _rotation_around_axis(np.array([[0.0, 0.0, 1.0]]), np.array([roll]))[0]
+    if use_mate:
+        turn = turn @ np.diag([1.0, -1.0, -1.0, 1.0])
+    return target_frames @ turn @ np.linalg.inv(source_frame)
+
+
+def _world_normals(matrix, normals):
+    """Transform (N, 3) local normals to world space (inverse transpose of the linear part)"""
+    return normals @ np.linalg.inv(matrix[:3, :3])
+
+
+def _anchor_set_frame(obj, anchor_set, depsgraph=None):
+    """Return the world-space frame of an anchor set, oriented by the normals of its vertices"""
+    matrix = _matrix_to_array(obj.matrix_world)
+    points = _anchor_set_world_points(obj, anchor_set)
+    mesh = _resolve_mesh(obj, depsgraph)
+    indices = [anchor.index for anchor in anchor_set.anchors if 0 <= anchor.index < len(mesh.vertices)]
+    normal_sum = np.zeros(3)
+    if indices:
+        normals = _foreach_array(mesh.vertices, "normal", 3, np.float64)[indices]
+        normal_sum = _world_normals(matrix, normals).sum(axis=0)
+    return _group_frames(points, np.zeros(len(points), dtype=np.int64), normal_sum[None])[0]
+
+
+def _vertex_islands(mesh, members, vertex_normals):
+    """Split member vertices into edge-connected islands, return (indices, labels, normal sums)"""
+    edges = _foreach_array(mesh.edges, "vertices", 2).astype(np.int64)
+    inside = np.zeros(len(mesh.vertices), dtype=bool)
+    inside[members] = True
+    edges = edges[inside[edges[:, 0]] & inside[edges[:, 1]]]
+    compact = np.full(len(mesh.vertices), -1, dtype=np.int64)
+    compact[members] = np.arange(len(members))
+    labels = _connected_components(len(members), compact[edges])
+    count = labels.max() + 1 if len(labels) else 0
+    normal_sums = np.column_stack([np.bincount(labels, vertex_normals[members, axis], minlength=count)
+                                   for axis in range(3)])
+    return members, labels, normal_sums
+
+
+ISLAND_SOURCE_ITEMS = [
+    ('FACES', "Selected Faces", "One placement per connected island of selected faces of the target"),
+    ('GROUP', "Vertex Group", "One placement per connected island of a vertex group of the target"),
+    ('PATTERN', "Repeated Pattern", "One placement per target region shaped like a target anchor set"),
+]
+
+
+def target_island_frames(target_obj, source='FACES', name="", tolerance=0.5, depsgraph=None):
+    """Return the (M, 4, 4) world-space frames of the placement islands of a target mesh
+
+    source is 'FACES' (islands of selected faces, oriented by their area-weighted face normals),
+    'GROUP' (islands of the vertex group called name) or 'PATTERN' (islands of vertices whose shape
+    descriptor is within tolerance of one of the vertices of the anchor set called name, keeping
+    islands of a similar size). Raises KeyError for a missing group or anchor set.
+    """
+    mesh = _resolve_mesh(target_obj, depsgraph)
+    matrix = _matrix_to_array(target_obj.matrix_world)
+    vertex_normals = _foreach_array(mesh.vertices, "normal", 3, np.float64)
+    
+    if source == 'FACES':
+        selected = _foreach_array(mesh.polygons, "select", dtype=bool)
+        totals = _foreach_array(mesh.polygons, "loop_total")
+        loop_polygons = np.repeat(np.arange(len(totals)), totals)
+        loop_edges = _foreach_array(mesh.loops, "edge_index")[selected[loop_polygons]]
+        loop_vertices = _foreach_array(mesh.loops, "vertex_index").astype(np.int64)
+        edges = _foreach_array(mesh.edges, "vertices", 2).astype(np.int64)[np.unique(loop_edges)]
+        members = np.unique(loop_vertices[selected[loop_polygons]])
+        compact = np.full(len(mesh.vertices), -1, dtype=np.int64)
+        compact[members] = np.arange(len(members))
+        labels = _connected_components(len(members), compact[edges])
+        count = labels.max() + 1 if len(labels) else 0
+        # Islands are oriented by their faces: area-weighted normals summed per island
+        polygons = np.flatnonzero(selected)
+        first_loops = _foreach_array(mesh.polygons, "loop_start")[polygons]
+        polygon_labels = labels[compact[loop_vertices[first_loops]]]
+        weighted = (_foreach_array(mesh.polygons, "normal", 3, np.float64)[polygons]
+                    * _foreach_array(mesh.polygons, "area", dtype=np.float64)[polygons, None])
+        normal_sums = np.column_stack([np.bincount(polygon_labels, weighted[:, axis], minlength=count)
+                                       for axis in range(3)])
+    elif source == 'GROUP':
+        group = target_obj.vertex_groups.get(name)
+        if group is None:
+            raise KeyError(f"{target_obj.name} has no vertex group '{name}'")
+        members, labels, normal_sums = _vertex_islands(mesh, _vertex_group_members(mesh, group.index), vertex_normals)
+    else:
+        anchor_set = target_obj.vertex_align_anchor_sets.get(name)
+        if anchor_set is None:
+            raise KeyError(f"{target_obj.name} has no anchor set '{name}'")
+        example = [anchor.index for anchor in anchor_set.anchors if 0 <= anchor.index < len(mesh.vertices)]
+        if not example:
+            raise KeyError(f"Anchor set '{name}' has no vertices")
+        descriptors = _get_descriptors(target_obj, depsgraph)
+        _, distances = _nearest_descriptors(descriptors[example], descriptors, 1, scale=descriptors.std(axis=0, dtype=np.float64))
+        members, labels, normal_sums = _vertex_islands(mesh, np.flatnonzero(distances[:, 0] <= tolerance), vertex_normals)
+        sizes = np.bincount(labels, minlength=len(normal_sums))
+        keep = (sizes >= 0.5 * len(example)) & (sizes <= 2.0 * len(example))
+        remap = np.cumsum(keep) - 1
+        members = members[keep[labels]]
+        labels = remap[labels[keep[labels]]]
+        normal_sums = normal_sums[keep]
+    
+    if not len(normal_sums):
+        return np.empty((0, 4, 4))
+    points = _transform_points(matrix, _mesh_coords(mesh)[members])
+    return _group_frames(points, labels, _world_normals(matrix, normal_sums))
+
+
+def _decompose_matrices(matrices):
+    """Return the (M, 3) locations, XYZ Euler rotations and scales of (M, 4, 4) matrices"""
+    locations = matrices[:, :3, 3]
+    scales = np.linalg.norm(matrices[:, :3, :3], axis=1)
+    # Mirrored matrices keep a negative X scale so the rotation stays proper
+    scales[:, 0] *= np.where(np.linalg.det(matrices[:, :3, :3]) < 0.0, -1.0, 1.0)
+    rotations = matrices[:, :3, :3] / scales[:, None, :]
+    eulers = np.column_stack([
+        np.arctan2(rotations[:, 2, 1], rotations[:, 2, 2]),
+        np.arcsin(np.clip(-rotations[:, 2, 0], -1.0, 1.0)),
+        np.arctan2(rotations[:, 1, 0], rotations[:, 0, 0]),
+    ])
+    return locations, eulers, scales
+
+
+INSTANCER_NODE_GROUP = "Vertex Align Instancer"
+
+
+def _instancer_node_group():
+    """Return the node group instancing an object on mesh points, rotated and scaled by point attributes"""
+    group = bpy.data.node_groups.get(INSTANCER_NODE_GROUP)
+    if group is not None:
+        return group
+    
+    group = bpy.data.node_groups.new(INSTANCER_NODE_GROUP, 'GeometryNodeTree')
+    for name, socket_type, in_out in (("Geometry", 'NodeSocketGeometry', 'INPUT'),
+                                      ("Object", 'NodeSocketObject', 'INPUT'),
+                                      ("Rotation", 'NodeSocketVector', 'INPUT'),
+                                      ("Scale", 'NodeSocketVector', 'INPUT'),
+                                      ("Geometry", 'NodeSocketGeometry', 'OUTPUT')):
+        # Node group sockets moved to the interface API in Blender 4.0
+        if hasattr(group, "interface"):
+            group.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+        elif in_out == 'INPUT':
+            group.inputs.new(socket_type, name)
+        else:
+            group.outputs.new(socket_type, name)
+    
+    group_input = group.nodes.new('NodeGroupInput')
+    group_output = group.nodes.new('NodeGroupOutput')
+    object_info = group.nodes.new('GeometryNodeObjectInfo')
+    instance = group.nodes.new('GeometryNodeInstanceOnPoints')
+    group_input.location = (-400, 0)
+    object_info.location = (-200, -150)
+    group_output.location = (200, 0)
+    group.links.new(group_input.outputs["Object"], object_info.inputs["Object"])
+    group.links.new(group_input.outputs[0], instance.inputs["Points"])
+    group.links.new(object_info.outputs["Geometry"], instance.inputs["Instance"])
+    group.links.new(group_input.outputs["Rotation"], instance.inputs["Rotation"])
+    group.links.new(group_input.outputs["Scale"], instance.inputs["Scale"])
+    group.links.new(instance.outputs["Instances"], group_output.inputs[0])
+    return group
+
+
+def _node_group_inputs(group):
+    """Return {name: identifier} of the inputs of a node group, which name the modifier properties"""
+    if hasattr(group, "interface"):
+        return {item.name: item.identifier for item in group.interface.items_tree
+                if item.item_type == 'SOCKET' and item.in_out == 'INPUT'}
+    return {socket.name: socket.identifier for socket in group.inputs}
+
+
+def create_instancer(source_obj, world_matrices, collection):
+    """Create one object instancing source_obj at every (M, 4, 4) world matrix with geometry nodes
+
+    The placements are the points of a new mesh with 'rotation' and 'scale' point attributes, all
+    written with foreach_set, so thousands of placements cost a single object. Returns the object.
+    """
+    locations, eulers, scales = _decompose_matrices(world_matrices)
+    mesh = bpy.data.meshes.new(f"{source_obj.name} Instances")
+    mesh.vertices.add(len(world_matrices))
+    mesh.vertices.foreach_set("co", locations.astype(np.float32).ravel())
+    for name, values in (("rotation", eulers), ("scale", scales)):
+        attribute = mesh.attributes.new(name, 'FLOAT_VECTOR', 'POINT')
+        attribute.data.foreach_set("vector", values.astype(np.float32).ravel())
+    mesh.update()
+    
+    instancer = bpy.data.objects.new(mesh.name, mesh)
+    collection.objects.link(instancer)
+    modifier = instancer.modifiers.new(INSTANCER_NODE_GROUP, 'NODES')
+    modifier.node_group = _instancer_node_group()
+    inputs = _node_group_inputs(modifier.node_group)
+    modifier[inputs["Object"]] = source_obj
+    for name in ("Rotation", "Scale"):
+        modifier[inputs[name] + "_use_attribute"] = True
+        modifier[inputs[name] + "_attribute_name"] = name.lower()
+    return instancer
+
+
+class OBJECT_OT_align_to_many(Operator):
+    """Place copies of the active object on every matching island of a target, aligned by an anchor set"""
+    bl_idname = "object.align_to_many"
+    bl_label = "Align to Many"
     bl_options = {'REGISTER', 'UNDO'}
     
-    def execute(self, context):
+    source_set: StringProperty(
+        name="Source Set",
+        description="Anchor set of the active object placed on each island",
+    )
+    target_object: StringProperty(
+        name="Target Object",
+        description="Object holding the islands",
+    )
+    islands: EnumProperty(
+        name="Islands",
+        description="Where the placements on the target come from",
+        items=ISLAND_SOURCE_ITEMS,
+        default='FACES',
+    )
+    island_name: StringProperty(
+        name="Group / Set",
+        description="Vertex group (Vertex Group) or example anchor set (Repeated Pattern) of the target",
+    )
+    tolerance: FloatProperty(
+        name="Pattern Tolerance",
+        description="Largest descriptor distance of a vertex to the example for Repeated Pattern",
+        default=0.5,
+        min=0.0,
+    )
+    use_mate: BoolProperty(
+        name="Mate Surfaces",
+        description="Turn the anchor set against the island surface, so one rests on the other",
+        default=True,
+    )
+    roll: FloatProperty(
+        name="Roll",
+        description="Extra rotation of every copy around the island normal",
+        default=0.0,
+        subtype='ANGLE',
+    )
+    output: EnumProperty(
+        name="Output",
+        items=[
+            ('LINKED', "Linked Duplicates", "One object per placement, sharing the mesh of the source"),
+            ('INSTANCES', "Geometry Nodes Instances", "One object instancing the source on every placement"),
+        ],
+        default='LINKED',
+    )
+    
+    def invoke(self, context, event):
         obj = context.active_object
-        
-        if obj is None or obj.type != 'MESH':
+        if not self.source_set and obj is not None and obj.type == 'MESH':
+            index = obj.vertex_align_anchor_set_index
+            if 0 <= index < len(obj.vertex_align_anchor_sets):
+                self.source_set = obj.vertex_align_anchor_sets[index].name
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def draw(self, context):
+        layout = self.layout
+        obj = context.active_object
+        if obj is not None and obj.type == 'MESH':
+            layout.prop_search(self, "source_set", obj, "vertex_align_anchor_sets")
+        layout.prop_search(self, "target_object", bpy.data, "objects")
+        layout.prop(self, "islands")
+        target_obj = bpy.data.objects.get(self.target_object)
+        if target_obj is not None and target_obj.type == 'MESH':
+            if self.islands == 'GROUP':
+                layout.prop_search(self, "island_name", target_obj, "vertex_groups")
+            elif self.islands == 'PATTERN':
+                layout.prop_search(self, "island_name", target_obj, "vertex_align_anchor_sets")
+                layout.prop(self, "tolerance")
+        layout.prop(self, "use_mate")
+        layout.prop(self, "roll")
+        layout.prop(self, "output")
+    
+    def execute(self, context):
+        source_obj = context.active_object
+        if source_obj is None or source_obj.type != 'MESH':
             self.report({'ERROR'}, "No active mesh object")
             return {'CANCELLED'}
         
-        if obj.mode != 'EDIT':
-            self.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
+        source_set = source_obj.vertex_align_anchor_sets.get(self.source_set)
+        if source_set is None or len(source_set.anchors) == 0:
+            self.report({'ERROR'}, f"{source_obj.name} has no anchor set '{self.source_set}'")
             return {'CANCELLED'}
         
-        import bmesh
-        bm = bmesh.from_edit_mesh(obj.data)
-        
-        selected_verts = [v for v in bm.verts if v.select]
+        target_obj = bpy.data.objects.get(self.target_object)
+        if target_obj is None or target_obj.type != 'MESH' or target_obj == source_obj:
+            self.report({'ERROR'}, "No target object")
+            return {'CANCELLED'}
         
-        if len(selected_verts) == 0:
-            self.report({'ERROR'}, "No vertex selected")
+        depsgraph = _geometry_depsgraph(context)
+        try:
+            frames = target_island_frames(target_obj, self.islands, self.island_name, self.tolerance, depsgraph)
+        except KeyError as error:
+            self.report({'ERROR'}, str(error.args[0]))
+            return {'CANCELLED'}
+        if not len(frames):
+            self.report({'ERROR'}, f"No islands found on {target_obj.name}")
             return {'CANCELLED'}
         
-        if len(selected_verts) > 1:
-            self.report({'WARNING'}, "Multiple vertices selected, using the first one")
+        transforms = placement_transforms(_anchor_set_frame(source_obj, source_set, depsgraph), frames,
+                                          self.use_mate, self.roll)
+        collection = source_obj.users_collection[0] if source_obj.users_collection else context.scene.collection
         
-        vertex_index = selected_verts[0].index
-        context.scene.vertex_align_target_object = obj.name
-        context.scene.vertex_align_target_vertex_1 = vertex_index
+        if self.output == 'INSTANCES':
+            instancer = create_instancer(source_obj, transforms @ _matrix_to_array(source_obj.matrix_world), collection)
+            self.report({'INFO'}, f"Instanced {source_obj.name} on {len(frames)} islands of {target_obj.name} "
+                                  f"({instancer.name})")
+            return {'FINISHED'}
         
-        self.report({'INFO'}, f"Target vertex 1 marked: {obj.name}, index {vertex_index}")
+        # Object copies share the mesh and keep parenting, modifiers, constraints and anchor sets
+        copies = []
+        for _ in range(len(transforms)):
+            copy = source_obj.copy()
+            collection.objects.link(copy)
+            copies.append(copy)
+        if source_obj.parent is not None and source_obj.parent_type != 'OBJECT':
+            # Bone and vertex parent spaces are read back from the evaluated matrix_world
+            context.view_layer.update()
+        apply_alignment_transforms(copies, transforms)
+        log_alignments(context.scene, "align_to_many", [_log_entry(copy, target_obj, transform)
+                                                       for copy, transform in zip(copies, transforms)],
+                       use_hierarchy_root=False)
+        
+        self.report({'INFO'}, f"Placed {len(copies)} linked duplicates of {source_obj.name} on {target_obj.name}")
         
         return {'FINISHED'}
 
 
-class OBJECT_OT_mark_target_vertex_2(Operator):
-    """Mark the selected vertex as target point 2 (direction)"""
-    bl_idname = "object.mark_target_vertex_2"
-    bl_label = "Mark Target Vertex 2"
+class OBJECT_OT_align_instances(Operator):
+    """Align the marked source once and apply the same move to all of its instances"""
+    bl_idname = "object.align_instances"
+    bl_label = "Align All Instances"
     bl_options = {'REGISTER', 'UNDO'}
     
+    instances: EnumProperty(
+        name="Instances",
+        description="Which instances of the source move with it",
+        items=[
+            ('MESH', "Linked Duplicates", "All objects sharing the mesh datablock of the marked source"),
+            ('COLLECTION', "Collection Instances",
+             "All empties instancing the same collection as the active empty (the marked source is inside it)"),
+        ],
+        default='MESH',
+    )
+    
     def execute(self, context):
-        obj = context.active_object
-        
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No active mesh object")
-            return {'CANCELLED'}
+        scene = context.scene
         
-        if obj.mode != 'EDIT':
-            self.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
+        source_obj = bpy.data.objects.get(scene.vertex_align_source_object)
+        target_obj = bpy.data.objects.get(scene.vertex_align_target_object)
+        if source_obj is None:
+            self.report({'ERROR'}, "No source object marked")
             return {'CANCELLED'}
-        
-        # Check if target vertex 1 is marked
-        target_obj_name = context.scene.vertex_align_target_object
-        if not target_obj_name or target_obj_name != obj.name:
-            self.report({'ERROR'}, "Mark target vertex 1 first on this object")
+        if target_obj is None:
+            self.report({'ERROR'}, "No target object marked")
             return {'CANCELLED'}
         
-        import bmesh
-        bm = bmesh.from_edit_mesh(obj.data)
-        
-        selected_verts = [v for v in bm.verts if v.select]
-        
-        if len(selected_verts) == 0:
-            self.report({'ERROR'}, "No vertex selected")
+        source_indices, target_indices = _marked_point_pairs(scene)
+        if not source_indices:
+            self.report({'ERROR'}, "Mark source and target vertex 1 first")
             return {'CANCELLED'}
         
-        if len(selected_verts) > 1:
-            self.report({'WARNING'}, "Multiple vertices selected, using the first one")
+        depsgraph = _geometry_depsgraph(context)
+        source_points = _world_points(source_obj, source_indices, depsgraph)
+        target_points = _world_points(target_obj, target_indices, depsgraph)
         
-        vertex_index = selected_verts[0].index
-        
-        # Check that it's different from vertex 1
-        if vertex_index == context.scene.vertex_align_target_vertex_1:
-            self.report({'ERROR'}, "Vertex 2 must be different from vertex 1")
-            return {'CANCELLED'}
+        if self.instances == 'COLLECTION':
+            instancer = context.active_object
+            collection = instancer.instance_collection if instancer is not None else None
+            if (collection is None or instancer.instance_type != 'COLLECTION' or
+                    source_obj.name not in collection.all_objects):
+                self.report({'ERROR'}, "Active object must be an empty instancing the collection of the source")
+                return {'CANCELLED'}
+            
+            # Where the marked points appear through the active instance
+            instance_matrix = (_matrix_to_array(instancer.matrix_world) @
+                               _matrix_to_array(mathutils.Matrix.Translation(-collection.instance_offset)))
+            source_points = _transform_points(instance_matrix, source_points)
+            placement = _matrix_to_array(instancer.matrix_world)
+            objects = [obj for obj in scene.objects
+                       if obj.instance_type == 'COLLECTION' and obj.instance_collection == collection]
+        else:
+            placement = _matrix_to_array(source_obj.matrix_world)
+            # A target sharing the mesh stays where it is, it holds the target marks
+            objects = [obj for obj in scene.objects if obj.data == source_obj.data and obj != target_obj]
         
-        context.scene.vertex_align_target_vertex_2 = vertex_index
+        # One solve in world space, expressed in the instance's own space and shared by every instance
+        transform, residual = _solve_point_sets(source_points, target_points)
+        local_transform = np.linalg.inv(placement) @ transform @ placement
+        transforms = apply_local_transform(objects, local_transform, scene.vertex_align_use_hierarchy_root)
+        # Only the marked source can be solved again from the marks, the others replay their move
+        marks = {source_obj: (source_indices, target_indices)}
+        log_alignments(scene, "instances", [
+            _log_entry(obj, target_obj, obj_transform, residual, *marks.get(obj, (None, None)))
+            for obj, obj_transform in zip(objects, transforms)])
         
-        self.report({'INFO'}, f"Target vertex 2 marked: {obj.name}, index {vertex_index}")
+        self.report({'INFO'}, f"Aligned {len(objects)} instances to {target_obj.name} (RMS residual {residual:.6g})")
         
         return {'FINISHED'}
 
 
-class OBJECT_OT_mark_target_vertex_3(Operator):
-    """Mark the selected vertex as target point 3 (plane)"""
-    bl_idname = "object.mark_target_vertex_3"
-    bl_label = "Mark Target Vertex 3"
+def _uniform_color_shader():
+    """Return the built-in flat color shader (its name changed in Blender 4.0)"""
+    try:
+        return gpu.shader.from_builtin('UNIFORM_COLOR')
+    except ValueError:
+        return gpu.shader.from_builtin('3D_UNIFORM_COLOR')
+
+
+# Vertices sampled per mesh to score candidate alignments by overlap
+CANDIDATE_SOURCE_SAMPLES = 2000
+CANDIDATE_TARGET_SAMPLES = 200000
+
+
+class OBJECT_OT_align_preview(Operator):
+    """Preview the pending alignment as a ghost of the source, apply on confirm"""
+    bl_idname = "object.align_preview"
+    bl_label = "Preview Alignment"
     bl_options = {'REGISTER', 'UNDO'}
     
-    def execute(self, context):
-        obj = context.active_object
-        
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No active mesh object")
+    max_preview_edges: IntProperty(
+        name="Max Wireframe Edges",
+        description="Meshes with more edges are previewed as a bounding box",
+        default=200000,
+        min=0,
+    )
+    use_candidates: BoolProperty(
+        name="Candidates",
+        description="Enumerate 90° rolls and swapped vertex orders, ranked by overlap with the target, "
+                    "and cycle through them with the arrow keys",
+        default=False,
+    )
+    use_mirror: BoolProperty(
+        name="Mirror Flips",
+        description="Also enumerate mirrored candidates (the object gets a negative scale)",
+        default=False,
+    )
+    candidate: IntProperty(
+        name="Candidate",
+        description="Rank of the candidate to apply",
+        default=0,
+        min=0,
+    )
+    
+    def _solve(self, context):
+        """Return the marked solution, with its ranked candidates when enumerating them"""
+        depsgraph = _geometry_depsgraph(context)
+        solution = _solve_marked_alignment(context.scene, depsgraph)
+        if self.use_candidates:
+            source_obj = solution["source"]
+            target_obj = solution["target"]
+            source_samples = _transform_points(_matrix_to_array(source_obj.matrix_world),
+                                               _sample_rows(_object_coords(source_obj, depsgraph), CANDIDATE_SOURCE_SAMPLES))
+            target_samples = _transform_points(_matrix_to_array(target_obj.matrix_world),
+                                               _sample_rows(_object_coords(target_obj, depsgraph), CANDIDATE_TARGET_SAMPLES))
+            solution["candidates"] = rank_alignment_candidates(solution["source_points"], solution["target_points"],
+                                                               source_samples, target_samples, self.use_mirror)
+            self.candidate = min(self.candidate, len(solution["candidates"][0]) - 1)
+            solution["transform"] = solution["candidates"][0][self.candidate]
+        return solution
+    
+    def invoke(self, context, event):
+        if context.area is None or context.area.type != 'VIEW_3D':
+            self.report({'ERROR'}, "Run the preview from a 3D Viewport")
             return {'CANCELLED'}
         
-        if obj.mode != 'EDIT':
-            self.report({'ERROR'}, "Switch to Edit Mode to select a vertex")
+        self.candidate = 0
+        try:
+            solution = self._solve(context)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
             return {'CANCELLED'}
         
-        # Check if target vertices 1 and 2 are marked
-        target_obj_name = context.scene.vertex_align_target_object
-        if not target_obj_name or target_obj_name != obj.name:
-            self.report({'ERROR'}, "Mark target vertex 1 and 2 first on this object")
-            return {'CANCELLED'}
+        self._solution = solution
+        self._build_batches(solution)
+        self._handler = bpy.types.SpaceView3D.draw_handler_add(self._draw, (), 'WINDOW', 'POST_VIEW')
+        self._update_header(context)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def _log(self, scene, solution):
+        """Log the applied solution; a chosen candidate cannot be solved again from the marks"""
+        if "candidates" in solution:
+            entry = _log_entry(solution["source"], solution["target"], solution["transform"],
+                               solution["candidates"][2][self.candidate])
+            log_alignments(scene, "candidate", [entry])
+            return
+        source_indices, target_indices = _marked_point_pairs(scene)
+        log_alignments(scene, "preview", [_log_entry(solution["source"], solution["target"], solution["transform"],
+                                                     solution["residual"], source_indices, target_indices)])
+    
+    def _update_header(self, context):
+        solution = self._solution
+        text = f"Align preview: {solution['source'].name} → {solution['target'].name}, "
+        if "candidates" in solution:
+            _, overlaps, residuals = solution["candidates"]
+            text += (f"candidate {self.candidate + 1}/{len(overlaps)}, overlap {overlaps[self.candidate]:.0%}, "
+                     f"RMS residual {residuals[self.candidate]:.6g} | ←/→: previous/next, ")
+        else:
+            text += f"RMS residual {solution['residual']:.6g} | "
+        context.area.header_text_set(text + "Enter/Left click: apply, Esc/Right click: cancel")
+        context.area.tag_redraw()
+    
+    def _build_batches(self, solution):
+        """Build the GPU batches once, in the source's local space, so a redraw is a single matrix multiply"""
+        source_obj = solution["source"]
+        self._shader = _uniform_color_shader()
         
-        if context.scene.vertex_align_target_vertex_2 < 0:
-            self.report({'ERROR'}, "Mark target vertex 2 first")
-            return {'CANCELLED'}
+        mesh = source_obj.data
+        if source_obj.type == 'MESH' and len(mesh.edges) <= self.max_preview_edges:
+            coords = _object_coords(source_obj).astype(np.float32)
+            edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+            mesh.edges.foreach_get("vertices", edges)
+            edges = edges.reshape(-1, 2)
+        else:
+            coords = np.array(source_obj.bound_box, dtype=np.float32)
+            edges = np.array([(0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6), (6, 7), (7, 4),
+                              (0, 4), (1, 5), (2, 6), (3, 7)], dtype=np.int32)
+        self._ghost_batch = batch_for_shader(self._shader, 'LINES', {"pos": coords}, indices=edges)
         
-        import bmesh
-        bm = bmesh.from_edit_mesh(obj.data)
+        # Marked points land on the target points, draw both with the target 1→2 axis
+        target_points = solution["target_points"].astype(np.float32)
+        self._target_batch = batch_for_shader(self._shader, 'POINTS', {"pos": target_points})
+        self._axis_batch = None
+        if len(target_points) >= 2:
+            self._axis_batch = batch_for_shader(self._shader, 'LINES', {"pos": target_points[:2]})
+        self._place_ghost(solution)
+    
+    def _place_ghost(self, solution):
+        """Move the ghost and the moved points to the current transform of the solution"""
+        self._ghost_matrix = mathutils.Matrix(
+            (solution["transform"] @ _matrix_to_array(solution["source"].matrix_world)).tolist())
+        moved_points = _transform_points(solution["transform"], solution["source_points"]).astype(np.float32)
+        self._moved_batch = batch_for_shader(self._shader, 'POINTS', {"pos": moved_points})
+    
+    def _draw(self):
+        gpu.state.blend_set('ALPHA')
+        gpu.state.depth_test_set('NONE')
+        gpu.state.line_width_set(1.0)
+        self._shader.bind()
         
-        selected_verts = [v for v in bm.verts if v.select]
+        with gpu.matrix.push_pop():
+            gpu.matrix.multiply_matrix(self._ghost_matrix)
+            self._shader.uniform_float("color", (0.2, 0.8, 1.0, 0.35))
+            self._ghost_batch.draw(self._shader)
         
-        if len(selected_verts) == 0:
-            self.report({'ERROR'}, "No vertex selected")
-            return {'CANCELLED'}
+        if self._axis_batch is not None:
+            gpu.state.line_width_set(2.0)
+            self._shader.uniform_float("color", (1.0, 0.8, 0.1, 1.0))
+            self._axis_batch.draw(self._shader)
         
-        if len(selected_verts) > 1:
-            self.report({'WARNING'}, "Multiple vertices selected, using the first one")
+        gpu.state.point_size_set(10.0)
+        self._shader.uniform_float("color", (1.0, 0.3, 0.1, 1.0))
+        self._target_batch.draw(self._shader)
+        gpu.state.point_size_set(6.0)
+        self._shader.uniform_float("color", (0.2, 0.8, 1.0, 1.0))
+        self._moved_batch.draw(self._shader)
         
-        vertex_index = selected_verts[0].index
+        gpu.state.point_size_set(1.0)
+        gpu.state.line_width_set(1.0)
+        gpu.state.blend_set('NONE')
+    
+    def _finish(self, context):
+        bpy.types.SpaceView3D.draw_handler_remove(self._handler, 'WINDOW')
+        context.area.header_text_set(None)
+        context.area.tag_redraw()
+    
+    def modal(self, context, event):
+        if event.type in {'LEFTMOUSE', 'RET', 'NUMPAD_ENTER'} and event.value == 'PRESS':
+            self._finish(context)
+            apply_alignment_transforms([self._solution["source"]], self._solution["transform"][None],
+                                       context.scene.vertex_align_use_hierarchy_root)
+            self._log(context.scene, self._solution)
+            self.report({'INFO'}, f"Aligned {self._solution['source'].name} to {self._solution['target'].name}")
+            return {'FINISHED'}
         
-        # Check that it's different from vertices 1 and 2
-        if vertex_index == context.scene.vertex_align_target_vertex_1:
-            self.report({'ERROR'}, "Vertex 3 must be different from vertex 1")
+        if event.type in {'RIGHTMOUSE', 'ESC'} and event.value == 'PRESS':
+            self._finish(context)
             return {'CANCELLED'}
-        if vertex_index == context.scene.vertex_align_target_vertex_2:
-            self.report({'ERROR'}, "Vertex 3 must be different from vertex 2")
+        
+        # Cycle through the ranked candidates without solving again
+        if "candidates" in self._solution and event.type in {'LEFT_ARROW', 'RIGHT_ARROW'} and event.value == 'PRESS':
+            candidates = self._solution["candidates"][0]
+            step = 1 if event.type == 'RIGHT_ARROW' else -1
+            self.candidate = (self.candidate + step) % len(candidates)
+            self._solution["transform"] = candidates[self.candidate]
+            self._place_ghost(self._solution)
+            self._update_header(context)
+            return {'RUNNING_MODAL'}
+        
+        # Let viewport navigation through while previewing
+        return {'PASS_THROUGH'}
+    
+    def execute(self, context):
+        # Without a viewport (e.g. redo), apply directly, the chosen candidate is kept in self.candidate
+        try:
+            solution = self._solve(context)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
             return {'CANCELLED'}
+        apply_alignment_transforms([solution["source"]], solution["transform"][None],
+                                   context.scene.vertex_align_use_hierarchy_root)
+        self._log(context.scene, solution)
+        return {'FINISHED'}
+
+
+# Stay Aligned links re-solve from a timer once their target has been quiet for LIVE_LINK_DELAY
+# seconds, or at least every LIVE_LINK_MAX_WAIT seconds while it keeps moving (interactive drags)
+LIVE_LINK_DELAY = 0.05
+LIVE_LINK_MAX_WAIT = 0.2
+
+# index: {target object pointer: source object names}, rebuilt when None; dirty: source names
+# waiting for the timer; last: {source object pointer: target points it was last aligned to}
+_live_link_state = {"index": None, "dirty": set(), "first_update": 0.0, "last_update": 0.0, "last": {}}
+
+
+def _invalidate_live_links():
+    _live_link_state["index"] = None
+    _live_link_state["dirty"].clear()
+    _live_link_state["last"].clear()
+
+
+def _live_link_targets():
+    """Return {target object pointer: source object names} of the enabled Stay Aligned links"""
+    index = _live_link_state["index"]
+    if index is None:
+        index = _live_link_state["index"] = {}
+        for obj in bpy.data.objects:
+            link = obj.vertex_align_live_link
+            if link.enabled and link.target is not None:
+                index.setdefault(link.target.as_pointer(), set()).add(obj.name)
+    return index
+
+
+def _schedule_live_links(source_names):
+    """Mark links dirty and make sure the debounce timer runs"""
+    now = time.perf_counter()
+    if not _live_link_state["dirty"]:
+        _live_link_state["first_update"] = now
+    _live_link_state["dirty"].update(source_names)
+    _live_link_state["last_update"] = now
+    if not bpy.app.timers.is_registered(_update_live_links):
+        bpy.app.timers.register(_update_live_links, first_interval=LIVE_LINK_DELAY)
+
+
+def _live_link_target_points(link, depsgraph=None):
+    """Return the world-space points of the target vertices a link follows, remapped by stable ID"""
+    indices = [anchor.index for anchor in link.target_anchors]
+    if not link.use_evaluated:
+        indices = _remap_stable_indices(link.target, indices, link.target_anchors)
+    return _world_points(link.target, indices, depsgraph)
+
+
+def _update_live_links():
+    """Timer callback re-solving the dirty Stay Aligned links in one vectorized write
+
+    The target points come from the marked point cache, so a moved target only transforms its few
+    marked points and an edited one only rereads its marked vertices. Links whose target points did
+    not change since their last solve are skipped.
+    """
+    now = time.perf_counter()
+    quiet = now - _live_link_state["last_update"]
+    if quiet < LIVE_LINK_DELAY and now - _live_link_state["first_update"] < LIVE_LINK_MAX_WAIT:
+        return LIVE_LINK_DELAY - quiet
+    
+    dirty = list(_live_link_state["dirty"])
+    _live_link_state["dirty"].clear()
+    depsgraph = None
+    sources = []
+    transforms = []
+    entries = []
+    for name in dirty:
+        source = bpy.data.objects.get(name)
+        if source is None:
+            # Renamed or deleted source, the index is stale
+            _live_link_state["index"] = None
+            continue
+        link = source.vertex_align_live_link
+        if not link.enabled or link.target is None:
+            continue
         
-        context.scene.vertex_align_target_vertex_3 = vertex_index
+        if link.use_evaluated and depsgraph is None:
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+        try:
+            target_points = _live_link_target_points(link, depsgraph if link.use_evaluated else None)
+        except IndexError:
+            continue
         
-        self.report({'INFO'}, f"Target vertex 3 marked: {obj.name}, index {vertex_index}")
+        # Dirty check: the target moved or was edited without moving its marked vertices
+        last = _live_link_state["last"].get(source.as_pointer())
+        if last is not None and last.shape == target_points.shape and np.allclose(last, target_points, atol=1e-7):
+            continue
         
-        return {'FINISHED'}
+        transform, residual = _solve_point_sets(_anchor_world_points(source, link.source_anchors), target_points)
+        sources.append(source)
+        transforms.append(transform)
+        entries.append(_log_entry(source, link.target, transform, residual))
+        _live_link_state["last"][source.as_pointer()] = target_points
+    
+    apply_alignment_transforms(sources, np.array(transforms))
+    log_alignments(bpy.context.scene, "live_link", entries, use_hierarchy_root=False)
+    return None
 
 
-class OBJECT_OT_align_smart(Operator):
-    """Align source to target (automatically detects position only, partial rotation, or full rotation)"""
-    bl_idname = "object.align_smart"
-    bl_label = "Align objects"
+class OBJECT_OT_align_live_link(Operator):
+    """Keep the marked source aligned to the marked target, re-solving whenever the target moves or is edited"""
+    bl_idname = "object.align_live_link"
+    bl_label = "Stay Aligned"
     bl_options = {'REGISTER', 'UNDO'}
     
+    enable: BoolProperty(
+        name="Enable",
+        description="Link the marked source to the marked target, or unlink the selected objects",
+        default=True,
+    )
+    
     def execute(self, context):
-        # Get source object
-        source_obj_name = context.scene.vertex_align_source_object
-        if not source_obj_name or source_obj_name not in bpy.data.objects:
-            self.report({'ERROR'}, "No source object marked")
-            return {'CANCELLED'}
-        
-        source_obj = bpy.data.objects[source_obj_name]
-        source_vertex_1_index = context.scene.vertex_align_source_vertex_1
-        source_vertex_2_index = context.scene.vertex_align_source_vertex_2
-        source_vertex_3_index = context.scene.vertex_align_source_vertex_3
+        if not self.enable:
+            unlinked = 0
+            for obj in context.selected_objects:
+                if obj.vertex_align_live_link.enabled:
+                    obj.vertex_align_live_link.enabled = False
+                    unlinked += 1
+            _invalidate_live_links()
+            self.report({'INFO'}, f"Unlinked {unlinked} objects")
+            return {'FINISHED'}
         
-        # Get target object
-        target_obj_name = context.scene.vertex_align_target_object
-        if not target_obj_name or target_obj_name not in bpy.data.objects:
-            self.report({'ERROR'}, "No target object marked")
+        scene = context.scene
+        depsgraph = _geometry_depsgraph(context)
+        try:
+            solved = _solve_marked_alignment(scene, depsgraph)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
             return {'CANCELLED'}
         
-        target_obj = bpy.data.objects[target_obj_name]
-        target_vertex_1_index = context.scene.vertex_align_target_vertex_1
-        target_vertex_2_index = context.scene.vertex_align_target_vertex_2
-        target_vertex_3_index = context.scene.vertex_align_target_vertex_3
+        source_obj = solved["source"]
+        target_obj = solved["target"]
+        source_indices, target_indices = _marked_point_pairs(scene)
+        if source_obj == target_obj:
+            self.report({'ERROR'}, "Source and target must be different objects")
+            return {'CANCELLED'}
+        if any(isinstance(index, tuple) for index in target_indices):
+            self.report({'ERROR'}, "Stay Aligned follows vertex marks on the target, re-mark it with vertices")
+            return {'CANCELLED'}
         
-        # Determine alignment mode
-        has_3_vertices = (source_vertex_2_index >= 0 and target_vertex_2_index >= 0 and 
-                         source_vertex_3_index >= 0 and target_vertex_3_index >= 0)
-        has_2_vertices = (source_vertex_2_index >= 0 and target_vertex_2_index >= 0)
-        
-        # Make sure we're in Object mode
-        if context.mode != 'OBJECT':
-            bpy.ops.object.mode_set(mode='OBJECT')
-        
-        if has_3_vertices:
-            # FULL ROTATION alignment (3 vertices) - Sequential approach
-            # STEP 1: Align with 2 vertices (this code works perfectly)
-            source_v1_local = source_obj.data.vertices[source_vertex_1_index].co
-            source_v2_local = source_obj.data.vertices[source_vertex_2_index].co
-            source_v3_local = source_obj.data.vertices[source_vertex_3_index].co
-            source_v1_world = source_obj.matrix_world @ source_v1_local
-            source_v2_world = source_obj.matrix_world @ source_v2_local
-            
-            target_v1_local = target_obj.data.vertices[target_vertex_1_index].co
-            target_v2_local = target_obj.data.vertices[target_vertex_2_index].co
-            target_v3_local = target_obj.data.vertices[target_vertex_3_index].co
-            target_v1_world = target_obj.matrix_world @ target_v1_local
-            target_v2_world = target_obj.matrix_world @ target_v2_local
-            target_v3_world = target_obj.matrix_world @ target_v3_local
-            
-            # Calculate direction vectors
-            source_dir = (source_v2_world - source_v1_world).normalized()
-            target_dir = (target_v2_world - target_v1_world).normalized()
-            
-            # Calculate rotation needed
-            rotation_quat = source_dir.rotation_difference(target_dir)
-            rotation_matrix = rotation_quat.to_matrix().to_4x4()
-            
-            # Create translation matrix to move pivot to source vertex 1
-            pivot_to_origin = mathutils.Matrix.Translation(-source_v1_world)
-            origin_to_pivot = mathutils.Matrix.Translation(source_v1_world)
-            
-            # Apply rotation around source vertex 1
-            source_obj.matrix_world = origin_to_pivot @ rotation_matrix @ pivot_to_origin @ source_obj.matrix_world
-            
-            # Align positions
-            source_v1_world_new = source_obj.matrix_world @ source_v1_local
-            offset = target_v1_world - source_v1_world_new
-            source_obj.location += offset
-            
-            # STEP 2: Rotate around axis 1→2 to align vertex 3
-            # Recalculate positions after step 1
-            source_v1_world = source_obj.matrix_world @ source_v1_local
-            source_v2_world = source_obj.matrix_world @ source_v2_local
-            source_v3_world = source_obj.matrix_world @ source_v3_local
-            
-            # The rotation axis (now aligned between source and target)
-            axis = (target_v2_world - target_v1_world).normalized()
-            
-            # Project v3 onto plane perpendicular to axis
-            # Source v3 projection
-            v1_to_v3_source = source_v3_world - source_v1_world
-            proj_on_axis_source = v1_to_v3_source.dot(axis) * axis
-            perp_source = v1_to_v3_source - proj_on_axis_source
-            
-            # Target v3 projection
-            v1_to_v3_target = target_v3_world - target_v1_world
-            proj_on_axis_target = v1_to_v3_target.dot(axis) * axis
-            perp_target = v1_to_v3_target - proj_on_axis_target
-            
-            # Calculate rotation angle
-            if perp_source.length > 0.0001 and perp_target.length > 0.0001:
-                perp_source_norm = perp_source.normalized()
-                perp_target_norm = perp_target.normalized()
-                
-                # Angle between projections
-                cos_angle = perp_source_norm.dot(perp_target_norm)
-                cos_angle = max(-1.0, min(1.0, cos_angle))  # Clamp to avoid numerical errors
-                angle = mathutils.Vector.angle(perp_source_norm, perp_target_norm)
-                
-                # Determine sign of rotation
-                cross = perp_source_norm.cross(perp_target_norm)
-                if cross.dot(axis) < 0:
-                    angle = -angle
-                
-                # Create rotation around axis
-                rotation_quat_v3 = mathutils.Quaternion(axis, angle)
-                rotation_matrix_v3 = rotation_quat_v3.to_matrix().to_4x4()
-                
-                # Apply rotation around vertex 1
-                pivot_to_origin = mathutils.Matrix.Translation(-source_v1_world)
-                origin_to_pivot = mathutils.Matrix.Translation(source_v1_world)
-                
-                source_obj.matrix_world = origin_to_pivot @ rotation_matrix_v3 @ pivot_to_origin @ source_obj.matrix_world
-                
-                # STEP 3: Realign position (vertex 1 may have moved slightly during rotation)
-                source_v1_world_final = source_obj.matrix_world @ source_v1_local
-                final_offset = target_v1_world - source_v1_world_final
-                source_obj.location += final_offset
-            
-            self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} (position + full rotation)")
+        link = source_obj.vertex_align_live_link
+        link.target = target_obj
+        link.use_evaluated = depsgraph is not None
+        link.source_anchors.clear()
+        for index, co in zip(source_indices, _local_mark_points(source_obj, source_indices, depsgraph)):
+            anchor = link.source_anchors.add()
+            anchor.index = -1 if isinstance(index, tuple) else index
+            anchor.co = co
+        link.target_anchors.clear()
+        for index in target_indices:
+            anchor = link.target_anchors.add()
+            anchor.index = index
+            if depsgraph is None:
+                anchor.uid, anchor.co = _assign_stable_id(target_obj, index)
+        link.enabled = True
         
-        elif has_2_vertices:
-            # POSITION + ROTATION alignment (2 vertices - original working code)
-            source_v1_local = source_obj.data.vertices[source_vertex_1_index].co
-            source_v2_local = source_obj.data.vertices[source_vertex_2_index].co
-            source_v1_world = source_obj.matrix_world @ source_v1_local
-            source_v2_world = source_obj.matrix_world @ source_v2_local
-            
-            target_v1_local = target_obj.data.vertices[target_vertex_1_index].co
-            target_v2_local = target_obj.data.vertices[target_vertex_2_index].co
-            target_v1_world = target_obj.matrix_world @ target_v1_local
-            target_v2_world = target_obj.matrix_world @ target_v2_local
-            
-            # Calculate direction vectors
-            source_dir = (source_v2_world - source_v1_world).normalized()
-            target_dir = (target_v2_world - target_v1_world).normalized()
-            
-            # Calculate rotation needed
-            rotation_quat = source_dir.rotation_difference(target_dir)
-            rotation_matrix = rotation_quat.to_matrix().to_4x4()
-            
-            # Create translation matrix to move pivot to source vertex 1
-            pivot_to_origin = mathutils.Matrix.Translation(-source_v1_world)
-            origin_to_pivot = mathutils.Matrix.Translation(source_v1_world)
-            
-            # Apply rotation around source vertex 1
-            source_obj.matrix_world = origin_to_pivot @ rotation_matrix @ pivot_to_origin @ source_obj.matrix_world
-            
-            # Now align positions
-            source_v1_world_new = source_obj.matrix_world @ source_v1_local
-            offset = target_v1_world - source_v1_world_new
-            source_obj.location += offset
-            
-            self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} (position + rotation)")
+        apply_alignment_transforms([source_obj], solved["transform"][None])
+        log_alignments(scene, "live_link", [_log_entry(source_obj, target_obj, solved["transform"], solved["residual"],
+                                                       source_indices, target_indices)], use_hierarchy_root=False)
+        _invalidate_live_links()
+        _live_link_state["last"][source_obj.as_pointer()] = solved["target_points"]
         
-        else:
-            # POSITION ONLY alignment
-            source_vertex_local = source_obj.data.vertices[source_vertex_1_index].co
-            source_vertex_world = source_obj.matrix_world @ source_vertex_local
-            
-            target_vertex_local = target_obj.data.vertices[target_vertex_1_index].co
-            target_vertex_world = target_obj.matrix_world @ target_vertex_local
-            
-            offset = target_vertex_world - source_vertex_world
-            source_obj.location += offset
-            
-            self.report({'INFO'}, f"Aligned {source_obj.name} to {target_obj.name} (position only)")
+        self.report({'INFO'}, f"{source_obj.name} stays aligned to {target_obj.name}")
         
         return {'FINISHED'}
 
@@ -491,73 +3679,102 @@ class OBJECT_OT_clear_marked_vertices(Operator):
         context.scene.vertex_align_target_vertex_1 = -1
         context.scene.vertex_align_target_vertex_2 = -1
         context.scene.vertex_align_target_vertex_3 = -1
+        context.scene.vertex_align_source_points.clear()
+        context.scene.vertex_align_target_points.clear()
+        context.scene.vertex_align_source_elements.clear()
+        context.scene.vertex_align_target_elements.clear()
+        context.scene.vertex_align_source_anchors.clear()
+        context.scene.vertex_align_target_anchors.clear()
+        context.scene.vertex_align_suggestions.clear()
+        _invalidate_panel_status()
         
         self.report({'INFO'}, "All marked vertices cleared")
         
         return {'FINISHED'}
 
 
-class VIEW3D_PT_vertex_align(Panel):
-    """Panel in the sidebar for Vertex Align tool"""
-    bl_space_type = 'VIEW_3D'
-    bl_region_type = 'UI'
-    bl_category = "Vertex Based Align Tool"
-    bl_label = "Vertex Based Align Tool"
-    
-    def draw(self, context):
-        layout = self.layout
+# Snapshot of what the sidebar panel shows, keyed by scene pointer. It is rebuilt on the first
+# redraw after the mark/clear/align operators or the depsgraph handler invalidated it, so a plain
+# redraw only reads precomputed labels.
+_panel_status = {}
+
+
+def _invalidate_panel_status():
+    _panel_status.clear()
+
+
+def _format_point(point):
+    return f"({point[0]:.3f}, {point[1]:.3f}, {point[2]:.3f})"
+
+
+def _build_panel_status(scene, depsgraph=None):
+    """Compute the labels, mode and residual shown by the panel for the current marks
+
+    depsgraph resolves the marks on modifier results, as the align operators do with Use Modifier Results.
+    """
+    status = {"pointers": set()}
+    for prefix in ("source", "target"):
+        obj = bpy.data.objects.get(getattr(scene, f"vertex_align_{prefix}_object"))
+        status[f"{prefix}_points"] = len(getattr(scene, f"vertex_align_{prefix}_points"))
+        if obj is None:
+            status[prefix] = [("  None marked", 'NONE')]
+            continue
         
-        # Source object information
-        box = layout.box()
-        box.label(text="Source Object:", icon='OBJECT_DATA')
+        status["pointers"].add(obj.as_pointer())
+        indices = _marked_indices(scene, prefix)
+        try:
+            positions = _world_points(obj, indices, depsgraph)
+        except IndexError:
+            positions = None
         
-        source_obj_name = context.scene.vertex_align_source_object
-        if source_obj_name and source_obj_name in bpy.data.objects:
-            box.label(text=f"  {source_obj_name}")
-            
-            v1_index = context.scene.vertex_align_source_vertex_1
-            v2_index = context.scene.vertex_align_source_vertex_2
-            v3_index = context.scene.vertex_align_source_vertex_3
-            
-            box.label(text=f"  Vertex 1: {v1_index}", icon='CHECKMARK')
-            
-            if v2_index >= 0:
-                box.label(text=f"  Vertex 2: {v2_index}", icon='CHECKMARK')
-            else:
-                box.label(text="  Vertex 2: Not marked")
-            
-            if v3_index >= 0:
-                box.label(text=f"  Vertex 3: {v3_index}", icon='CHECKMARK')
+        lines = [(f"  {obj.name}", 'NONE')]
+        for slot in range(1, 4):
+            index = getattr(scene, f"vertex_align_{prefix}_vertex_{slot}")
+            mark = _format_mark(indices[slot - 1]) if slot <= len(indices) else index
+            if index < 0:
+                lines.append((f"  Vertex {slot}: Not marked", 'NONE'))
+            elif positions is None or slot > len(positions):
+                lines.append((f"  Vertex {slot}: {mark} (missing)", 'ERROR'))
             else:
-                box.label(text="  Vertex 3: Not marked")
-        else:
-            box.label(text="  None marked")
+                lines.append((f"  Vertex {slot}: {mark}  {_format_point(positions[slot - 1])}", 'CHECKMARK'))
+        status[prefix] = lines
+    
+    status["count"] = min(len(_marked_indices(scene, "source")), len(_marked_indices(scene, "target")))
+    try:
+        status["residual"] = _solve_marked_alignment(scene, depsgraph)["residual"]
+    except (ValueError, IndexError):
+        status["residual"] = None
+    return status
+
+
+def _panel_status_for(context):
+    """Return the panel snapshot of the context scene, rebuilding it only after an invalidation"""
+    scene = context.scene
+    key = scene.as_pointer()
+    status = _panel_status.get(key)
+    if status is None:
+        status = _panel_status[key] = _build_panel_status(scene, _geometry_depsgraph(context))
+    return status
+
+
+class VIEW3D_PT_vertex_align(Panel):
+    """Panel in the sidebar for Vertex Align tool"""
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Vertex Based Align Tool"
+    bl_label = "Vertex Based Align Tool"
+    
+    def draw(self, context):
+        layout = self.layout
         
-        # Target object information
-        box = layout.box()
-        box.label(text="Target Object:", icon='OBJECT_DATA')
+        status = _panel_status_for(context)
         
-        target_obj_name = context.scene.vertex_align_target_object
-        if target_obj_name and target_obj_name in bpy.data.objects:
-            box.label(text=f"  {target_obj_name}")
-            
-            v1_index = context.scene.vertex_align_target_vertex_1
-            v2_index = context.scene.vertex_align_target_vertex_2
-            v3_index = context.scene.vertex_align_target_vertex_3
-            
-            box.label(text=f"  Vertex 1: {v1_index}", icon='CHECKMARK')
-            
-            if v2_index >= 0:
-                box.label(text=f"  Vertex 2: {v2_index}", icon='CHECKMARK')
-            else:
-                box.label(text="  Vertex 2: Not marked")
-            
-            if v3_index >= 0:
-                box.label(text=f"  Vertex 3: {v3_index}", icon='CHECKMARK')
-            else:
-                box.label(text="  Vertex 3: Not marked")
-        else:
-            box.label(text="  None marked")
+        # Source and target object information
+        for prefix in ("source", "target"):
+            box = layout.box()
+            box.label(text=f"{prefix.title()} Object:", icon='OBJECT_DATA')
+            for text, icon in status[prefix]:
+                box.label(text=text, icon=icon)
         
         layout.separator()
         
@@ -567,6 +3784,7 @@ class VIEW3D_PT_vertex_align(Panel):
         col.operator("object.mark_source_vertex_1", text="Mark Source Vertex 1")
         col.operator("object.mark_source_vertex_2", text="Mark Source Vertex 2 (optional)")
         col.operator("object.mark_source_vertex_3", text="Mark Source Vertex 3 (optional)")
+        col.operator("object.mark_vertices", text="Mark Source 1-3 (click order)").role = 'SOURCE'
         
         layout.separator()
         
@@ -576,25 +3794,107 @@ class VIEW3D_PT_vertex_align(Panel):
         col.operator("object.mark_target_vertex_1", text="Mark Target Vertex 1")
         col.operator("object.mark_target_vertex_2", text="Mark Target Vertex 2 (optional)")
         col.operator("object.mark_target_vertex_3", text="Mark Target Vertex 3 (optional)")
+        col.operator("object.mark_vertices", text="Mark Target 1-3 (click order)").role = 'TARGET'
+        col.operator("object.suggest_target_vertices", text="Suggest Target 1-3", icon='VIEWZOOM')
+        suggestions = context.scene.vertex_align_suggestions
+        for slot in range(1, 4):
+            candidates = [item for item in suggestions if item.slot == slot]
+            if not candidates:
+                continue
+            row = col.row(align=True)
+            row.label(text=f"Vertex {slot}:")
+            for item in candidates:
+                props = row.operator("object.use_target_suggestion", text=str(item.index))
+                props.slot = slot
+                props.index = item.index
+        
+        layout.separator()
+        
+        # Marks on modifier results
+        col = layout.column(align=True)
+        col.prop(context.scene, "vertex_align_use_evaluated")
+        for role in ('SOURCE', 'TARGET'):
+            row = col.row(align=True)
+            row.label(text=f"Cursor → {role.title()}:")
+            for slot in range(1, 4):
+                props = row.operator("object.mark_vertex_at_cursor", text=str(slot))
+                props.role = role
+                props.slot = slot
+        
+        # Marks on edges, faces, vertex groups and surfaces
+        col.prop(context.scene, "vertex_align_mark_element", text="")
+        for role in ('SOURCE', 'TARGET'):
+            row = col.row(align=True)
+            row.label(text=f"Element → {role.title()}:")
+            for slot in range(1, 4):
+                props = row.operator("object.mark_element", text=str(slot))
+                props.role = role
+                props.slot = slot
+                props.element = context.scene.vertex_align_mark_element
         
         layout.separator()
         
         # Alignment operation
         col = layout.column(align=True)
         col.label(text="3. Align objects:", icon='SNAP_ON')
+        col.prop(context.scene, "vertex_align_use_hierarchy_root")
         
         # Check what mode we're in
-        source_v2 = context.scene.vertex_align_source_vertex_2
-        source_v3 = context.scene.vertex_align_source_vertex_3
-        target_v2 = context.scene.vertex_align_target_vertex_2
-        target_v3 = context.scene.vertex_align_target_vertex_3
-        
-        if source_v2 >= 0 and target_v2 >= 0 and source_v3 >= 0 and target_v3 >= 0:
+        count = status["count"]
+        if count >= 3:
             col.operator("object.align_smart", text="Align (Pos + Full Rotation)", icon='ORIENTATION_GLOBAL')
-        elif source_v2 >= 0 and target_v2 >= 0:
+        elif count == 2:
             col.operator("object.align_smart", text="Align (Pos + Partial Rotation)", icon='CON_ROTLIKE')
         else:
             col.operator("object.align_smart", text="Align (Position Only)", icon='CON_LOCLIKE')
+        row = col.row(align=True)
+        row.operator("object.align_preview", text="Preview Alignment", icon='HIDE_OFF').use_candidates = False
+        row.operator("object.align_preview", text="Candidates", icon='FILE_REFRESH').use_candidates = True
+        row = col.row(align=True)
+        row.operator("object.align_live_link", text="Stay Aligned", icon='LINKED').enable = True
+        row.operator("object.align_live_link", text="Unlink", icon='UNLINKED').enable = False
+        if status["residual"] is not None:
+            col.label(text=f"Residual after alignment: {status['residual']:.6g}")
+        
+        layout.separator()
+        
+        # Batch alignment
+        col = layout.column(align=True)
+        col.label(text="Batch Align to Target:", icon='STICKY_UVS_LOC')
+        col.operator("object.align_batch", text="Align Selected Objects").source = 'SELECTED'
+        col.prop(context.scene, "vertex_align_batch_collection", text="")
+        col.operator("object.align_batch", text="Align Collection").source = 'COLLECTION'
+        row = col.row(align=True)
+        row.operator("object.align_instances", text="Linked Duplicates").instances = 'MESH'
+        row.operator("object.align_instances", text="Collection Instances").instances = 'COLLECTION'
+        
+        layout.separator()
+        
+        # Best fit alignment over any number of point pairs
+        col = layout.column(align=True)
+        col.label(text="Best Fit (3+ point pairs):", icon='MOD_SHRINKWRAP')
+        row = col.row(align=True)
+        row.operator("object.mark_points", text=f"Source ({status['source_points']})").role = 'SOURCE'
+        row.operator("object.mark_points", text=f"Target ({status['target_points']})").role = 'TARGET'
+        row = col.row(align=True)
+        row.operator("object.align_best_fit", text="Align (Best Fit)")
+        row.operator("object.align_robust", text="Robust")
+        
+        layout.separator()
+        
+        # Correspondence-free alignment
+        col = layout.column(align=True)
+        col.label(text="Auto Align:", icon='AUTO')
+        col.operator("object.align_auto", text="Auto Align (ICP)")
+        
+        layout.separator()
+        
+        # Alignment log
+        col = layout.column(align=True)
+        col.label(text="Alignment Log:", icon='TEXT')
+        col.prop(context.scene, "vertex_align_use_log")
+        col.prop(context.scene, "vertex_align_log_path", text="")
+        col.operator("object.replay_alignment_log", icon='FILE_REFRESH')
         
         layout.separator()
         
@@ -618,17 +3918,897 @@ class VIEW3D_PT_vertex_align(Panel):
         box.label(text="• Mark Target Vertex 1, 2 & 3")
 
 
+class VIEW3D_UL_vertex_align_anchor_sets(UIList):
+    """List of the anchor sets of an object"""
+    
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "name", text="", emboss=False, icon='EMPTY_AXIS')
+        row.label(text=str(len(item.anchors)))
+
+
+class VIEW3D_PT_vertex_align_anchor_sets(Panel):
+    """Sub-panel listing the named anchor sets of the active object"""
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Vertex Based Align Tool"
+    bl_label = "Anchor Sets"
+    bl_parent_id = "VIEW3D_PT_vertex_align"
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self, context):
+        layout = self.layout
+        obj = context.active_object
+        
+        if obj is None or obj.type != 'MESH':
+            layout.label(text="No active mesh object")
+            return
+        
+        row = layout.row()
+        row.template_list("VIEW3D_UL_vertex_align_anchor_sets", "", obj, "vertex_align_anchor_sets",
+                          obj, "vertex_align_anchor_set_index", rows=3)
+        col = row.column(align=True)
+        col.operator("object.anchor_set_add", icon='ADD', text="")
+        col.operator("object.anchor_set_remove", icon='REMOVE', text="")
+        
+        layout.operator("object.align_to_anchor_set", icon='SNAP_ON')
+        layout.operator("object.align_to_many", icon='PARTICLE_POINT')
+
+
+class OBJECT_OT_assembly_constraint_add(Operator):
+    """Add assembly constraints aligning an anchor set of each selected object to an anchor set of the active object"""
+    bl_idname = "object.assembly_constraint_add"
+    bl_label = "Add Assembly Constraint"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    source_set: StringProperty(
+        name="Source Set",
+        description="Anchor set of the selected objects",
+    )
+    target_set: StringProperty(
+        name="Target Set",
+        description="Anchor set of the active object",
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.type == 'MESH' and len(context.selected_objects) > 1
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def draw(self, context):
+        layout = self.layout
+        source_obj = next((obj for obj in context.selected_objects
+                           if obj != context.active_object and obj.type == 'MESH'), None)
+        if source_obj is not None:
+            layout.prop_search(self, "source_set", source_obj, "vertex_align_anchor_sets")
+        layout.prop_search(self, "target_set", context.active_object, "vertex_align_anchor_sets")
+    
+    def execute(self, context):
+        target_obj = context.active_object
+        if self.target_set not in target_obj.vertex_align_anchor_sets:
+            self.report({'ERROR'}, f"{target_obj.name} has no anchor set '{self.target_set}'")
+            return {'CANCELLED'}
+        
+        source_objs = [obj for obj in context.selected_objects
+                       if obj != target_obj and obj.type == 'MESH' and self.source_set in obj.vertex_align_anchor_sets]
+        if not source_objs:
+            self.report({'ERROR'}, f"No selected object has an anchor set '{self.source_set}'")
+            return {'CANCELLED'}
+        
+        assembly = context.scene.vertex_align_assembly
+        for obj in source_objs:
+            item = assembly.add()
+            item.source = obj
+            item.source_set = self.source_set
+            item.target = target_obj
+            item.target_set = self.target_set
+        context.scene.vertex_align_assembly_index = len(assembly) - 1
+        
+        self.report({'INFO'}, f"Added {len(source_objs)} constraints to {target_obj.name} '{self.target_set}'")
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_assembly_constraint_remove(Operator):
+    """Remove the active assembly constraint"""
+    bl_idname = "object.assembly_constraint_remove"
+    bl_label = "Remove Assembly Constraint"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        return len(context.scene.vertex_align_assembly) > 0
+    
+    def execute(self, context):
+        scene = context.scene
+        index = scene.vertex_align_assembly_index
+        if not 0 <= index < len(scene.vertex_align_assembly):
+            self.report({'ERROR'}, "No active assembly constraint")
+            return {'CANCELLED'}
+        
+        scene.vertex_align_assembly.remove(index)
+        scene.vertex_align_assembly_index = max(0, index - 1)
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_align_assembly(Operator):
+    """Align every part of the assembly to its constraints in one pass and one undo step"""
+    bl_idname = "object.align_assembly"
+    bl_label = "Align Assembly"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        # Anchors carry their local coordinates, so only matrices are read
+        constraints = []
+        references = []
+        for number, item in enumerate(scene.vertex_align_assembly, start=1):
+            if not item.enabled:
+                continue
+            if item.source is None or item.target is None or item.source == item.target:
+                self.report({'ERROR'}, f"Constraint {number} needs two different objects")
+                return {'CANCELLED'}
+            source_set = item.source.vertex_align_anchor_sets.get(item.source_set)
+            target_set = item.target.vertex_align_anchor_sets.get(item.target_set)
+            if source_set is None or target_set is None or not source_set.anchors or not target_set.anchors:
+                self.report({'ERROR'}, f"Constraint {number}: missing anchor set "
+                                       f"'{item.source_set}' or '{item.target_set}'")
+                return {'CANCELLED'}
+            constraints.append((item.source, _anchor_set_world_points(item.source, source_set),
+                                item.target, _anchor_set_world_points(item.target, target_set)))
+            references.append((item.source, item.target, item.source_set, item.target_set))
+        
+        if not constraints:
+            self.report({'ERROR'}, "No enabled assembly constraints")
+            return {'CANCELLED'}
+        
+        try:
+            objects, transforms, residuals = solve_assembly(constraints)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        apply_alignment_transforms(objects, transforms, scene.vertex_align_use_hierarchy_root)
+        solved = {obj: (transform, residual) for obj, transform, residual in zip(objects, transforms, residuals)}
+        log_alignments(scene, "assembly", [
+            _log_entry(source, target, *solved[source], source_set=source_set, target_set=target_set)
+            for source, target, source_set, target_set in references])
+        
+        self.report({'INFO'}, f"Assembled {len(objects)} parts from {len(constraints)} constraints "
+                              f"(max RMS residual {max(residuals):.6g})")
+        
+        return {'FINISHED'}
+
+
+class VIEW3D_UL_vertex_align_assembly(UIList):
+    """List of the assembly constraints of the scene"""
+    
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "enabled", text="")
+        source = item.source.name if item.source is not None else "?"
+        target = item.target.name if item.target is not None else "?"
+        row.label(text=f"{source} '{item.source_set}' → {target} '{item.target_set}'", icon='CONSTRAINT')
+
+
+class VIEW3D_PT_vertex_align_assembly(Panel):
+    """Sub-panel listing the assembly constraints of the scene"""
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Vertex Based Align Tool"
+    bl_label = "Assembly"
+    bl_parent_id = "VIEW3D_PT_vertex_align"
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        
+        row = layout.row()
+        row.template_list("VIEW3D_UL_vertex_align_assembly", "", scene, "vertex_align_assembly",
+                          scene, "vertex_align_assembly_index", rows=3)
+        col = row.column(align=True)
+        col.operator("object.assembly_constraint_add", icon='ADD', text="")
+        col.operator("object.assembly_constraint_remove", icon='REMOVE', text="")
+        
+        layout.operator("object.align_assembly", icon='SNAP_ON')
+
+
+class OBJECT_OT_replay_alignment_log(Operator):
+    """Reapply every alignment of the alignment log in one pass and one undo step"""
+    bl_idname = "object.replay_alignment_log"
+    bl_label = "Replay Alignment Log"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    mode: EnumProperty(
+        name="Mode",
+        items=[
+            ('RESOLVE', "Re-solve", "Solve every alignment again from its anchors on the current meshes"),
+            ('DELTA', "Recorded Moves", "Apply the recorded moves exactly as they were logged"),
+        ],
+        default='RESOLVE',
+    )
+    filepath: StringProperty(
+        name="Log File",
+        description="JSON Lines log to replay (default: the log text in this file)",
+        subtype='FILE_PATH',
+    )
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        try:
+            entries = read_alignment_log(bpy.path.abspath(self.filepath) if self.filepath else None)
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, f"Cannot read the alignment log: {error}")
+            return {'CANCELLED'}
+        if not entries:
+            self.report({'ERROR'}, "The alignment log is empty")
+            return {'CANCELLED'}
+        
+        try:
+            aligned, skipped = replay_alignment_log(entries, self.mode, _geometry_depsgraph(context))
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        
+        message = f"Replayed {len(entries)} log entries on {aligned} objects"
+        if skipped:
+            self.report({'WARNING'}, f"{message}, skipped {skipped} entries of missing objects")
+        else:
+            self.report({'INFO'}, message)
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_profile_report(Operator):
+    """Print the timing statistics of the mark and align operators, optionally writing them to JSON"""
+    bl_idname = "object.align_profile_report"
+    bl_label = "Timing Report"
+    
+    filepath: StringProperty(
+        name="File Path",
+        description="JSON file to write the statistics to (default: the add-on preference)",
+        default="",
+        subtype='FILE_PATH',
+    )
+    reset: BoolProperty(
+        name="Reset",
+        description="Clear the statistics afterwards",
+        default=False,
+    )
+    
+    def execute(self, context):
+        if not _profiler.stats():
+            self.report({'WARNING'}, "No timings recorded, enable Time Operator Phases first")
+            return {'CANCELLED'}
+        
+        print(_profiler.report())
+        filepath = self.filepath
+        addon = context.preferences.addons.get(__name__)
+        if not filepath and addon is not None:
+            filepath = addon.preferences.profile_path
+        if filepath:
+            _profiler.write(bpy.path.abspath(filepath))
+        if self.reset:
+            _profiler.clear()
+        
+        if filepath:
+            self.report({'INFO'}, f"Timing report printed to the console and written to {filepath}")
+        else:
+            self.report({'INFO'}, "Timing report printed to the console")
+        
+        return {'FINISHED'}
+
+
+class VertexAlignPreferences(AddonPreferences):
+    """Add-on preferences: operator phase timing"""
+    bl_idname = __name__
+    
+    use_profiling: BoolProperty(
+        name="Time Operator Phases",
+        description="Record how long each phase of the mark and align operators takes "
+                    f"(also enabled by the {PROFILE_ENV} environment variable)",
+        default=False,
+    )
+    profile_path: StringProperty(
+        name="Report File",
+        description="JSON file written by Timing Report",
+        default="",
+        subtype='FILE_PATH',
+    )
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "use_profiling")
+        layout.prop(self, "profile_path")
+        row = layout.row(align=True)
+        row.operator("object.align_profile_report", text="Print Report", icon='TIME')
+        row.operator("object.align_profile_report", text="Print and Reset").reset = True
+
+
+MANIFEST_MODES = ('smart', 'best_fit', 'best_fit_scale')
+
+
+def _parse_indices(value):
+    """Return a list of vertex indices from a list or from a string such as '1 2 3', '1;2;3' or '[1, 2, 3]'"""
+    if isinstance(value, (list, tuple)):
+        return [int(index) for index in value]
+    return [int(token) for token in re.findall(r"-?\d+", str(value))]
+
+
+def _read_manifest(path):
+    """Yield the rows of a JSON, JSON Lines or CSV alignment manifest as dictionaries"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as manifest:
+        if extension == ".csv":
+            yield from csv.DictReader(manifest)
+        elif extension == ".jsonl":
+            for line in manifest:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(manifest)
+            yield from (data["rows"] if isinstance(data, dict) else data)
+
+
+def align_manifest_row(row, depsgraph=None):
+    """Align the objects of one manifest row without going through bpy.ops
+
+    row holds "source" and "target" object names, "source_vertices" and "target_vertices" index
+    lists and an optional "mode" ('smart', 'best_fit' or 'best_fit_scale', default 'smart').
+    Returns (transform, RMS residual over the used points).
+    """
+    mode = (row.get("mode") or "smart").strip().lower()
+    if mode not in MANIFEST_MODES:
+        raise ValueError(f"Unknown mode '{mode}'")
+    
+    source_obj = bpy.data.objects.get(row["source"])
+    target_obj = bpy.data.objects.get(row["target"])
+    if source_obj is None or source_obj.type != 'MESH':
+        raise KeyError(f"No source mesh object '{row['source']}'")
+    if target_obj is None or target_obj.type != 'MESH':
+        raise KeyError(f"No target mesh object '{row['target']}'")
+    
+    source_indices = _parse_indices(row["source_vertices"])
+    target_indices = _parse_indices(row["target_vertices"])
+    count = min(len(source_indices), len(target_indices))
+    if mode == 'smart':
+        count = min(count, 3)
+    if count == 0 or (mode != 'smart' and count < 3):
+        raise ValueError(f"Not enough vertex pairs for mode '{mode}'")
+    
+    source_points = _world_points(source_obj, source_indices[:count], depsgraph)
+    target_points = _world_points(target_obj, target_indices[:count], depsgraph)
+    if mode == 'smart':
+        transforms = compute_alignment_transforms(_pad_points(source_points), _pad_points(target_points), count)
+        residual = alignment_residuals(transforms, source_points, target_points)[0]
+    else:
+        transforms, residuals = compute_best_fit_transforms(source_points, target_points, mode == 'best_fit_scale')
+        residual = residuals[0]
+    
+    apply_alignment_transforms([source_obj], transforms)
+    log_alignments(bpy.context.scene, mode, [_log_entry(source_obj, target_obj, transforms[0], residual,
+                                                        source_indices[:count], target_indices[:count])],
+                   use_hierarchy_root=False)
+    return transforms[0], float(residual)
+
+
+def run_manifest(manifest_path, results_path=None, use_evaluated=False):
+    """Stream through an alignment manifest, align every row and optionally write a results file
+
+    Each result records the row number, objects, mode, status ('ok' or 'error'), message,
+    RMS residual and wall time. The results file format follows its extension: .csv, .jsonl or JSON.
+    Returns a summary dictionary.
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get() if use_evaluated else None
+    results = []
+    start = time.perf_counter()
+    
+    for number, row in enumerate(_read_manifest(manifest_path), start=1):
+        row_start = time.perf_counter()
+        result = {
+            "row": number,
+            "source": row.get("source", ""),
+            "target": row.get("target", ""),
+            "mode": row.get("mode") or "smart",
+            "status": "ok",
+            "message": "",
+            "residual": None,
+        }
+        try:
+            _, result["residual"] = align_manifest_row(row, depsgraph)
+        except (KeyError, IndexError, ValueError) as error:
+            result["status"] = "error"
+            result["message"] = str(error.args[0]) if error.args else type(error).__name__
+        result["seconds"] = time.perf_counter() - row_start
+        results.append(result)
+    
+    if results_path:
+        _write_results(results_path, results)
+    
+    failed = sum(1 for result in results if result["status"] != "ok")
+    return {
+        "manifest": manifest_path,
+        "rows": len(results),
+        "aligned": len(results) - failed,
+        "failed": failed,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _write_results(path, results):
+    """Write a list of result dictionaries as CSV, JSON Lines or JSON depending on the extension"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "w", newline="", encoding="utf-8") as output:
+        if extension == ".csv":
+            writer = csv.DictWriter(output, fieldnames=list(results[0]) if results else ["row"])
+            writer.writeheader()
+            writer.writerows(results)
+        elif extension == ".jsonl":
+            for result in results:
+                output.write(json.dumps(result) + "\n")
+        else:
+            json.dump(results, output, indent=2)
+
+
+def _manifest_shards(blend_paths, manifest_path=None, shard_dir=None):
+    """Return {blend path: manifest path} for a pool run
+
+    A manifest next to a .blend file (same name, .csv/.json/.jsonl) wins. Otherwise rows of the
+    shared manifest that have a "blend" column are split into one shard per file (written to
+    shard_dir), and a shared manifest without that column applies to every file.
+    """
+    shards = {}
+    shared_rows = None
+    if manifest_path:
+        rows = list(_read_manifest(manifest_path))
+        if rows and all(row.get("blend") for row in rows):
+            shared_rows = {}
+            base = os.path.dirname(os.path.abspath(manifest_path))
+            for row in rows:
+                blend = os.path.normpath(os.path.join(base, row["blend"]))
+                shared_rows.setdefault(blend, []).append(row)
+    
+    for blend in blend_paths:
+        stem = os.path.splitext(blend)[0]
+        sidecar = next((stem + extension for extension in (".csv", ".json", ".jsonl")
+                        if os.path.isfile(stem + extension)), None)
+        if sidecar:
+            shards[blend] = sidecar
+        elif shared_rows is not None:
+            rows = shared_rows.get(os.path.normpath(os.path.abspath(blend)))
+            if rows:
+                shard = os.path.join(shard_dir, f"{len(shards):04d}_{os.path.basename(stem)}.jsonl")
+                _write_results(shard, rows)
+                shards[blend] = shard
+        elif manifest_path:
+            shards[blend] = manifest_path
+    return shards
+
+
+def _run_pool_job(blender, blend, manifest, results, save, timeout, retries):
+    """Align one .blend file in its own background Blender process, retrying crashes and timeouts"""
+    command = [blender, "-b", "--factory-startup", blend, "--python-exit-code", "2",
+               "-P", os.path.abspath(__file__), "--", "align", manifest, "--results", results]
+    if save:
+        command.append("--save")
+    
+    job = {"blend": blend, "manifest": manifest, "results": results, "attempts": 0, "status": "error",
+           "message": "", "rows": 0, "aligned": 0, "failed": 0}
+    start = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        job["attempts"] = attempt
+        if os.path.isfile(results):
+            os.remove(results)
+        try:
+            process = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            job["message"] = f"Timed out after {timeout} s"
+            continue
+        # 0: every row aligned, 1: some rows failed (not worth retrying), anything else: crash
+        if process.returncode in (0, 1) and os.path.isfile(results):
+            with open(results, encoding="utf-8") as output:
+                rows = json.load(output)
+            job["rows"] = len(rows)
+            job["failed"] = sum(1 for row in rows if row["status"] != "ok")
+            job["aligned"] = job["rows"] - job["failed"]
+            job["status"] = "ok" if job["failed"] == 0 else "partial"
+            job["message"] = ""
+            break
+        job["message"] = (process.stderr or process.stdout).strip()[-2000:] or f"Exit code {process.returncode}"
+    job["seconds"] = time.perf_counter() - start
+    return job
+
+
+def run_pool(blend_paths, manifest_path=None, workers=None, retries=1, save=False, timeout=None,
+             blender=None, results_dir=None):
+    """Align many .blend files in parallel, one background Blender process per worker
+
+    blend_paths may list .blend files and directories (searched for .blend files). Each file is
+    paired with a manifest as described in _manifest_shards, processed by 'align' in a separate
+    Blender process, and retried up to retries times when the process crashes or times out.
+    Returns a summary dictionary with one entry per file.
+    """
+    files = []
+    for path in blend_paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".blend")))
+        else:
+            files.append(path)
+    
+    blender = blender or bpy.app.binary_path
+    workers = workers or os.cpu_count() or 1
+    results_dir = results_dir or tempfile.mkdtemp(prefix="vertex_align_")
+    os.makedirs(results_dir, exist_ok=True)
+    shards = _manifest_shards(files, manifest_path, results_dir)
+    
+    start = time.perf_counter()
+    jobs = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for number, blend in enumerate(files):
+            manifest = shards.get(blend)
+            if manifest is None:
+                jobs.append({"blend": blend, "status": "skipped", "message": "No manifest", "attempts": 0,
+                             "rows": 0, "aligned": 0, "failed": 0, "seconds": 0.0})
+                continue
+            results = os.path.join(results_dir, f"{number:04d}_{os.path.basename(blend)}.results.json")
+            futures.append(executor.submit(_run_pool_job, blender, blend, manifest, results, save, timeout, retries))
+        for future in as_completed(futures):
+            jobs.append(future.result())
+    
+    jobs.sort(key=lambda job: job["blend"])
+    return {
+        "files": len(jobs),
+        "ok": sum(1 for job in jobs if job["status"] == "ok"),
+        "partial": sum(1 for job in jobs if job["status"] == "partial"),
+        "errors": sum(1 for job in jobs if job["status"] == "error"),
+        "skipped": sum(1 for job in jobs if job["status"] == "skipped"),
+        "rows": sum(job["rows"] for job in jobs),
+        "aligned": sum(job["aligned"] for job in jobs),
+        "workers": workers,
+        "seconds": time.perf_counter() - start,
+        "results_dir": results_dir,
+        "jobs": jobs,
+    }
+
+
+BENCHMARK_SIZES = (1000, 10000, 100000, 1000000, 5000000)
+
+
+def _random_rigid_matrix(rng):
+    """Return a random rotation and translation as a (4, 4) array"""
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    q *= np.sign(np.diag(r))
+    if np.linalg.det(q) < 0:
+        q[:, 0] = -q[:, 0]
+    matrix = np.eye(4)
+    matrix[:3, :3] = q
+    matrix[:3, 3] = rng.uniform(-10.0, 10.0, 3)
+    return matrix
+
+
+def _benchmark_mesh(count, rng):
+    """Build a synthetic mesh of count random vertices chained by edges, with bulk foreach_set writes"""
+    mesh = bpy.data.meshes.new(f"vertex_align_benchmark_{count}")
+    mesh.vertices.add(count)
+    mesh.vertices.foreach_set("co", rng.uniform(-1.0, 1.0, count * 3).astype(np.float32))
+    mesh.edges.add(count - 1)
+    chain = np.arange(count - 1, dtype=np.int32)
+    mesh.edges.foreach_set("vertices", np.column_stack((chain, chain + 1)).ravel())
+    mesh.update()
+    return mesh
+
+
+def _timed(function, repeat, reset=None):
+    """Run function repeat times with cold caches; return (seconds list, peak traced bytes, last result)
+
+    Peak memory is measured with tracemalloc, which sees Python and NumPy allocations but not
+    Blender's own.
+    """
+    import tracemalloc
+    
+    seconds = []
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        _point_cache.clear()
+        _kdtree_cache.clear()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, repeat=3, batch=50, seed=0):
+    """Time marking, 1/2/3-vertex alignment, batch alignment and manifest runs on synthetic meshes
+
+    For every mesh size, a target object and batch linked duplicates are placed at known random
+    transforms, so the error of each phase is measured against the ground truth: RMS distance of
+    the marked points for the 1 and 2 vertex paths, largest matrix deviation otherwise. Marking is
+    timed from an Edit Mode selection like the Mark operators (overwriting the scene marks), then
+    by cursor and edge marks. Returns a JSON-serializable report with one entry per (size, phase).
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    scratch = tempfile.mkdtemp(prefix="vertex_align_benchmark_")
+    collection = bpy.context.scene.collection
+    
+    for count in sizes:
+        mesh = _benchmark_mesh(count, rng)
+        target_obj = bpy.data.objects.new(f"{mesh.name}_target", mesh)
+        source_objs = [bpy.data.objects.new(f"{mesh.name}_source_{number}", mesh) for number in range(batch)]
+        for obj in [target_obj] + source_objs:
+            collection.objects.link(obj)
+        starts = [_random_rigid_matrix(rng) for _ in source_objs]
+        marks = rng.choice(count, 3, replace=False).tolist()
+        
+        def reset():
+            _write_world_matrices(source_objs, starts)
+        
+        def record(phase, timing, error):
+            seconds, peak, _ = timing
+            results.append({
+                "vertices": count,
+                "phase": phase,
+                "seconds_min": min(seconds),
+                "seconds_median": float(np.median(seconds)),
+                "seconds_max": max(seconds),
+                "peak_memory": peak,
+                "error": error,
+            })
+        
+        def matrix_error(objs):
+            return max(float(np.abs(_matrix_to_array(obj.matrix_world) - np.eye(4)).max()) for obj in objs)
+        
+        # Marking from the Edit Mode selection, as Mark Source 1-3 does: selection lookup, stored marks
+        # and stable IDs. Clicked vertices come from the selection history, box-selected ones from the
+        # select flag fallback.
+        import bmesh
+        bpy.context.view_layer.objects.active = target_obj
+        bpy.ops.object.mode_set(mode='EDIT')
+        bm = bmesh.from_edit_mesh(mesh)
+        bm.verts.ensure_lookup_table()
+        for index in marks:
+            bm.verts[index].select = True
+            bm.select_history.add(bm.verts[index])
+        
+        def mark_selection():
+            indices = _selected_vertex_indices(target_obj, bmesh.from_edit_mesh(mesh), limit=3)
+            _store_marks(bpy.context.scene, target_obj, "source", indices)
+            return indices
+        
+        timing = _timed(mark_selection, repeat)
+        record("mark_selection_clicked", timing, 0.0 if timing[2] == marks else None)
+        bm.select_history.clear()
+        timing = _timed(mark_selection, repeat)
+        record("mark_selection_box", timing, 0.0 if timing[2] == sorted(marks) else None)
+        bpy.ops.object.mode_set(mode='OBJECT')
+        
+        # Marking: nearest vertex to a point (cursor marking) and edge midpoint resolution
+        location = _transform_points(starts[0], np.array(mesh.vertices[marks[0]].co, dtype=np.float64)[None])[0]
+        timing = _timed(lambda: _nearest_vertex(source_objs[0], location), repeat, reset)
+        record("mark_nearest_vertex", timing, 0.0 if timing[2] == marks[0] else None)
+        edge_marks = [('EDGE', min(mark, count - 2), (0.0, 0.0, 0.0)) for mark in marks]
+        timing = _timed(lambda: _local_mark_points(source_objs[0], edge_marks), repeat, reset)
+        record("mark_edges", timing, None)
+        
+        # Single alignments, through the same path as the headless manifest rows
+        for points in (1, 2, 3):
+            row = {"source": source_objs[0].name, "target": target_obj.name,
+                   "source_vertices": marks[:points], "target_vertices": marks[:points]}
+            timing = _timed(lambda: align_manifest_row(row), repeat, reset)
+            record(f"align_{points}", timing, timing[2][1] if points < 3 else matrix_error(source_objs[:1]))
+        
+        timing = _timed(lambda: align_batch(source_objs, [marks] * batch, target_obj, marks), repeat, reset)
+        record("align_batch", timing, matrix_error(source_objs))
+        
+        manifest = os.path.join(scratch, f"manifest_{count}.jsonl")
+        _write_results(manifest, [{"source": obj.name, "target": target_obj.name,
+                                   "source_vertices": marks, "target_vertices": marks} for obj in source_objs])
+        timing = _timed(lambda: run_manifest(manifest), repeat, reset)
+        record("manifest", timing, matrix_error(source_objs))
+        
+        for obj in [target_obj] + source_objs:
+            bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+    
+    report = {
+        "version": ".".join(str(number) for number in bl_info["version"]),
+        "blender": bpy.app.version_string,
+        "numpy": np.__version__,
+        "repeat": repeat,
+        "batch": batch,
+        "seed": seed,
+        "results": results,
+    }
+    try:
+        import resource
+        # Process high-water mark (kilobytes on Linux, bytes on macOS), includes Blender's allocations
+        report["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        report["max_rss"] = None
+    return report
+
+
+def main(argv):
+    """Command line entry point: blender -b scene.blend -P vertex_based_align.py -- align manifest.csv"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="vertex_based_align.py", description="Vertex Based Align Tool batch mode")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    align_parser = commands.add_parser("align", help="Align the objects listed in a JSON/JSONL/CSV manifest")
+    align_parser.add_argument("manifest", help="Manifest with source, target, source_vertices, target_vertices, mode")
+    align_parser.add_argument("--results", help="Results file (.csv, .jsonl or .json)")
+    align_parser.add_argument("--evaluated", action="store_true", help="Resolve vertices on modifier results")
+    align_parser.add_argument("--save", action="store_true", help="Save the .blend file after aligning")
+    
+    pool_parser = commands.add_parser("pool", help="Align many .blend files in parallel background processes")
+    pool_parser.add_argument("paths", nargs="+", help=".blend files or directories containing .blend files")
+    pool_parser.add_argument("--manifest", help="Shared manifest (rows may have a 'blend' column to shard them)")
+    pool_parser.add_argument("--workers", type=int, help="Number of parallel Blender processes (default: cores)")
+    pool_parser.add_argument("--retries", type=int, default=1, help="Retries for crashed or timed out files")
+    pool_parser.add_argument("--timeout", type=float, help="Time limit per attempt, in seconds")
+    pool_parser.add_argument("--blender", help="Blender executable (default: the running one)")
+    pool_parser.add_argument("--results-dir", help="Directory for per-file results and manifest shards")
+    pool_parser.add_argument("--summary", help="Write the summary to this JSON file")
+    pool_parser.add_argument("--save", action="store_true", help="Save each .blend file after aligning")
+    
+    bench_parser = commands.add_parser("bench", help="Benchmark the alignment engine on synthetic meshes")
+    bench_parser.add_argument("--sizes", type=int, nargs="+", default=list(BENCHMARK_SIZES),
+                              help="Mesh sizes in vertices (default: 1k to 5M)")
+    bench_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per phase")
+    bench_parser.add_argument("--batch", type=int, default=50, help="Objects aligned by the batch and manifest phases")
+    bench_parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic scenes")
+    bench_parser.add_argument("--output", help="Write the report to this JSON file")
+    
+    replay_parser = commands.add_parser("replay", help="Reapply the alignments of an alignment log")
+    replay_parser.add_argument("log", nargs="?", help="JSON Lines log (default: the log text of the .blend file)")
+    replay_parser.add_argument("--mode", choices=[mode.lower() for mode in REPLAY_MODES], default="resolve",
+                               help="resolve: solve again from the anchors, delta: apply the recorded moves")
+    replay_parser.add_argument("--save", action="store_true", help="Save the .blend file after replaying")
+    
+    args = parser.parse_args(argv)
+    
+    # Marks, anchor sets and log settings are add-on properties, unreadable until the add-on is registered
+    if args.command in ("align", "replay", "bench") and not hasattr(bpy.types.Object, "vertex_align_anchor_sets"):
+        register()
+    
+    if args.command == "align":
+        summary = run_manifest(args.manifest, args.results, args.evaluated)
+        if args.save:
+            bpy.ops.wm.save_mainfile()
+        print(json.dumps(summary))
+        return 1 if summary["failed"] else 0
+    
+    if args.command == "pool":
+        summary = run_pool(args.paths, args.manifest, args.workers, args.retries, args.save, args.timeout,
+                           args.blender, args.results_dir)
+        if args.summary:
+            with open(args.summary, "w", encoding="utf-8") as output:
+                json.dump(summary, output, indent=2)
+        print(json.dumps({key: value for key, value in summary.items() if key != "jobs"}))
+        return 1 if summary["errors"] or summary["partial"] else 0
+    
+    if args.command == "replay":
+        entries = read_alignment_log(args.log)
+        aligned, skipped = replay_alignment_log(entries, args.mode.upper())
+        if args.save:
+            bpy.ops.wm.save_mainfile()
+        print(json.dumps({"entries": len(entries), "aligned": aligned, "skipped": skipped}))
+        return 1 if skipped else 0
+    
+    if args.command == "bench":
+        report = run_benchmarks(args.sizes, args.repeat, args.batch, args.seed)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+        print(json.dumps(report, indent=2))
+        return 0
+    
+    return 0
+
+
+def _invalidate_geometry(id_data):
+    """Drop cached points, KD-trees and descriptors of an object or mesh datablock whose geometry changed"""
+    pointer = id_data.as_pointer()
+    _point_cache.invalidate(pointer)
+    _kdtree_cache.pop(pointer, None)
+    _stable_id_cache.pop(pointer, None)
+    _descriptor_cache.pop(pointer, None)
+    if isinstance(id_data, bpy.types.Object) and id_data.type == 'MESH':
+        _point_cache.invalidate(id_data.data.as_pointer())
+        _kdtree_cache.pop(id_data.data.as_pointer(), None)
+        _stable_id_cache.pop(id_data.data.as_pointer(), None)
+        _descriptor_cache.pop(id_data.data.as_pointer(), None)
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    """Invalidate caches of edited objects and meshes and the panel snapshot, schedule Stay Aligned links"""
+    tracked = set().union(*(status["pointers"] for status in _panel_status.values()))
+    link_targets = _live_link_targets()
+    for update in depsgraph.updates:
+        if update.is_updated_geometry:
+            _invalidate_geometry(update.id.original)
+        # Stay Aligned sources follow their target once it stops changing
+        if link_targets and (update.is_updated_transform or update.is_updated_geometry):
+            sources = link_targets.get(update.id.original.as_pointer())
+            if sources:
+                _schedule_live_links(sources)
+        # Marks are scene properties, marked positions follow the marked objects
+        if _panel_status and (isinstance(update.id, bpy.types.Scene) or update.id.original.as_pointer() in tracked):
+            _invalidate_panel_status()
+
+
+@persistent
+def _on_load_post(*args):
+    """Datablock pointers are not stable across files, start with empty caches"""
+    _point_cache.clear()
+    _kdtree_cache.clear()
+    _stable_id_cache.clear()
+    _descriptor_cache.clear()
+    _invalidate_panel_status()
+    _invalidate_live_links()
+
+
 # Register properties and classes
 def register():
+    bpy.utils.register_class(VertexAlignPreferences)
+    bpy.utils.register_class(VertexAlignPointIndex)
+    bpy.utils.register_class(VertexAlignElementMark)
+    bpy.utils.register_class(VertexAlignAnchor)
+    bpy.utils.register_class(VertexAlignAnchorSet)
+    bpy.utils.register_class(VertexAlignLiveLink)
+    bpy.utils.register_class(VertexAlignSuggestion)
+    bpy.utils.register_class(VertexAlignConstraint)
     bpy.utils.register_class(OBJECT_OT_mark_source_vertex_1)
     bpy.utils.register_class(OBJECT_OT_mark_source_vertex_2)
     bpy.utils.register_class(OBJECT_OT_mark_source_vertex_3)
     bpy.utils.register_class(OBJECT_OT_mark_target_vertex_1)
     bpy.utils.register_class(OBJECT_OT_mark_target_vertex_2)
     bpy.utils.register_class(OBJECT_OT_mark_target_vertex_3)
+    bpy.utils.register_class(OBJECT_OT_mark_vertices)
+    bpy.utils.register_class(OBJECT_OT_mark_vertex_at_cursor)
+    bpy.utils.register_class(OBJECT_OT_mark_element)
+    bpy.utils.register_class(OBJECT_OT_suggest_target_vertices)
+    bpy.utils.register_class(OBJECT_OT_use_target_suggestion)
     bpy.utils.register_class(OBJECT_OT_align_smart)
+    bpy.utils.register_class(OBJECT_OT_align_batch)
+    bpy.utils.register_class(OBJECT_OT_align_instances)
+    bpy.utils.register_class(OBJECT_OT_align_preview)
+    bpy.utils.register_class(OBJECT_OT_align_live_link)
+    bpy.utils.register_class(OBJECT_OT_mark_points)
+    bpy.utils.register_class(OBJECT_OT_align_best_fit)
+    bpy.utils.register_class(OBJECT_OT_align_robust)
+    bpy.utils.register_class(OBJECT_OT_align_auto)
+    bpy.utils.register_class(OBJECT_OT_anchor_set_add)
+    bpy.utils.register_class(OBJECT_OT_anchor_set_remove)
+    bpy.utils.register_class(OBJECT_OT_align_to_anchor_set)
+    bpy.utils.register_class(OBJECT_OT_align_to_many)
     bpy.utils.register_class(OBJECT_OT_clear_marked_vertices)
     bpy.utils.register_class(VIEW3D_PT_vertex_align)
+    bpy.utils.register_class(VIEW3D_UL_vertex_align_anchor_sets)
+    bpy.utils.register_class(VIEW3D_PT_vertex_align_anchor_sets)
+    bpy.utils.register_class(OBJECT_OT_assembly_constraint_add)
+    bpy.utils.register_class(OBJECT_OT_assembly_constraint_remove)
+    bpy.utils.register_class(OBJECT_OT_align_assembly)
+    bpy.utils.register_class(VIEW3D_UL_vertex_align_assembly)
+    bpy.utils.register_class(VIEW3D_PT_vertex_align_assembly)
+    bpy.utils.register_class(OBJECT_OT_replay_alignment_log)
+    bpy.utils.register_class(OBJECT_OT_profile_report)
     
     bpy.types.Scene.vertex_align_source_object = StringProperty(
         name="Source Object",
@@ -670,18 +4850,160 @@ def register():
         description="Index of target vertex 3 (plane)",
         default=-1
     )
+    bpy.types.Scene.vertex_align_batch_collection = PointerProperty(
+        name="Batch Collection",
+        description="Collection whose mesh objects are aligned by Batch Align",
+        type=bpy.types.Collection
+    )
+    bpy.types.Scene.vertex_align_source_points = CollectionProperty(
+        name="Source Points",
+        description="Source vertex indices used by Best Fit alignment",
+        type=VertexAlignPointIndex
+    )
+    bpy.types.Scene.vertex_align_target_points = CollectionProperty(
+        name="Target Points",
+        description="Target vertex indices used by Best Fit alignment",
+        type=VertexAlignPointIndex
+    )
+    bpy.types.Scene.vertex_align_use_evaluated = BoolProperty(
+        name="Use Modifier Results",
+        description="Resolve marked vertices against the evaluated mesh (with modifiers applied) "
+                    "instead of the base mesh",
+        default=False
+    )
+    bpy.types.Scene.vertex_align_source_elements = CollectionProperty(
+        name="Source Elements",
+        description="Source marks on edges, faces, vertex groups or surfaces instead of vertices",
+        type=VertexAlignElementMark
+    )
+    bpy.types.Scene.vertex_align_target_elements = CollectionProperty(
+        name="Target Elements",
+        description="Target marks on edges, faces, vertex groups or surfaces instead of vertices",
+        type=VertexAlignElementMark
+    )
+    bpy.types.Scene.vertex_align_source_anchors = CollectionProperty(
+        name="Source Stable IDs",
+        description="Stable ID and local coordinate of source vertices 1-3, to find them after edits",
+        type=VertexAlignAnchor
+    )
+    bpy.types.Scene.vertex_align_target_anchors = CollectionProperty(
+        name="Target Stable IDs",
+        description="Stable ID and local coordinate of target vertices 1-3, to find them after edits",
+        type=VertexAlignAnchor
+    )
+    bpy.types.Scene.vertex_align_mark_element = EnumProperty(
+        name="Mark Element",
+        description="Element marked by the Element buttons",
+        items=MARK_ELEMENT_ITEMS,
+        default='FACE'
+    )
+    bpy.types.Scene.vertex_align_use_log = BoolProperty(
+        name="Log Alignments",
+        description=f"Record every alignment in the '{ALIGNMENT_LOG_TEXT}' text so it can be replayed",
+        default=False
+    )
+    bpy.types.Scene.vertex_align_log_path = StringProperty(
+        name="Sidecar Log",
+        description="Also append logged alignments to this JSON Lines file",
+        subtype='FILE_PATH'
+    )
+    bpy.types.Scene.vertex_align_suggestions = CollectionProperty(
+        name="Suggested Target Vertices",
+        description="Target vertices proposed for the marked source vertices by Suggest Target Vertices",
+        type=VertexAlignSuggestion
+    )
+    bpy.types.Scene.vertex_align_assembly = CollectionProperty(
+        name="Assembly",
+        description="Anchor set constraints between objects solved together by Align Assembly",
+        type=VertexAlignConstraint
+    )
+    bpy.types.Scene.vertex_align_assembly_index = IntProperty(
+        name="Active Assembly Constraint",
+        default=0
+    )
+    bpy.types.Scene.vertex_align_use_hierarchy_root = BoolProperty(
+        name="Move Hierarchy Root",
+        description="Move the top-most parent of the aligned object instead, carrying the whole "
+                    "assembly with one matrix write",
+        default=False
+    )
+    bpy.types.Object.vertex_align_source_vertices = IntVectorProperty(
+        name="Source Vertices",
+        description="Source vertex indices marked on this object, used by Batch Align",
+        size=3,
+        default=(-1, -1, -1)
+    )
+    
+    bpy.types.Object.vertex_align_anchor_sets = CollectionProperty(
+        name="Anchor Sets",
+        description="Named sets of anchor vertices stored on this object",
+        type=VertexAlignAnchorSet
+    )
+    bpy.types.Object.vertex_align_anchor_set_index = IntProperty(
+        name="Active Anchor Set",
+        default=0
+    )
+    bpy.types.Object.vertex_align_live_link = PointerProperty(
+        name="Stay Aligned",
+        description="Target this object follows when it moves or is edited",
+        type=VertexAlignLiveLink
+    )
+    
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_on_load_post)
+    atexit.register(_write_profile_at_exit)
 
 
 def unregister():
+    atexit.unregister(_write_profile_at_exit)
+    if bpy.app.timers.is_registered(_update_live_links):
+        bpy.app.timers.unregister(_update_live_links)
+    bpy.app.handlers.load_post.remove(_on_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    
+    bpy.utils.unregister_class(OBJECT_OT_profile_report)
+    bpy.utils.unregister_class(OBJECT_OT_replay_alignment_log)
+    bpy.utils.unregister_class(VIEW3D_PT_vertex_align_assembly)
+    bpy.utils.unregister_class(VIEW3D_UL_vertex_align_assembly)
+    bpy.utils.unregister_class(OBJECT_OT_align_assembly)
+    bpy.utils.unregister_class(OBJECT_OT_assembly_constraint_remove)
+    bpy.utils.unregister_class(OBJECT_OT_assembly_constraint_add)
+    bpy.utils.unregister_class(VIEW3D_PT_vertex_align_anchor_sets)
+    bpy.utils.unregister_class(VIEW3D_UL_vertex_align_anchor_sets)
     bpy.utils.unregister_class(VIEW3D_PT_vertex_align)
     bpy.utils.unregister_class(OBJECT_OT_clear_marked_vertices)
+    bpy.utils.unregister_class(OBJECT_OT_align_to_many)
+    bpy.utils.unregister_class(OBJECT_OT_align_to_anchor_set)
+    bpy.utils.unregister_class(OBJECT_OT_anchor_set_remove)
+    bpy.utils.unregister_class(OBJECT_OT_anchor_set_add)
+    bpy.utils.unregister_class(OBJECT_OT_align_auto)
+    bpy.utils.unregister_class(OBJECT_OT_align_robust)
+    bpy.utils.unregister_class(OBJECT_OT_align_best_fit)
+    bpy.utils.unregister_class(OBJECT_OT_mark_points)
+    bpy.utils.unregister_class(OBJECT_OT_align_live_link)
+    bpy.utils.unregister_class(OBJECT_OT_align_preview)
+    bpy.utils.unregister_class(OBJECT_OT_align_instances)
+    bpy.utils.unregister_class(OBJECT_OT_align_batch)
     bpy.utils.unregister_class(OBJECT_OT_align_smart)
+    bpy.utils.unregister_class(OBJECT_OT_use_target_suggestion)
+    bpy.utils.unregister_class(OBJECT_OT_suggest_target_vertices)
+    bpy.utils.unregister_class(OBJECT_OT_mark_element)
+    bpy.utils.unregister_class(OBJECT_OT_mark_vertex_at_cursor)
+    bpy.utils.unregister_class(OBJECT_OT_mark_vertices)
     bpy.utils.unregister_class(OBJECT_OT_mark_target_vertex_3)
     bpy.utils.unregister_class(OBJECT_OT_mark_target_vertex_2)
     bpy.utils.unregister_class(OBJECT_OT_mark_target_vertex_1)
     bpy.utils.unregister_class(OBJECT_OT_mark_source_vertex_3)
     bpy.utils.unregister_class(OBJECT_OT_mark_source_vertex_2)
     bpy.utils.unregister_class(OBJECT_OT_mark_source_vertex_1)
+    bpy.utils.unregister_class(VertexAlignConstraint)
+    bpy.utils.unregister_class(VertexAlignSuggestion)
+    bpy.utils.unregister_class(VertexAlignLiveLink)
+    bpy.utils.unregister_class(VertexAlignAnchorSet)
+    bpy.utils.unregister_class(VertexAlignAnchor)
+    bpy.utils.unregister_class(VertexAlignElementMark)
+    bpy.utils.unregister_class(VertexAlignPointIndex)
+    bpy.utils.unregister_class(VertexAlignPreferences)
     
     del bpy.types.Scene.vertex_align_source_object
     del bpy.types.Scene.vertex_align_source_vertex_1
@@ -691,7 +5013,37 @@ def unregister():
     del bpy.types.Scene.vertex_align_target_vertex_1
     del bpy.types.Scene.vertex_align_target_vertex_2
     del bpy.types.Scene.vertex_align_target_vertex_3
+    del bpy.types.Scene.vertex_align_batch_collection
+    del bpy.types.Scene.vertex_align_source_points
+    del bpy.types.Scene.vertex_align_target_points
+    del bpy.types.Scene.vertex_align_use_evaluated
+    del bpy.types.Scene.vertex_align_source_elements
+    del bpy.types.Scene.vertex_align_target_elements
+    del bpy.types.Scene.vertex_align_source_anchors
+    del bpy.types.Scene.vertex_align_target_anchors
+    del bpy.types.Scene.vertex_align_mark_element
+    del bpy.types.Scene.vertex_align_use_log
+    del bpy.types.Scene.vertex_align_log_path
+    del bpy.types.Scene.vertex_align_suggestions
+    del bpy.types.Scene.vertex_align_assembly
+    del bpy.types.Scene.vertex_align_assembly_index
+    del bpy.types.Scene.vertex_align_use_hierarchy_root
+    del bpy.types.Object.vertex_align_source_vertices
+    del bpy.types.Object.vertex_align_anchor_sets
+    del bpy.types.Object.vertex_align_anchor_set_index
+    del bpy.types.Object.vertex_align_live_link
+    
+    _point_cache.clear()
+    _kdtree_cache.clear()
+    _stable_id_cache.clear()
+    _descriptor_cache.clear()
+    _invalidate_panel_status()
+    _invalidate_live_links()
 
 
 if __name__ == "__main__":
+    # Arguments after "--" select the command line mode, otherwise register the add-on
+    script_args = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if script_args:
+        sys.exit(main(script_args))
     register()
\ No newline at end of file